@@ -1,29 +1,58 @@
 import os
-from flask import Flask, request, jsonify
+import logging
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from dotenv import load_dotenv
-from services.ingest_service import build_vector_db_from_json
-from services.query_service import answer_question
-from langchain_openai import ChatOpenAI
-from langchain.agents import AgentExecutor, create_react_agent
-from services.agent.tools.age_tool import AgeCalculatorTool
-from services.agent.tools.weather_tool import weather_tool
-from services.agent.tools.retrievalqa_tool import RetrievalQATool
-from prompt import prompt_template
-from langchain.memory import ConversationBufferMemory
-from langchain.schema import HumanMessage, AIMessage, SystemMessage
-from langchain.tools.base import ToolException
-from langchain.callbacks.base import BaseCallbackHandler
+from services.job_queue import get_job_queue
+from services.forecast_log import get_forecast_log
+from services.vectorstores.registry import get_backend
+from services.query_service import answer_question, answer_question_federated, federated_targets
+from services.agent.agent_service import (
+    parse_agent_request,
+    run_agent_turn,
+)
+from services.streaming import SSE_HEADERS, stream_events
+from services.metrics import METRICS_CONTENT_TYPE, render_metrics
+from services.tracing import configure_logging, finish_trace, start_trace
 
 from langchain import hub
 
 load_dotenv()
+configure_logging()
+
+logger = logging.getLogger(__name__)
 
 application = Flask(__name__)
 API_KEY = os.getenv("API", None)
+# /metrics skips the API key; set this to require "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", None)
+
+
+@application.before_request
+def begin_trace():
+    if request.path != "/metrics":
+        g.trace = start_trace(
+            request.url_rule.rule if request.url_rule else "unmatched", request.method
+        )
+
+
+@application.after_request
+def record_status(response):
+    g.status = response.status_code
+    return response
+
+
+@application.teardown_request
+def end_trace(exc):
+    # Runs after a streamed body is fully sent (stream_with_context)
+    trace = g.pop("trace", None)
+    if trace is not None:
+        finish_trace(trace, 500 if exc is not None else g.get("status", 500))
 
 
 @application.before_request
 def api_key():
+    if request.path == "/metrics":
+        return None
 
     provided = request.headers.get("API-Key")
     if not provided or provided != API_KEY:
@@ -36,17 +65,30 @@ def home_route():
     return "Home Route", 200
 
 
+@application.get("/metrics")
+def metrics():
+    """Prometheus text format: stage/request latency histograms, LLM tokens."""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return jsonify({"error": "Unauthorized"}), 401
+    return Response(render_metrics(), mimetype=METRICS_CONTENT_TYPE)
+
+
 @application.post("/create_embeddings")
 def create_embeddings():
     """
     Body:
     {
-        "pdf_paths": ["absolute/or/relative/path1.pdf", "path2.pdf", ...]
+        "pdf_paths": ["absolute/or/relative/path1.pdf", "path2.pdf", ...],
+        "backend": "faiss" | "numpy" | "chroma"   (optional, default VECTOR_BACKEND),
+        "index_type": "auto" | "flat" | "ivf" | "hnsw" | "ivfpq"   (optional, FAISS only)
     }
-    Returns:
+    Returns (202, the ingest runs in the background job queue):
     {
-        "vector_db_path": "...",
+        "job_id": "...",
+        "status": "queued",
+        "status_url": "/jobs/<job_id>"
     }
+    Poll the status_url for progress and the resulting "vector_db_path".
     """
     try:
         data = request.get_json(silent=True) or {}
@@ -56,17 +98,31 @@ def create_embeddings():
         if not pdf_paths:
             return jsonify({"error": "pdf_paths (list) is required"}), 400
 
+        paths = [pdf_paths] if isinstance(pdf_paths, str) else list(pdf_paths)
+        for path in paths:
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"File not found: {path}")
+        backend_cls = get_backend(data.get("backend"))
+        index_type = data.get("index_type")
+        backend_cls.validate_options(index_type=index_type)
+
         # Ensure base storage dir exists
         os.makedirs(storage_dir, exist_ok=True)
 
-        result = build_vector_db_from_json(
-            pdf_paths=pdf_paths,
-            storage_dir=storage_dir,
-            embed_model="text-embedding-3-small",
-            chunk_size=1000,
-            chunk_overlap=150
-        )
-        return jsonify(result), 200
+        job_id = get_job_queue().enqueue("ingest", {
+            "pdf_paths": paths,
+            "storage_dir": storage_dir,
+            "embed_model": "text-embedding-3-small",
+            "chunk_size": 1000,
+            "chunk_overlap": 150,
+            "backend": backend_cls.backend,
+            "index_type": index_type,
+        })
+        return jsonify({
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/jobs/{job_id}",
+        }), 202
 
     except FileNotFoundError as e:
         return jsonify({"error": str(e)}), 404
@@ -80,13 +136,76 @@ def create_embeddings():
         }), 500
 
 
+@application.get("/jobs/<job_id>")
+def job_status(job_id):
+    """
+    Returns:
+    {
+        "job_id": "...",
+        "status": "queued|running|done|failed",
+        "chunks_processed": 123,
+        "chunks_per_s": 45.6,
+        "vector_db_path": "..." (once done),
+        ...
+    }
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(job), 200
+
+
+@application.get("/forecasts")
+def forecasts():
+    """
+    Tail the forecast log: /forecasts?after=<cursor>&limit=100
+    Returns:
+    {
+        "records": [{"id": "...", "cursor": "3:1024", "record": {...}}, ...],
+        "next": "3:1024"   (pass as `after` to get the records after these)
+    }
+    """
+    try:
+        page = get_forecast_log().page(
+            request.args.get("after"), int(request.args.get("limit", 100))
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(page), 200
+
+
+@application.get("/forecasts/<record_id>")
+def forecast_record(record_id):
+    """One logged forecast by its request_id."""
+    record = get_forecast_log().get(record_id)
+    if record is None:
+        return jsonify({"error": "forecast not found"}), 404
+    return jsonify(record), 200
+
+
 @application.post("/query")
 def query():
     """
     Body:
     {
         "vector_db_path": "<path returned by /embeddings/create>",
-        "question": "Your question"
+        "question": "Your question",
+        "bypass_cache": false,         # optional, skip the answer cache
+        "retrieval": "hybrid"          # optional, "vector" or "hybrid"
+    }
+    To search several stores with a single LLM call, give instead of (or
+    with) vector_db_path:
+        "vector_db_paths": ["<path>", ...],
+        "tag": "weather"               # every catalogued store with this tag
+    Returns:
+    {
+        "answer": "...",
+        "cached": true|false,
+        "prompt_tokens": 812,          # tokens of the prompt sent to the LLM
+        "chunks": [{"source": ..., "line": ..., "start_index": ...,
+                    "chars": ..., "tokens": ..., "relevance": ...}],
+        "stores": [{"path": ..., "hits": ..., "load_ms": ..., "search_ms": ...}]
+                                       # federated only (never cached)
     }
     """
 
@@ -94,16 +213,24 @@ def query():
         data = request.get_json(silent=True) or {}
         vector_db_path = data.get("vector_db_path")
         question = data.get("question")
+        federated = federated_targets(data)
 
-        if not vector_db_path:
+        if not vector_db_path and federated is None:
             return jsonify({"error": "vector_db_path is required"}), 400
         if not question:
             return jsonify({"error": "question is required"}), 400
 
-        result = answer_question(
-            vector_db_path=vector_db_path,
-            question=question,
-        )
+        if federated is not None:
+            result = answer_question_federated(
+                question=question, retrieval=data.get("retrieval"), **federated
+            )
+        else:
+            result = answer_question(
+                vector_db_path=vector_db_path,
+                question=question,
+                use_cache=not data.get("bypass_cache", False),
+                retrieval=data.get("retrieval"),
+            )
         return jsonify(result), 200
 
     except ValueError as e:
@@ -131,105 +258,95 @@ def agent_route():
         "append_this_message": {
             "role": "assistant",
             "content": "<assistant reply>"
-        }
+        },
+        "memory": {"history_tokens_sent": ..., "prompt_tokens_saved": ...},
+        "agent": {"mode": "react", "llm_calls": 2, "tool_calls": 1, "duration_ms": ...}
       }
+
+    Optional "conversation_id" keys the cached summary of older turns.
+    Optional "agent_mode": "react" (free-text ReAct) or "tools" (native
+    tool calling); default AGENT_MODE.
+    Age and weather requests with every argument given (a birth date; a
+    location and a number of days) are answered by the tool directly,
+    without the LLM: "agent" is then {"mode": "router", "intent": ...,
+    "llm_calls": 0, "llm_calls_avoided": 2, ...}. "router": false opts out.
     """
     data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(run_agent_turn(data)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        # Surface unexpected errors
+        return jsonify({"error": f"Agent error: {e}"}), 500
 
-    # ---- Accept transcript or single message
-    messages = data.get("messages")
-    # ---- Validate last turn is a user message
-    last = messages[-1]
-    if last.get("role") != "user" or not (last.get("content") or "").strip():
-        return jsonify({
-            "error": (
-                "Last item in `messages` must be a user message with "
-                "non-empty `content`"
-            )
-        }), 400
-
-    history_msgs = messages[:-1]                 # seed memory from this
-    current_user_input = last["content"].strip()  # run agent on this
-
-    tools = [
-        AgeCalculatorTool(handle_tool_error=False),
-        RetrievalQATool(),
-        weather_tool(),
-    ]
-
-    # ---- LLM
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.0)
 
-    memory = ConversationBufferMemory(
-        memory_key="chat_history",
-        return_messages=False,
-        output_key="output"
+def _event_stream(events) -> Response:
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers=SSE_HEADERS,
     )
-    memory.chat_memory.clear()
 
-    # ---- Preload memory from client transcript (except last user turn)
-    role_map = {
-        "user": HumanMessage,
-        "assistant": AIMessage,
-        "system": SystemMessage,
-    }
-    # Seed memory with paired user→assistant turns only
-    buffered_user_input = None
-    for m in history_msgs:
-        role = (m.get("role") or "").strip().lower()
-        content = (m.get("content") or "").strip()
-        if not content or role not in role_map:
-            continue
-
-        if role == "user":
-            buffered_user_input = content
-        elif role == "assistant" and buffered_user_input is not None:
-            # Save as one turn: user input → assistant output
-            memory.save_context(
-                {"input": buffered_user_input},
-                {"output": content}
+
+@application.post("/query/stream")
+def query_stream():
+    """
+    Same body as /query. Responds with server-sent events:
+      event: token  data: {"token": "..."}      (as the LLM produces them)
+      event: done   data: {"answer": "..."}     (same body as /query)
+      event: error  data: {"error": "..."}
+    """
+    data = request.get_json(silent=True) or {}
+    vector_db_path = data.get("vector_db_path")
+    question = data.get("question")
+    federated = federated_targets(data)
+
+    if not vector_db_path and federated is None:
+        return jsonify({"error": "vector_db_path is required"}), 400
+    if not question:
+        return jsonify({"error": "question is required"}), 400
+
+    if federated is not None:
+        return _event_stream(stream_events(
+            lambda callbacks: answer_question_federated(
+                question=question,
+                callbacks=callbacks,
+                retrieval=data.get("retrieval"),
+                **federated,
             )
-            # Debug: confirm the pair was saved
-            print("Seed pair -> input:", buffered_user_input)
-            print("Seed pair -> output:", content)
-            buffered_user_input = None
-        else:
-            # Ignore system or unmatched assistant messages
-            continue
-    print("BRRRRRRRRRRRRRRRRR\n\n\n", memory.load_memory_variables({}))
-
-    # ---- Build agent with your custom prompt
-    agent = create_react_agent(llm, tools, prompt_template)
-    agent_executor = AgentExecutor(
-        agent=agent,
-        tools=tools,
-        memory=memory,
-        verbose=True,
-        handle_parsing_errors=True
-    )
-    # print("\n\n\n\n\nPROMPT\n\n\n\n")
-    # print(agent_executor.agent)
+        ))
+    return _event_stream(stream_events(
+        lambda callbacks: answer_question(
+            vector_db_path=vector_db_path,
+            question=question,
+            callbacks=callbacks,
+            use_cache=not data.get("bypass_cache", False),
+            retrieval=data.get("retrieval"),
+        )
+    ))
 
+
+@application.post("/agent/stream")
+def agent_stream():
+    """
+    Same body as /agent. Responds with server-sent events:
+      event: token        LLM tokens (Thought/Action text and final answer)
+      event: tool_start   {"tool": ..., "input": ...}
+      event: tool_end     {"tool": ..., "duration_ms": ...}
+      event: observation  {"observation": ...}
+      event: done         same body as /agent
+      event: error        {"error": ...}
+    """
+    data = request.get_json(silent=True) or {}
     try:
-        # Only pass the current user input
-        # Memory injects history into {chat_history}
-        # Debug: show what the memory will inject
-        _mem = memory.load_memory_variables({})
-        _hist = (_mem.get("chat_history") or "")
-        print("chat_history preview (first 500 chars):")
-        print(_hist[:500])
-        result = agent_executor.invoke({"input": current_user_input})
-        reply = (result.get("output") or "").strip()
-    except ToolException as e:
-        reply = str(e)
-    except Exception as e:
-        # Surface unexpected errors
-        return jsonify({"error": f"Agent error: {e}"}), 500
+        parse_agent_request(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify({
-        "reply": reply,
-        "append_this_message": {"role": "assistant", "content": reply},
-    }), 200
+    return _event_stream(stream_events(
+        lambda callbacks: run_agent_turn(data, callbacks=callbacks)
+    ))
 
 
 if __name__ == "__main__":
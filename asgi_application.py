@@ -0,0 +1,306 @@
+"""
+ASGI serving mode: same routes, request/response contracts and `API-Key`
+auth as application.py, but LLM round trips are awaited (`ainvoke`) so one
+worker handles many concurrent requests.
+
+    uvicorn asgi_application:app --host 0.0.0.0 --port 8000
+"""
+import os
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from dotenv import load_dotenv
+from langchain.tools.base import ToolException
+
+from services.job_queue import get_job_queue
+from services.forecast_log import get_forecast_log
+from services.vectorstores.registry import get_backend
+from services.query_service import (
+    aanswer_question,
+    aanswer_question_federated,
+    answer_question,
+    answer_question_federated,
+    federated_targets,
+)
+from services.agent.agent_service import (
+    AgentCallCounter,
+    agent_mode_for,
+    build_agent_executor,
+    parse_agent_request,
+    routed_agent_turn,
+    build_memory,
+    conversation_id_for,
+    run_agent_turn,
+)
+from services.streaming import SSE_HEADERS, stream_events
+from services.metrics import METRICS_CONTENT_TYPE, render_metrics
+from services.tracing import configure_logging, finish_trace, start_trace, tracing_handler
+
+load_dotenv()
+configure_logging()
+
+app = FastAPI()
+API_KEY = os.getenv("API", None)
+# /metrics skips the API key; set this to require "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", None)
+
+
+async def _json_body(request: Request) -> dict:
+    # Mirrors Flask's request.get_json(silent=True) or {}
+    try:
+        data = await request.json()
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+@app.middleware("http")
+async def api_key(request: Request, call_next):
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    provided = request.headers.get("API-Key")
+    if not provided or provided != API_KEY:
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
+    return await call_next(request)
+
+
+# Registered last, so it runs first: 401s are traced too
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    trace = start_trace(request.url.path, request.method)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Streamed bodies are still being sent: their latency is to the first byte
+        route = request.scope.get("route")
+        finish_trace(trace, status, getattr(route, "path", "unmatched"))
+
+
+@app.get("/")
+async def home_route():
+    return PlainTextResponse("Home Route", status_code=200)
+
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    """Same contract as application.metrics."""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return JSONResponse({"error": "Unauthorized"}, 401)
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.post("/create_embeddings")
+async def create_embeddings(request: Request):
+    """Same contract as application.create_embeddings."""
+    try:
+        data = await _json_body(request)
+        pdf_paths = data.get("pdf_paths")
+        storage_dir = "./storage/vectordb/weather"
+
+        if not pdf_paths:
+            return JSONResponse({"error": "pdf_paths (list) is required"}, 400)
+
+        paths = [pdf_paths] if isinstance(pdf_paths, str) else list(pdf_paths)
+        for path in paths:
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"File not found: {path}")
+        backend_cls = get_backend(data.get("backend"))
+        index_type = data.get("index_type")
+        backend_cls.validate_options(index_type=index_type)
+
+        os.makedirs(storage_dir, exist_ok=True)
+
+        job_id = await run_in_threadpool(get_job_queue().enqueue, "ingest", {
+            "pdf_paths": paths,
+            "storage_dir": storage_dir,
+            "embed_model": "text-embedding-3-small",
+            "chunk_size": 1000,
+            "chunk_overlap": 150,
+            "backend": backend_cls.backend,
+            "index_type": index_type,
+        })
+        return JSONResponse({
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/jobs/{job_id}",
+        }, 202)
+
+    except FileNotFoundError as e:
+        return JSONResponse({"error": str(e)}, 404)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, 400)
+    except Exception as e:
+        return JSONResponse(
+            {"error": "Internal Server Error", "detail": str(e)}, 500
+        )
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Same contract as application.job_status."""
+    job = await run_in_threadpool(get_job_queue().get, job_id)
+    if job is None:
+        return JSONResponse({"error": "job not found"}, 404)
+    return JSONResponse(job, 200)
+
+
+@app.get("/forecasts")
+async def forecasts(request: Request):
+    """Same contract as application.forecasts."""
+    try:
+        page = await run_in_threadpool(
+            get_forecast_log().page,
+            request.query_params.get("after"),
+            int(request.query_params.get("limit", 100)),
+        )
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, 400)
+    return JSONResponse(page, 200)
+
+
+@app.get("/forecasts/{record_id}")
+async def forecast_record(record_id: str):
+    """Same contract as application.forecast_record."""
+    record = await run_in_threadpool(get_forecast_log().get, record_id)
+    if record is None:
+        return JSONResponse({"error": "forecast not found"}, 404)
+    return JSONResponse(record, 200)
+
+
+@app.post("/query")
+async def query(request: Request):
+    """Same contract as application.query."""
+    try:
+        data = await _json_body(request)
+        vector_db_path = data.get("vector_db_path")
+        question = data.get("question")
+        federated = federated_targets(data)
+
+        if not vector_db_path and federated is None:
+            return JSONResponse({"error": "vector_db_path is required"}, 400)
+        if not question:
+            return JSONResponse({"error": "question is required"}, 400)
+
+        if federated is not None:
+            result = await aanswer_question_federated(
+                question=question, retrieval=data.get("retrieval"), **federated
+            )
+        else:
+            result = await aanswer_question(
+                vector_db_path=vector_db_path,
+                question=question,
+                use_cache=not data.get("bypass_cache", False),
+                retrieval=data.get("retrieval"),
+            )
+        return JSONResponse(result, 200)
+
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, 400)
+    except FileNotFoundError as e:
+        return JSONResponse({"error": str(e)}, 404)
+    except Exception as e:
+        return JSONResponse(
+            {"error": "Internal Server Error", "detail": str(e)}, 500
+        )
+
+
+@app.post("/agent")
+async def agent_route(request: Request):
+    """Same contract as application.agent_route."""
+    data = await _json_body(request)
+
+    try:
+        history_msgs, current_user_input = parse_agent_request(data)
+        mode = agent_mode_for(data)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, 400)
+
+    # Deterministic intents (age, weather) go straight to their tool
+    routed = await run_in_threadpool(routed_agent_turn, data)
+    if routed is not None:
+        return JSONResponse(routed, 200)
+
+    # Summarizing old turns calls the LLM synchronously
+    memory, memory_stats = await run_in_threadpool(
+        build_memory, history_msgs, conversation_id_for(data)
+    )
+    agent_executor = build_agent_executor(memory, mode=mode)
+    counter = AgentCallCounter(mode)
+
+    try:
+        result = await agent_executor.ainvoke(
+            {"input": current_user_input},
+            config={"callbacks": [counter, tracing_handler]},
+        )
+        reply = (result.get("output") or "").strip()
+    except ToolException as e:
+        reply = str(e)
+    except Exception as e:
+        return JSONResponse({"error": f"Agent error: {e}"}, 500)
+
+    return JSONResponse({
+        "reply": reply,
+        "append_this_message": {"role": "assistant", "content": reply},
+        "memory": memory_stats,
+        "agent": counter.stats(),
+    }, 200)
+
+
+@app.post("/query/stream")
+async def query_stream(request: Request):
+    """Same contract as application.query_stream (server-sent events)."""
+    data = await _json_body(request)
+    vector_db_path = data.get("vector_db_path")
+    question = data.get("question")
+    federated = federated_targets(data)
+
+    if not vector_db_path and federated is None:
+        return JSONResponse({"error": "vector_db_path is required"}, 400)
+    if not question:
+        return JSONResponse({"error": "question is required"}, 400)
+
+    # The generator blocks on a queue, so Starlette iterates it in a thread
+    if federated is not None:
+        events = stream_events(
+            lambda callbacks: answer_question_federated(
+                question=question,
+                callbacks=callbacks,
+                retrieval=data.get("retrieval"),
+                **federated,
+            )
+        )
+    else:
+        events = stream_events(
+            lambda callbacks: answer_question(
+                vector_db_path=vector_db_path,
+                question=question,
+                callbacks=callbacks,
+                use_cache=not data.get("bypass_cache", False),
+                retrieval=data.get("retrieval"),
+            )
+        )
+    return StreamingResponse(
+        events, media_type="text/event-stream", headers=SSE_HEADERS
+    )
+
+
+@app.post("/agent/stream")
+async def agent_stream(request: Request):
+    """Same contract as application.agent_stream (server-sent events)."""
+    data = await _json_body(request)
+    try:
+        parse_agent_request(data)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, 400)
+
+    events = stream_events(
+        lambda callbacks: run_agent_turn(data, callbacks=callbacks)
+    )
+    return StreamingResponse(
+        events, media_type="text/event-stream", headers=SSE_HEADERS
+    )
@@ -0,0 +1,55 @@
+"""
+Per-request /agent setup cost: rebuilding tools, ChatOpenAI, the ReAct
+agent and the executor every time (old agent_route) vs. reusing the
+AgentFactory and only wrapping the request's memory.
+
+    python -m benchmarks.agent_setup --iterations 200
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from services.agent.agent_service import AgentFactory, get_agent_factory, seed_memory
+
+HISTORY = [
+    {"role": "user", "content": "what is the weather in karachi for 3 days"},
+    {"role": "assistant", "content": "Sunny, highs around 34°C."},
+]
+
+
+def per_request_rebuild(n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        AgentFactory().executor(seed_memory(HISTORY))
+    return (time.perf_counter() - start) / n
+
+
+def per_request_reuse(n: int) -> float:
+    factory = get_agent_factory()
+    start = time.perf_counter()
+    for _ in range(n):
+        factory.executor(seed_memory(HISTORY))
+    return (time.perf_counter() - start) / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    # Warm imports and lazily-built clients before timing
+    per_request_rebuild(3)
+    before = per_request_rebuild(args.iterations)
+    after = per_request_reuse(args.iterations)
+
+    print(f"rebuild per request: {before * 1000:8.3f} ms")
+    print(f"reuse factory:       {after * 1000:8.3f} ms")
+    print(f"speedup:             {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
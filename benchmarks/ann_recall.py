@@ -0,0 +1,90 @@
+"""
+Recall@k vs query latency of the FAISS index types the ingest can build
+(services.vectorstores.faiss_ann.build_index) on synthetic embeddings.
+
+Vectors are unit-normalised draws around --clusters random centres, which
+is closer to text embeddings than uniform noise; queries are perturbed
+corpus vectors. Ground truth is the exact flat index. Queries run one at
+a time on one thread, like a /query request.
+
+    python -m benchmarks.ann_recall --n 100000 --dim 384 --k 10
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import faiss
+import numpy as np
+
+from services.vectorstores.faiss_ann import apply_search_params, build_index, choose_index_type
+
+
+def synthetic(n: int, dim: int, clusters: int, queries: int) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    data = centres[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim), dtype=np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    q = data[rng.choice(n, queries, replace=False)] + 0.05 * rng.standard_normal((queries, dim), dtype=np.float32)
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    return data, q.astype(np.float32)
+
+
+def run_queries(index: faiss.Index, queries: np.ndarray, k: int) -> Tuple[np.ndarray, float]:
+    found = np.empty((len(queries), k), dtype=np.int64)
+    start = time.perf_counter()
+    for i in range(len(queries)):
+        found[i] = index.search(queries[i:i + 1], k)[1][0]
+    return found, (time.perf_counter() - start) / len(queries)
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(1)
+    data, queries = synthetic(args.n, args.dim, args.clusters, args.queries)
+    print(f"n={args.n} dim={args.dim} k={args.k} queries={args.queries} "
+          f"auto choice: {choose_index_type(args.n)}")
+    print(f"{'index':8} {'param':>12} {'build s':>8} {'size MB':>8} {'ms/query':>9} {'recall@k':>9}")
+
+    sweeps: List[Tuple[str, str, List[int]]] = [
+        ("flat", "", [0]),
+        ("ivf", "nprobe", [1, 4, 16, 64]),
+        ("hnsw", "efSearch", [16, 32, 64, 128]),
+        ("ivfpq", "nprobe", [4, 16, 64]),
+    ]
+    truth = None
+    for index_type, param, values in sweeps:
+        start = time.perf_counter()
+        index = build_index(data, index_type)
+        build_s = time.perf_counter() - start
+        size_mb = faiss.serialize_index(index).nbytes / 1e6
+        for value in values:
+            if param == "nprobe":
+                apply_search_params(index, nprobe=value)
+            elif param == "efSearch":
+                apply_search_params(index, ef_search=value)
+            found, latency = run_queries(index, queries, args.k)
+            if truth is None:
+                truth = found
+            label = f"{param}={value}" if param else "exact"
+            print(f"{index_type:8} {label:>12} {build_s:8.2f} {size_mb:8.1f} "
+                  f"{latency * 1000:9.3f} {recall(found, truth):9.3f}")
+
+
+if __name__ == "__main__":
+    main()
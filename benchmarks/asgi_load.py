@@ -0,0 +1,116 @@
+"""
+Load test for /query: Flask (sync, one worker) vs the ASGI app.
+
+A stub chat model sleeps for --llm-latency seconds instead of calling
+OpenAI, and deterministic fake embeddings replace the embeddings API, so
+the numbers reflect serving concurrency rather than model speed.
+
+    python -m benchmarks.asgi_load --requests 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Any, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("API", "bench-key")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import httpx
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from services import query_service
+from services.vectorstores.registry import create_index
+
+
+class StubChatModel(BaseChatModel):
+    latency: float = 0.2
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _result(self) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="stub answer"))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result()
+
+
+def _prepare(llm_latency: float) -> str:
+    embeddings = DeterministicFakeEmbedding(size=64)
+    query_service._get_embeddings = lambda: embeddings
+    query_service._get_llm = lambda streaming=False: StubChatModel(latency=llm_latency)
+
+    store_dir = tempfile.mkdtemp(prefix="bench_store_")
+    texts = [f"Forecast record {i}: sunny, high {20 + i % 10}C" for i in range(200)]
+    vs = create_index(embeddings, "faiss")
+    vs.add(texts, embeddings.embed_documents(texts), [{} for _ in texts])
+    vs.save(store_dir)
+    return store_dir
+
+
+def bench_flask(store_dir: str, n: int) -> float:
+    from application import application
+
+    client = application.test_client()
+    headers = {"API-Key": os.environ["API"]}
+    # Every request reaches the LLM, not the semantic answer cache
+    body = {"vector_db_path": store_dir, "question": "weather next days", "bypass_cache": True}
+    start = time.perf_counter()
+    for _ in range(n):
+        resp = client.post("/query", json=body, headers=headers)
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+    return n / (time.perf_counter() - start)
+
+
+async def bench_asgi(store_dir: str, n: int, concurrency: int) -> float:
+    from asgi_application import app
+
+    headers = {"API-Key": os.environ["API"]}
+    # Every request reaches the LLM, not the semantic answer cache
+    body = {"vector_db_path": store_dir, "question": "weather next days", "bypass_cache": True}
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one() -> None:
+            async with sem:
+                resp = await client.post("/query", json=body, headers=headers)
+                assert resp.status_code == 200, resp.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(n)))
+        return n / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--flask-requests", type=int, default=20)
+    args = parser.parse_args()
+
+    store_dir = _prepare(args.llm_latency)
+    flask_rps = bench_flask(store_dir, args.flask_requests)
+    asgi_rps = asyncio.run(bench_asgi(store_dir, args.requests, args.concurrency))
+
+    print(f"stub LLM latency:       {args.llm_latency * 1000:.0f} ms")
+    print(f"flask (1 worker, sync): {flask_rps:8.1f} req/s")
+    print(f"asgi  (concurrency={args.concurrency}): {asgi_rps:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
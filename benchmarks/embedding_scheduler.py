@@ -0,0 +1,149 @@
+"""
+EmbeddingScheduler against a local fake OpenAI embeddings server.
+
+The server answers POST /v1/embeddings after --latency seconds, returns a
+vector derived from each input's sha256, and rejects every --fail-every'th
+request with 429 + Retry-After. The run checks that every vector comes back
+in input order and compares one serial client against the scheduler.
+
+    python -m benchmarks.embedding_scheduler --texts 2000 --workers 8
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_openai import OpenAIEmbeddings
+
+from services.embedding_scheduler import EmbeddingScheduler
+
+DIM = 8
+
+
+def fake_vector(text: str) -> List[float]:
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [b / 255.0 for b in digest[:DIM]]
+
+
+def make_server(latency: float, fail_every: int) -> ThreadingHTTPServer:
+    counter = {"n": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def _send(self, status: int, body: dict, headers: dict = None) -> None:
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                counter["n"] += 1
+                n = counter["n"]
+            if fail_every and n % fail_every == 0:
+                self._send(
+                    429,
+                    {"error": {"message": "rate limited", "type": "rate_limit"}},
+                    {"Retry-After": "0.05"},
+                )
+                return
+
+            time.sleep(latency)
+            inputs = body["input"]
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            data = []
+            for i, text in enumerate(inputs):
+                vec = fake_vector(text)
+                if body.get("encoding_format") == "base64":
+                    vec = base64.b64encode(array("f", vec).tobytes()).decode("ascii")
+                data.append({"object": "embedding", "index": i, "embedding": vec})
+            self._send(200, {
+                "object": "list",
+                "data": data,
+                "model": body.get("model"),
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+            })
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def client(base_url: str) -> OpenAIEmbeddings:
+    return OpenAIEmbeddings(
+        model="text-embedding-3-small",
+        base_url=base_url,
+        api_key="fake",
+        max_retries=0,
+        check_embedding_ctx_length=False,
+    )
+
+
+def check_order(texts: List[str], vectors: List[List[float]]) -> None:
+    assert len(vectors) == len(texts)
+    for text, vec in zip(texts, vectors):
+        expected = fake_vector(text)
+        assert all(abs(a - b) < 1e-6 for a, b in zip(vec, expected)), text
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--fail-every", type=int, default=7)
+    args = parser.parse_args()
+
+    server = make_server(args.latency, args.fail_every)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    texts = [f"chunk {i}: forecast text " + "x" * (i % 50) for i in range(args.texts)]
+
+    # Baseline: one client, one batch at a time, no 429s injected
+    plain_server = make_server(args.latency, 0)
+    serial = client(f"http://127.0.0.1:{plain_server.server_address[1]}/v1")
+    start = time.perf_counter()
+    vectors = []
+    for i in range(0, len(texts), args.batch_size):
+        vectors.extend(serial.embed_documents(texts[i:i + args.batch_size]))
+    serial_s = time.perf_counter() - start
+    check_order(texts, vectors)
+
+    scheduler = EmbeddingScheduler(
+        client(base_url),
+        max_batch_size=args.batch_size,
+        max_workers=args.workers,
+        base_delay=0.05,
+    )
+    start = time.perf_counter()
+    vectors = scheduler.embed_documents(texts)
+    scheduled_s = time.perf_counter() - start
+    check_order(texts, vectors)
+
+    print(f"texts: {args.texts}, batch size: {args.batch_size}, latency: {args.latency * 1000:.0f} ms")
+    print(f"serial client:           {serial_s:6.2f} s  ({args.texts / serial_s:8.0f} texts/s)")
+    print(f"scheduler ({args.workers} workers):   {scheduled_s:6.2f} s  ({args.texts / scheduled_s:8.0f} texts/s)"
+          f"  with 1/{args.fail_every} requests rate-limited")
+    print(f"scheduler stats: {scheduler.stats()}")
+    print("order check: ok")
+
+
+if __name__ == "__main__":
+    main()
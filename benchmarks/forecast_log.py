@@ -0,0 +1,111 @@
+"""
+Forecast logging on the request path: the old synchronous open/append/close
+of one JSONL file vs ForecastLog.append() (queued, written in batches by a
+background thread), from several request threads at once. Also compares
+finding one record by id: a scan of the JSONL file vs an index seek.
+
+    python -m benchmarks.forecast_log --records 5000 --threads 8
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List
+from uuid import uuid4
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.forecast_log import ForecastLog
+
+
+def make_record(i: int) -> Dict[str, Any]:
+    return {
+        "request_id": str(uuid4()),
+        "resolved_location": f"City {i % 50}, Region",
+        "days_requested": 3,
+        "forecast": [
+            {"date": f"2025-08-{10 + d}", "condition": "Sunny", "high_c": 35.0, "low_c": 28.0}
+            for d in range(3)
+        ],
+        "text": "Weather for City (3 day(s)):\n" + "- Sunny, 35/28°C\n" * 3,
+    }
+
+
+def append_jsonl(path: str, obj: Dict[str, Any]) -> None:
+    # The previous weather_tool.append_jsonl
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(obj, ensure_ascii=False))
+        f.write("\n")
+
+
+def run_threads(append: Callable[[Dict[str, Any]], Any], records: List[Dict[str, Any]], threads: int) -> List[float]:
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+
+    def worker(n: int) -> None:
+        for record in records[n::threads]:
+            start = time.perf_counter()
+            append(record)
+            latencies[n].append(time.perf_counter() - start)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return [x for per_thread in latencies for x in per_thread]
+
+
+def report(name: str, latencies: List[float], wall_s: float) -> None:
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{name:14} {statistics.median(latencies) * 1e6:9.1f} {p99 * 1e6:9.1f} "
+        f"{latencies[-1] * 1e3:8.1f} {len(latencies) / wall_s:12.0f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="forecast_log_")
+    records = [make_record(i) for i in range(args.records)]
+
+    print(f"{'writer':14} {'p50 us':>9} {'p99 us':>9} {'max ms':>8} {'records/s':>12}")
+    jsonl_path = os.path.join(root, "jsonl", "weather_formatted.jsonl")
+    start = time.perf_counter()
+    latencies = run_threads(lambda r: append_jsonl(jsonl_path, r), records, args.threads)
+    report("append_jsonl", latencies, time.perf_counter() - start)
+
+    log = ForecastLog(os.path.join(root, "log"), segment_bytes=4 * 1024 * 1024)
+    start = time.perf_counter()
+    latencies = run_threads(log.append, records, args.threads)
+    log.flush()
+    # Throughput includes draining the queue to disk
+    report("ForecastLog", latencies, time.perf_counter() - start)
+    print(f"segments: {len(log.segments())}, batches: {log.stats()['batches']}")
+
+    wanted = [records[i]["request_id"] for i in range(0, args.records, max(1, args.records // args.lookups))]
+    start = time.perf_counter()
+    for record_id in wanted:
+        with open(jsonl_path, encoding="utf-8") as f:
+            next(line for line in f if json.loads(line)["request_id"] == record_id)
+    scan_ms = (time.perf_counter() - start) / len(wanted) * 1000
+    start = time.perf_counter()
+    for record_id in wanted:
+        assert log.get(record_id)["request_id"] == record_id
+    seek_ms = (time.perf_counter() - start) / len(wanted) * 1000
+    print(f"lookup by id: scan {scan_ms:.3f} ms, index seek {seek_ms:.3f} ms")
+    log.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Cold-load time and RSS of a FAISS store in the pickled-docstore format
+(index.faiss + index.pkl) vs the JSONL docstore format (index.faiss mapped,
+docs.jsonl decoded per hit), on synthetic chunks.
+
+Each load runs in a fresh interpreter that opens the store and answers one
+k=4 query; the parent reports the median of --repeat runs. The page cache
+is warm after the first run, so "cold" means cold process, not cold disk.
+RSS is reported after the load and after the query; a flat index scan
+touches every mapped page, but those pages are file-backed and shared.
+
+    python -m benchmarks.vector_store_load --sizes 10000,100000,1000000 --dim 384
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import faiss
+import numpy as np
+from langchain.schema import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import FakeEmbeddings
+
+from services.vectorstores.faiss_index import FaissIndex
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def build(path: str, n: int, dim: int) -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    index = faiss.IndexFlatL2(dim)
+    index.add(vectors)
+    text = "Forecast for Karachi, Sindh, Pakistan: sunny, max 35C, min 28C. " * 6
+    ids = [f"chunk-{i}" for i in range(n)]
+    docstore = InMemoryDocstore({
+        ids[i]: Document(
+            id=ids[i],
+            page_content=f"{i} {text}",
+            metadata={"source": "synthetic.jsonl", "line": i + 1, "start_index": 0},
+        )
+        for i in range(n)
+    })
+    store = FAISS(FakeEmbeddings(size=dim), index, docstore, dict(enumerate(ids)))
+    store.save_local(os.path.join(path, "pickle"))
+    FaissIndex(store.embedding_function, store).save(os.path.join(path, "jsonl"))
+
+
+def child(fmt: str, path: str, dim: int) -> None:
+    embeddings = FakeEmbeddings(size=dim)
+    query = np.random.default_rng(1).standard_normal(dim, dtype=np.float32).tolist()
+    before = rss_mb()
+    start = time.perf_counter()
+    if fmt == "pickle":
+        store = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+    else:
+        store = FaissIndex.load(path, embeddings).as_vectorstore()
+    loaded = time.perf_counter()
+    rss_loaded = rss_mb() - before
+    hits = store.similarity_search_with_score_by_vector(query, k=4)
+    done = time.perf_counter()
+    assert len(hits) == 4
+    print(json.dumps({
+        "load_s": loaded - start,
+        "query_s": done - loaded,
+        "rss_load_mb": rss_loaded,
+        "rss_mb": rss_mb() - before,
+    }))
+
+
+def measure(fmt: str, path: str, dim: int, repeat: int) -> Dict[str, float]:
+    runs: List[Dict[str, float]] = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.vector_store_load", "--child", fmt, path, "--dim", str(dim)],
+            check=True, capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", nargs=2, metavar=("FORMAT", "PATH"))
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], args.dim)
+        return
+
+    print(f"{'chunks':>9}  {'format':6}  {'disk MB':>8}  {'load ms':>9}  {'query ms':>9}  "
+          f"{'RSS load':>9}  {'RSS query':>9}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        root = tempfile.mkdtemp(prefix="vs-load-")
+        try:
+            build(root, n, args.dim)
+            for fmt in ("pickle", "jsonl"):
+                path = os.path.join(root, fmt)
+                disk = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                m = measure(fmt, path, args.dim, args.repeat)
+                print(f"{n:>9}  {fmt:6}  {disk / 1e6:8.1f}  {m['load_s'] * 1000:9.1f}  "
+                      f"{m['query_s'] * 1000:9.1f}  {m['rss_load_mb']:9.1f}  {m['rss_mb']:9.1f}")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
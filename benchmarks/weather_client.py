@@ -0,0 +1,86 @@
+"""
+WeatherClient against a local stub of WeatherAPI's /forecast.json.
+
+Fires --concurrency identical requests at once (single-flight should turn
+them into one upstream call), then repeats them (cache hits), then asks
+for other cities, and prints the client's hit/miss and upstream latency stats.
+
+    python -m benchmarks.weather_client --concurrency 50 --latency 0.3
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.weather_service import WeatherClient
+
+
+def make_stub(latency: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            query = parse_qs(urlparse(self.path).query)
+            city = query["q"][0].strip().title()
+            days = int(query["days"][0])
+            time.sleep(latency)
+            body = json.dumps({
+                "location": {"name": city, "region": "Sindh", "country": "Pakistan"},
+                "current": {"temp_c": 31.0, "condition": {"text": "Sunny"}},
+                "forecast": {"forecastday": [
+                    {"date": f"2025-08-{10 + d:02d}", "day": {
+                        "maxtemp_c": 35.0, "mintemp_c": 28.0, "avgtemp_c": 31.5,
+                        "daily_chance_of_rain": 10, "condition": {"text": "Sunny"},
+                    }} for d in range(days)
+                ]},
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def burst(client: WeatherClient, location: str, days: int, n: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        list(pool.map(lambda _: client.get_forecast(location, days), range(n)))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    server = make_stub(args.latency)
+    client = WeatherClient(base_url=f"http://127.0.0.1:{server.server_address[1]}")
+
+    cold = burst(client, "Karachi", 3, args.concurrency)
+    print(f"{args.concurrency} concurrent cold requests: {cold * 1000:7.1f} ms, "
+          f"upstream calls: {client.stats()['upstream_calls']}")
+    warm = burst(client, " karachi ", 3, args.concurrency)
+    print(f"{args.concurrency} concurrent warm requests: {warm * 1000:7.1f} ms")
+    for city in ("Lahore", "Islamabad", "Lahore"):
+        client.get_forecast(city, 3)
+
+    stats = client.stats()
+    assert stats["upstream_calls"] == 3, stats
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
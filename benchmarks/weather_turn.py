@@ -0,0 +1,139 @@
+"""
+End-to-end /agent turn latency for a weather question, weather_tool in
+"direct" mode (the forecast is the Observation) vs "rag" mode (index the
+forecast, then retrieval_qa reloads it and asks the LLM again).
+
+Everything remote is stubbed with fixed latencies: WeatherAPI (local HTTP
+stub), the chat model (a scripted ReAct model that follows the prompt's
+PATH=/QUESTION= rule) and the embeddings API. Stores are written under a
+temporary directory.
+
+    python -m benchmarks.weather_turn --turns 5 --llm-latency 0.6 --embed-latency 0.15
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("WEATHER_API", "bench")
+# Relative storage paths (stores, catalog, forecast log) land in a scratch dir
+os.chdir(tempfile.mkdtemp(prefix="weather_turn_"))
+
+from langchain.agents import AgentExecutor, create_react_agent
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import SimpleChatModel
+
+import services.query_service as query_service
+import services.versioned_store as versioned_store
+import services.weather_service as weather_service
+from benchmarks.weather_client import make_stub
+from prompt import prompt_template
+from services.agent.agent_service import seed_memory
+from services.agent.tools.retrievalqa_tool import RetrievalQATool
+from services.agent.tools.weather_tool import weather_tool
+
+CITIES = ["Karachi", "Lahore", "Quetta", "Multan", "Peshawar", "Sukkur", "Hyderabad", "Gwadar"]
+
+
+class StubChat(SimpleChatModel):
+    """Chat model with a fixed latency; the agent instance plays ReAct."""
+
+    latency: float = 0.5
+    react: bool = False
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _call(self, messages: List[Any], stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        self.calls += 1
+        time.sleep(self.latency)
+        if not self.react:
+            return "Sunny, highs around 35°C."
+        prompt = messages[-1].content
+        question = prompt.rsplit("Question:", 1)[1].split("\n", 1)[0].strip()
+        scratchpad = prompt.rsplit("Question:", 1)[1]
+        path = re.search(r"PATH=(\S+)\nQUESTION=(.*)", scratchpad)
+        if path and "retrieval_qa" not in scratchpad:
+            tool_input = json.dumps({"path": path.group(1), "question": path.group(2)})
+            return f"I should read the indexed forecast.\nAction: retrieval_qa\nAction Input: {tool_input}"
+        if "Observation:" in scratchpad:
+            return "I now know the final answer\nFinal Answer: Sunny, highs around 35°C."
+        city = question.split(" in ", 1)[1].split(" for ", 1)[0]
+        tool_input = json.dumps({"location": city, "days": "3", "query": question})
+        return f"I need the forecast.\nAction: weather_tool\nAction Input: {tool_input}"
+
+
+class SlowEmbeddings(DeterministicFakeEmbedding):
+    latency: float = 0.1
+    calls: int = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+
+def run_mode(mode: str, turns: int, llm_latency: float, embeddings: SlowEmbeddings) -> Dict[str, float]:
+    agent_llm = StubChat(latency=llm_latency, react=True)
+    qa_llm = StubChat(latency=llm_latency)
+    query_service._get_llm = lambda streaming=False: qa_llm
+    tools = [RetrievalQATool(), weather_tool(mode=mode)]
+    agent = create_react_agent(agent_llm, tools, prompt_template)
+    embeddings.calls = 0
+
+    times = []
+    for turn in range(turns):
+        city = CITIES[turn % len(CITIES)] + ("" if turn < len(CITIES) else f" {turn}")
+        executor = AgentExecutor(agent=agent, tools=tools, memory=seed_memory([]))
+        start = time.perf_counter()
+        executor.invoke({"input": f"what is the weather in {city} for 3 days"})
+        times.append(time.perf_counter() - start)
+    return {
+        "turn_ms": sum(times) / len(times) * 1000,
+        "llm_calls": (agent_llm.calls + qa_llm.calls) / turns,
+        "embed_calls": embeddings.calls / turns,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.6)
+    parser.add_argument("--embed-latency", type=float, default=0.15)
+    parser.add_argument("--weather-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    server = make_stub(args.weather_latency)
+    weather_service._client = weather_service.WeatherClient(
+        base_url=f"http://127.0.0.1:{server.server_address[1]}"
+    )
+    embeddings = SlowEmbeddings(size=64, latency=args.embed_latency)
+    versioned_store.get_embeddings = lambda model: embeddings
+    query_service._get_embeddings = lambda: embeddings
+
+    print(f"{'mode':8} {'turn ms':>9} {'LLM calls':>10} {'embed calls':>12}")
+    results = {}
+    for mode in ("rag", "direct"):
+        # Fresh forecasts per mode: cached ones would flatter the second run
+        weather_service._client._cache.clear()
+        results[mode] = run_mode(mode, args.turns, args.llm_latency, embeddings)
+        r = results[mode]
+        print(f"{mode:8} {r['turn_ms']:9.1f} {r['llm_calls']:10.1f} {r['embed_calls']:12.1f}")
+    print(f"speedup: {results['rag']['turn_ms'] / results['direct']['turn_ms']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
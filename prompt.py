@@ -1,4 +1,4 @@
-from langchain.prompts import PromptTemplate
+from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
 
 prompt_template = PromptTemplate(
     input_variables=["input", "agent_scratchpad", "tools", "tool_names", "chat_history"],
@@ -34,3 +34,20 @@ Question: {input}
 Thought: {agent_scratchpad}
 """
 )
+
+# For the tool-calling agent: tools and their arguments go through the
+# model's function-calling API, so the prompt carries no format rules
+tool_calling_prompt = ChatPromptTemplate.from_messages([
+    (
+        "system",
+        "You are a helpful assistant. First check the conversation so far; if "
+        "it already answers the question, answer directly. Otherwise call the "
+        "tools the question needs. If a tool reports that something is "
+        "missing, ask the user for it instead of calling other tools. When "
+        "weather_tool returns PATH= and QUESTION=, call retrieval_qa with that "
+        "path and question.\n\n"
+        "Conversation so far (chat_history):\n{chat_history}",
+    ),
+    ("human", "{input}"),
+    MessagesPlaceholder("agent_scratchpad"),
+])
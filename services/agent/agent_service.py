@@ -0,0 +1,310 @@
+import os
+import time
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_openai import ChatOpenAI
+from langchain.agents import AgentExecutor, create_react_agent, create_tool_calling_agent
+from langchain.memory import ConversationBufferMemory
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.tools.base import ToolException
+
+from prompt import prompt_template, tool_calling_prompt
+from services.agent.memory import Turn, build_budgeted_memory
+from services.agent.router import AGENT_ROUTER, ROUTED_LLM_CALLS_AVOIDED, record_decision, route_intent
+from services.agent.tools.age_tool import AgeCalculatorTool
+from services.agent.tools.weather_tool import weather_tool
+from services.agent.tools.retrievalqa_tool import RetrievalQATool
+from services.metrics import TOOL_SECONDS
+from services.tracing import tracing_handler
+
+AGENT_MODES = ("react", "tools")
+# react: free-text ReAct prompt and string tool inputs; tools: native
+# function calling with pydantic argument schemas
+AGENT_MODE = os.getenv("AGENT_MODE", "react")
+# Per-turn caps; past either the executor returns what it has
+AGENT_MAX_ITERATIONS = int(os.getenv("AGENT_MAX_ITERATIONS", "8"))
+AGENT_MAX_EXECUTION_S = float(os.getenv("AGENT_MAX_EXECUTION_S", "60"))
+
+
+def agent_mode_for(data: Dict[str, Any]) -> str:
+    """Request's "agent_mode", else AGENT_MODE. Raises ValueError if unknown."""
+    mode = data.get("agent_mode") or AGENT_MODE
+    if mode not in AGENT_MODES:
+        raise ValueError(f"agent_mode must be one of {AGENT_MODES}")
+    return mode
+
+
+class AgentCallCounter(BaseCallbackHandler):
+    """
+    Counts the agent's own LLM round trips and tool calls in one turn.
+    LLM calls made inside tools (retrieval_qa's chain) run without the
+    turn's callbacks and are not included.
+    """
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.llm_calls = 0
+        self.tool_calls = 0
+        self._started = time.perf_counter()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, **kwargs: Any) -> None:
+        self.llm_calls += 1
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        self.llm_calls += 1
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        self.tool_calls += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "llm_calls": self.llm_calls,
+            "tool_calls": self.tool_calls,
+            "duration_ms": round((time.perf_counter() - self._started) * 1000, 1),
+        }
+
+
+def parse_agent_request(data: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Split the client transcript into (history, current user input).
+    Raises ValueError when the last item is not a non-empty user message.
+    """
+    messages = data.get("messages") or []
+    last = messages[-1] if messages else {}
+    if last.get("role") != "user" or not (last.get("content") or "").strip():
+        raise ValueError(
+            "Last item in `messages` must be a user message with "
+            "non-empty `content`"
+        )
+    # seed memory from the history, run the agent on the last turn
+    return messages[:-1], last["content"].strip()
+
+
+def _pair_turns(history_msgs: List[Dict[str, Any]]) -> List[Turn]:
+    # Pair user→assistant turns; system and unmatched messages are ignored
+    turns: List[Turn] = []
+    buffered_user_input = None
+    for m in history_msgs:
+        role = (m.get("role") or "").strip().lower()
+        content = (m.get("content") or "").strip()
+        if not content:
+            continue
+        if role == "user":
+            buffered_user_input = content
+        elif role == "assistant" and buffered_user_input is not None:
+            turns.append((buffered_user_input, content))
+            buffered_user_input = None
+    return turns
+
+
+def conversation_id_for(data: Dict[str, Any]) -> str:
+    """Client-supplied `conversation_id`, else a hash of the opening user message."""
+    if data.get("conversation_id"):
+        return str(data["conversation_id"])
+    messages = data.get("messages") or []
+    first = next(
+        (m.get("content") or "" for m in messages if m.get("role") == "user"), ""
+    )
+    return hashlib.sha256(first.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def seed_memory(history_msgs: List[Dict[str, Any]]) -> ConversationBufferMemory:
+    """Whole transcript, verbatim, as ConversationBufferMemory."""
+    memory = ConversationBufferMemory(
+        memory_key="chat_history",
+        return_messages=False,
+        output_key="output"
+    )
+    memory.chat_memory.clear()
+    for user_input, output in _pair_turns(history_msgs):
+        memory.save_context({"input": user_input}, {"output": output})
+    return memory
+
+
+def build_memory(
+    history_msgs: List[Dict[str, Any]], conversation_id: str
+) -> Tuple[ConversationBufferMemory, Dict[str, Any]]:
+    """
+    Token-budgeted memory for /agent: recent turns verbatim, older ones
+    summarized (cached per conversation). Also returns token savings.
+    """
+    return build_budgeted_memory(
+        _pair_turns(history_msgs), conversation_id, get_agent_factory().llm
+    )
+
+
+class AgentFactory:
+    """
+    Builds the immutable agent pieces once (tools, ChatOpenAI client with its
+    HTTP connection pool, the ReAct and tool-calling runnables) and hands out
+    a cheap AgentExecutor per request around that request's memory.
+    """
+
+    def __init__(self):
+        self.tools = [
+            AgeCalculatorTool(handle_tool_error=False),
+            RetrievalQATool(),
+            weather_tool(),
+        ]
+
+        # ---- LLM
+        self.llm = ChatOpenAI(
+            model="gpt-4o-mini", temperature=0.0, callbacks=[tracing_handler]
+        )
+        # Same model, but invoke() emits tokens to callbacks (SSE endpoints)
+        self.streaming_llm = ChatOpenAI(
+            model="gpt-4o-mini",
+            temperature=0.0,
+            streaming=True,
+            stream_usage=True,
+            callbacks=[tracing_handler],
+        )
+
+        # ---- Build agent with your custom prompt
+        self.agent = create_react_agent(self.llm, self.tools, prompt_template)
+        self.streaming_agent = create_react_agent(
+            self.streaming_llm, self.tools, prompt_template
+        )
+
+        # ---- Tool-calling agent over the same tools with typed arguments
+        self.structured_tools = [t.as_structured_tool() for t in self.tools]
+        self.tool_agent = create_tool_calling_agent(
+            self.llm, self.structured_tools, tool_calling_prompt
+        )
+        self.streaming_tool_agent = create_tool_calling_agent(
+            self.streaming_llm, self.structured_tools, tool_calling_prompt
+        )
+
+    def executor(
+        self,
+        memory: ConversationBufferMemory,
+        streaming: bool = False,
+        mode: Optional[str] = None,
+    ) -> AgentExecutor:
+        if (mode or AGENT_MODE) == "tools":
+            agent = self.streaming_tool_agent if streaming else self.tool_agent
+            tools = self.structured_tools
+        else:
+            agent = self.streaming_agent if streaming else self.agent
+            tools = self.tools
+        return AgentExecutor(
+            agent=agent,
+            tools=tools,
+            memory=memory,
+            verbose=True,
+            handle_parsing_errors=True,
+            max_iterations=AGENT_MAX_ITERATIONS,
+            max_execution_time=AGENT_MAX_EXECUTION_S,
+        )
+
+
+_factory: Optional[AgentFactory] = None
+_factory_lock = threading.Lock()
+
+
+def get_agent_factory() -> AgentFactory:
+    global _factory
+    with _factory_lock:
+        if _factory is None:
+            _factory = AgentFactory()
+        return _factory
+
+
+def build_agent_executor(
+    memory: ConversationBufferMemory, streaming: bool = False, mode: Optional[str] = None
+) -> AgentExecutor:
+    """Per-request executor over the process-wide agent, tools and LLM."""
+    return get_agent_factory().executor(memory, streaming=streaming, mode=mode)
+
+
+def routed_agent_turn(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    The /agent response for a request the intent router answers with one
+    direct tool call (no LLM), or None when the agent should handle it.
+    Disabled by AGENT_ROUTER=0 or "router": false in the request.
+    """
+    if not AGENT_ROUTER or data.get("router") is False:
+        return None
+    _, current_user_input = parse_agent_request(data)
+    conversation_id = conversation_id_for(data)
+    tools = {t.name: t for t in get_agent_factory().tools}
+    started = time.perf_counter()
+    route, reason = route_intent(current_user_input)
+    if route is not None and route[1] == "weather_tool" and tools["weather_tool"].mode != "direct":
+        # rag mode answers through retrieval_qa and its LLM anyway
+        route, reason = None, "weather_tool is in rag mode"
+    if route is None:
+        record_decision(None, reason, conversation_id=conversation_id)
+        return None
+
+    intent, tool_name, args = route
+    status = "ok"
+    try:
+        if intent == "age":
+            age = tools[tool_name].calculate(**args)
+            reply = f"Age: {age} years (born {args['year']}-{args['month']:02d}-{args['day']:02d})."
+        else:
+            reply = tools[tool_name].forecast(**args).strip()
+    except ToolException as e:
+        reply, status = str(e), "error"
+    except Exception as e:
+        # Let the agent retry (and report) what the direct call could not do
+        TOOL_SECONDS.observe(time.perf_counter() - started, tool=tool_name, status="error")
+        record_decision(None, f"{tool_name} failed: {e}", conversation_id=conversation_id)
+        return None
+    TOOL_SECONDS.observe(time.perf_counter() - started, tool=tool_name, status=status)
+    duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    record_decision(route, reason, conversation_id=conversation_id, duration_ms=duration_ms)
+
+    return {
+        "reply": reply,
+        "append_this_message": {"role": "assistant", "content": reply},
+        # Nothing from the history is sent anywhere on this path
+        "memory": {"conversation_id": conversation_id, "history_tokens_sent": 0},
+        "agent": {
+            "mode": "router",
+            "intent": intent,
+            "llm_calls": 0,
+            "llm_calls_avoided": ROUTED_LLM_CALLS_AVOIDED,
+            "tool_calls": 1,
+            "duration_ms": duration_ms,
+        },
+    }
+
+
+def run_agent_turn(
+    data: Dict[str, Any],
+    callbacks: Optional[List[BaseCallbackHandler]] = None,
+) -> Dict[str, Any]:
+    """
+    One /agent turn end to end, returning the /agent response body.
+    With callbacks, the agent's LLM streams and tool events reach them.
+    Raises ValueError for an invalid transcript or agent_mode.
+    """
+    history_msgs, current_user_input = parse_agent_request(data)
+    mode = agent_mode_for(data)
+    routed = routed_agent_turn(data)
+    if routed is not None:
+        return routed
+    memory, memory_stats = build_memory(history_msgs, conversation_id_for(data))
+    agent_executor = build_agent_executor(memory, streaming=bool(callbacks), mode=mode)
+    counter = AgentCallCounter(mode)
+
+    try:
+        result = agent_executor.invoke(
+            {"input": current_user_input},
+            config={"callbacks": [*(callbacks or []), counter, tracing_handler]},
+        )
+        reply = (result.get("output") or "").strip()
+    except ToolException as e:
+        reply = str(e)
+
+    return {
+        "reply": reply,
+        "append_this_message": {"role": "assistant", "content": reply},
+        "memory": memory_stats,
+        "agent": counter.stats(),
+    }
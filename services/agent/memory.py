@@ -0,0 +1,149 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.memory import ConversationBufferMemory
+from langchain.schema import SystemMessage
+from langchain_core.language_models import BaseChatModel
+
+from services.tokens import count_tokens
+
+AGENT_HISTORY_TOKEN_BUDGET = int(os.getenv("AGENT_HISTORY_TOKEN_BUDGET", "1500"))
+# Share of the budget the summary of older turns may take
+SUMMARY_BUDGET_RATIO = 0.25
+SUMMARY_CACHE_SIZE = int(os.getenv("AGENT_SUMMARY_CACHE_SIZE", "1024"))
+
+Turn = Tuple[str, str]
+
+SUMMARY_PROMPT = (
+    "Progressively summarize the conversation below, adding onto the "
+    "previous summary, and return the new summary. Keep names, dates, "
+    "locations, numbers and answers already given. At most {max_words} "
+    "words.\n\n"
+    "Previous summary:\n{summary}\n\n"
+    "New lines of conversation:\n{lines}\n\n"
+    "New summary:"
+)
+
+
+def render_turn(turn: Turn) -> str:
+    # Same line format ConversationBufferMemory uses for {chat_history}
+    return f"Human: {turn[0]}\nAI: {turn[1]}"
+
+
+def _turns_hash(turns: List[Turn]) -> str:
+    h = hashlib.sha256()
+    for user, assistant in turns:
+        h.update(user.encode("utf-8") + b"\0" + assistant.encode("utf-8") + b"\0")
+    return h.hexdigest()
+
+
+class SummaryCache:
+    """
+    conversation_id → (turns covered, hash of those turns, summary).
+    A later request whose older turns extend the cached prefix only
+    summarizes the new turns on top of the cached summary.
+    """
+
+    def __init__(self, max_entries: int = SUMMARY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[int, str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: str) -> Optional[Tuple[int, str, str]]:
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None:
+                self._entries.move_to_end(conversation_id)
+            return entry
+
+    def put(self, conversation_id: str, covered: int, turns_hash: str, summary: str) -> None:
+        with self._lock:
+            self._entries[conversation_id] = (covered, turns_hash, summary)
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_summary_cache = SummaryCache()
+
+
+def _summarize(
+    llm: BaseChatModel, conversation_id: str, older: List[Turn], max_tokens: int
+) -> Tuple[str, bool]:
+    """Summary of `older`, reusing the cached summary of its prefix. Returns (summary, cache_hit)."""
+    cached = _summary_cache.get(conversation_id)
+    summary, start = "", 0
+    if cached is not None:
+        covered, covered_hash, cached_summary = cached
+        if covered <= len(older) and _turns_hash(older[:covered]) == covered_hash:
+            if covered == len(older):
+                return cached_summary, True
+            summary, start = cached_summary, covered
+
+    prompt = SUMMARY_PROMPT.format(
+        max_words=max(20, int(max_tokens * 0.75)),
+        summary=summary or "(none)",
+        lines="\n".join(render_turn(t) for t in older[start:]),
+    )
+    new_summary = (llm.invoke(prompt).content or "").strip()
+    _summary_cache.put(conversation_id, len(older), _turns_hash(older), new_summary)
+    return new_summary, False
+
+
+def build_budgeted_memory(
+    turns: List[Turn],
+    conversation_id: str,
+    llm: BaseChatModel,
+    token_budget: int = AGENT_HISTORY_TOKEN_BUDGET,
+) -> Tuple[ConversationBufferMemory, Dict[str, Any]]:
+    """
+    Memory whose {chat_history} fits `token_budget`: the most recent turns
+    verbatim, older turns collapsed into a summary cached per conversation.
+    Returns the memory and prompt-token accounting for the response.
+    """
+    memory = ConversationBufferMemory(
+        memory_key="chat_history",
+        return_messages=False,
+        output_key="output"
+    )
+    memory.chat_memory.clear()
+
+    turn_tokens = [count_tokens(render_turn(t)) for t in turns]
+    full_tokens = sum(turn_tokens)
+
+    # Newest turns first, until the verbatim share of the budget is spent
+    split = len(turns)
+    if full_tokens > token_budget:
+        verbatim_budget = token_budget - int(token_budget * SUMMARY_BUDGET_RATIO)
+        used = 0
+        while split > 0 and used + turn_tokens[split - 1] <= verbatim_budget:
+            used += turn_tokens[split - 1]
+            split -= 1
+    older, recent = turns[:split], turns[split:]
+
+    summary, summary_cached = "", False
+    if older:
+        summary, summary_cached = _summarize(
+            llm, conversation_id, older, int(token_budget * SUMMARY_BUDGET_RATIO)
+        )
+        memory.chat_memory.add_message(
+            SystemMessage(content=f"Summary of earlier conversation: {summary}")
+        )
+    for user, assistant in recent:
+        memory.save_context({"input": user}, {"output": assistant})
+
+    sent_tokens = count_tokens(memory.buffer_as_str)
+    stats = {
+        "conversation_id": conversation_id,
+        "token_budget": token_budget,
+        "history_tokens_full": full_tokens,
+        "history_tokens_sent": sent_tokens,
+        "prompt_tokens_saved": max(0, full_tokens - sent_tokens),
+        "turns_verbatim": len(recent),
+        "turns_summarized": len(older),
+        "summary_cached": summary_cached,
+    }
+    return memory, stats
@@ -0,0 +1,187 @@
+import os
+import re
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.metrics import ROUTER_DECISIONS, ROUTER_LLM_CALLS_AVOIDED
+
+logger = logging.getLogger(__name__)
+
+# Answer high-confidence age/weather requests without the agent's LLM
+AGENT_ROUTER = os.getenv("AGENT_ROUTER", "1").lower() in ("1", "true", "yes")
+# Longer messages tend to carry several asks; leave those to the agent
+ROUTER_MAX_WORDS = int(os.getenv("ROUTER_MAX_WORDS", "30"))
+# The agent's minimum for a single tool call: the Action, then the answer
+ROUTED_LLM_CALLS_AVOIDED = 2
+
+# (intent, tool name, tool arguments) of a request the router will answer
+Route = Tuple[str, str, Dict[str, Any]]
+
+MONTHS = {
+    name: i
+    for i, names in enumerate(
+        [("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+         ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+         ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"),
+         ("dec", "december")],
+        start=1,
+    )
+    for name in names
+}
+_MONTH = r"(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?"
+_DAY = r"(\d{1,2})(?:st|nd|rd|th)?"
+
+# Each pattern yields (year, month, day) strings through its converter
+_DATE_PATTERNS = [
+    (re.compile(r"\b(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\b"), lambda m: (m[1], m[2], m[3])),
+    (re.compile(rf"\b{_DAY}\s+(?:of\s+)?{_MONTH},?\s+(\d{{4}})\b", re.I), lambda m: (m[3], m[2], m[1])),
+    (re.compile(rf"\b{_MONTH}\s+{_DAY},?\s+(\d{{4}})\b", re.I), lambda m: (m[3], m[1], m[2])),
+]
+# dd/mm/yyyy or mm/dd/yyyy: only used when one reading is impossible
+_NUMERIC_DATE = re.compile(r"\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})\b")
+
+_AGE_CUES = re.compile(r"\b(how old|age|years old)\b", re.I)
+# ...of a person, not of a building or a game
+_PERSON_CUES = re.compile(r"\b(born|birth|birthday|dob|am i|my age)\b", re.I)
+# Ages at another date, or between two dates: not what age_calculator does
+_AGE_UNSURE = re.compile(r"\b(will|would|going to|was i|when|between|difference|until)\b", re.I)
+
+_WEATHER_WORDS = {"weather", "forecast", "temperature"}
+_WEATHER_CUES = re.compile(r"\b(" + "|".join(_WEATHER_WORDS) + r")\b", re.I)
+_LOCATION = re.compile(r"\b(?:in|for|at)\s+([a-z][a-z'.-]*(?:\s+[a-z][a-z'.-]*){0,2})", re.I)
+# Words that end a location name: a name stops at the first preposition,
+# pronoun or time word after it ("karachi in 3 days" -> "karachi")
+_LOCATION_STOP = {
+    "the", "a", "next", "this", "coming", "today", "tomorrow", "tonight", "week",
+    "weekend", "days", "day", "over", "on", "during", "of", "now", "please",
+    "in", "at", "for", "from", "to", "by", "near", "with", "around", "about", "like",
+    "me", "my", "i", "you", "your", "we", "us", "our", "it", "is", "be", "will",
+}
+# A name followed by one of these is the start of a list of places
+_CONJUNCTIONS = {"and", "or", "&"}
+_LIST_AFTER = re.compile(r"\s*(?:[,&]|(?:and|or)\b)", re.I)
+# Places the weather API cannot resolve: these go to the agent to ask
+_NOT_PLACES = {
+    "home", "work", "office", "school", "general", "here", "there", "outside",
+    "inside", "town", "city", "area", "location", "place", "everywhere", "us",
+}
+_DAYS = [
+    (re.compile(r"\b(\d{1,2})[\s-]*days?\b", re.I), lambda m: int(m[1])),
+    (re.compile(r"\b(week|7 day)\b", re.I), lambda m: 7),
+    (re.compile(r"\btomorrow\b", re.I), lambda m: 2),
+    (re.compile(r"\b(today|tonight|now)\b", re.I), lambda m: 1),
+]
+
+
+def _birth_dates(text: str) -> List[date]:
+    found = set()
+    for pattern, parts in _DATE_PATTERNS:
+        for m in pattern.finditer(text):
+            year, month, day = parts(m)
+            month = MONTHS[month.lower()] if not month.isdigit() else int(month)
+            try:
+                found.add(date(int(year), month, int(day)))
+            except ValueError:
+                continue
+    for m in _NUMERIC_DATE.finditer(text):
+        first, second, year = int(m[1]), int(m[2]), int(m[3])
+        readings = set()
+        for day, month in ((first, second), (second, first)):
+            try:
+                readings.add(date(year, month, day))
+            except ValueError:
+                continue
+        if len(readings) > 1:
+            return []  # 03/04/2001: the agent asks, we do not guess
+        found.update(readings)
+    return sorted(found)
+
+
+def _age_route(text: str) -> Optional[Route]:
+    if not (_AGE_CUES.search(text) and _PERSON_CUES.search(text)) or _AGE_UNSURE.search(text):
+        return None
+    dates = _birth_dates(text)
+    if len(dates) != 1 or dates[0] > date.today():
+        return None
+    born = dates[0]
+    return "age", "age_calculator", {"year": born.year, "month": born.month, "day": born.day}
+
+
+def _location_names(text: str) -> Tuple[set, bool]:
+    """Location names in `text`, and whether any starts a list of places."""
+    names, listed = set(), False
+    for m in _LOCATION.finditer(text):
+        words = []
+        for word in m[1].split():
+            if word.lower() in _CONJUNCTIONS:
+                listed = True
+                break
+            if word.lower() in _LOCATION_STOP or word.lower() in _WEATHER_WORDS:
+                break
+            words.append(word.strip(".'"))
+        else:
+            # "lahore, karachi" or "lahore & karachi": the capture stops at the mark
+            listed = listed or bool(_LIST_AFTER.match(text, m.end()))
+        if words:
+            names.add(" ".join(words).lower())
+    return names, listed
+
+
+def _location(text: str) -> Optional[str]:
+    names, listed = _location_names(text)
+    if listed or names & _NOT_PLACES:
+        return None
+    return names.pop() if len(names) == 1 else None
+
+
+def _days(text: str) -> Optional[int]:
+    found = {days(m) for pattern, days in _DAYS for m in pattern.finditer(text)}
+    if len(found) != 1:
+        return None
+    days = found.pop()
+    return days if 1 <= days <= 10 else None
+
+
+def _weather_route(text: str) -> Optional[Route]:
+    if not _WEATHER_CUES.search(text):
+        return None
+    location, days = _location(text), _days(text)
+    if not location or not days:
+        return None
+    return "weather", "weather_tool", {"location": location, "days": days, "query": text}
+
+
+def route_intent(text: str) -> Tuple[Optional[Route], str]:
+    """
+    (route, reason): the tool call that answers `text` when exactly one
+    deterministic intent matches with all its arguments, else (None, why).
+    """
+    if len(text.split()) > ROUTER_MAX_WORDS or text.count("?") > 1:
+        return None, "long or multi-part message"
+    routes = [r for r in (_age_route(text), _weather_route(text)) if r is not None]
+    if len(routes) > 1:
+        return None, "several intents"
+    if not routes:
+        if _WEATHER_CUES.search(text):
+            names, listed = _location_names(text)
+            if listed or len(names) > 1:
+                return None, "several locations"
+        return None, "no confident intent"
+    return routes[0], "matched"
+
+
+def record_decision(route: Optional[Route], reason: str, **extra: Any) -> None:
+    """Count (in services.metrics) and log one router decision."""
+    decision = "tool" if route else "agent"
+    ROUTER_DECISIONS.inc(decision=decision, intent=route[0] if route else "none")
+    if route:
+        ROUTER_LLM_CALLS_AVOIDED.inc(ROUTED_LLM_CALLS_AVOIDED)
+    logger.info("agent_router", extra={"fields": {
+        "decision": decision,
+        "intent": route[0] if route else None,
+        "tool": route[1] if route else None,
+        "reason": reason,
+        "llm_calls_avoided": ROUTED_LLM_CALLS_AVOIDED if route else 0,
+        **extra,
+    }})
@@ -1,6 +1,19 @@
 from datetime import datetime, date
-from langchain.tools import BaseTool
+from typing import Optional
+from langchain.tools import BaseTool, StructuredTool
+from pydantic import BaseModel, Field
+from services.tracing import log_event
 import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AgeInput(BaseModel):
+    """Arguments of age_calculator for tool-calling agents."""
+    year: Optional[int] = Field(None, description="Birth year, omit if the user did not give it")
+    month: Optional[int] = Field(None, ge=1, le=12, description="Birth month number, omit if not given")
+    day: Optional[int] = Field(None, ge=1, le=31, description="Birth day of month, omit if not given")
 
 
 class AgeCalculatorTool(BaseTool):
@@ -23,9 +36,8 @@ class AgeCalculatorTool(BaseTool):
     return_direct: bool = False
 
     def _run(self, tool_input: str) -> str:
-        print("before strip", tool_input)
+        log_event(logger, "age_tool_input", tool_input=tool_input)
         tool_input = tool_input.strip("'")
-        print("after strip", tool_input)
         data_tool = json.loads(tool_input)
         if data_tool['year'].lower() == "nan":
             return "Your birth year is missing please provide that"
@@ -33,8 +45,20 @@ class AgeCalculatorTool(BaseTool):
             return "Your birth month is missing please provide that"
         elif data_tool['day'].lower() == "nan":
             return "Your birth day is missing please provide that"
-        dob_str = f"{data_tool['day']} {data_tool['month']} {data_tool['year']}"
-        print(dob_str)
+        return self.calculate(int(data_tool['year']), int(data_tool['month']), int(data_tool['day']))
+
+    def calculate(
+        self, year: Optional[int] = None, month: Optional[int] = None, day: Optional[int] = None
+    ):
+        """Age today of someone born on year-month-day."""
+        if year is None:
+            return "Your birth year is missing please provide that"
+        elif month is None:
+            return "Your birth month is missing please provide that"
+        elif day is None:
+            return "Your birth day is missing please provide that"
+        dob_str = f"{day} {month} {year}"
+        log_event(logger, "age_tool_dob", dob=dob_str)
 
         birthdate = datetime.strptime(dob_str, "%d %m %Y").date()
 
@@ -45,3 +69,13 @@ class AgeCalculatorTool(BaseTool):
             - ((today.month, today.day) < (birthdate.month, birthdate.day))
         )
         return age
+
+    def as_structured_tool(self) -> StructuredTool:
+        """Same tool with typed arguments, for tool-calling agents."""
+        return StructuredTool.from_function(
+            func=self.calculate,
+            name=self.name,
+            description="Calculate the user's age in years from their date of birth.",
+            args_schema=AgeInput,
+            handle_validation_error=True,
+        )
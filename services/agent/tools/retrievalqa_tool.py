@@ -1,7 +1,21 @@
-from langchain.tools import BaseTool
-from services.query_service import answer_question
+import logging
+from typing import List, Optional
+from langchain.tools import BaseTool, StructuredTool
+from pydantic import BaseModel, Field
+from services.query_service import answer_question, answer_question_federated
+from services.tracing import log_event
 import json
 
+logger = logging.getLogger(__name__)
+
+
+class RetrievalQAInput(BaseModel):
+    """Arguments of retrieval_qa for tool-calling agents."""
+    question: str = Field(..., description="The question to answer from the database(s)")
+    path: Optional[str] = Field(None, description="Vector database path, e.g. a PATH= value")
+    paths: Optional[List[str]] = Field(None, description="Several database paths to search at once")
+    tag: Optional[str] = Field(None, description="Search every database with this tag, e.g. 'weather'")
+
 
 class RetrievalQATool(BaseTool):
     """
@@ -24,22 +38,26 @@ class RetrievalQATool(BaseTool):
         "Example input: "
         "{'path': './storage/vectordb/weather/karachi_4/faiss/7adb2109d14d4581b742f307957b1c49', "
         "'question': 'weather in Karachi for the next 4 days'}"
+        "To answer from several databases at once, 'path' may be a list of paths, "
+        "or pass 'tag' instead of 'path' (e.g. {'tag': 'weather', 'question': '...'}) "
+        "to search every stored database with that tag. "
         "if any of the key value is missing then pass the value exactly as "
         "'nan' for that key, for example if value for 'path' is missing"
         " then the input to the tool shoud be like {'path': 'nan', 'question': 'question string'} "
     )
 
     def _run(self, tool_input: str) -> str:
-        print("siuuuuu tool triggered", tool_input)
+        log_event(logger, "retrieval_qa_input", tool_input=tool_input)
         data = tool_input.strip("'")
         data = json.loads(data)
+        if data.get('tag') and data.get('tag') != 'nan':
+            return self._run_federated(data.get('path'), data['tag'], data.get('question'))
+        if isinstance(data.get('path'), list):
+            return self._run_federated(data['path'], None, data.get('question'))
         if data['path'] == 'nan':
             return "path missing"
         if data['question'] == 'nan':
             return "question missing"
-        print("\n\n\n\nthis si the path:", data['path'])
-        print("\n\n\n\nthis si the question:", data['question'])
-
         path = data['path']
         question = data['question']
 
@@ -58,3 +76,45 @@ class RetrievalQATool(BaseTool):
         result = answer_question(vector_db_path=path, question=question)
         return (result.get("answer", "") or
                 "I don't know based on the provided documents.")
+
+    def _run_federated(self, paths, tag, question) -> str:
+        if not question or question == 'nan':
+            return "question missing"
+        paths = [] if paths in (None, 'nan') else paths
+        paths = [paths] if isinstance(paths, str) else paths
+        result = answer_question_federated(
+            vector_db_paths=[p.strip().strip("'\"") for p in paths],
+            tag=tag,
+            question=question,
+        )
+        return (result.get("answer", "") or
+                "I don't know based on the provided documents.")
+
+    def answer(
+        self,
+        question: str,
+        path: Optional[str] = None,
+        paths: Optional[List[str]] = None,
+        tag: Optional[str] = None,
+    ) -> str:
+        """Answer from one store, or from several (paths and/or tag)."""
+        if paths or tag:
+            return self._run_federated(([path] if path else []) + list(paths or []), tag, question)
+        if not path:
+            return "path missing"
+        result = answer_question(vector_db_path=path, question=question)
+        return (result.get("answer", "") or
+                "I don't know based on the provided documents.")
+
+    def as_structured_tool(self) -> StructuredTool:
+        """Same tool with typed arguments, for tool-calling agents."""
+        return StructuredTool.from_function(
+            func=self.answer,
+            name=self.name,
+            description=(
+                "Answer a question strictly from vector databases (RAG): one "
+                "'path', several 'paths', or every database with a 'tag'."
+            ),
+            args_schema=RetrievalQAInput,
+            handle_validation_error=True,
+        )
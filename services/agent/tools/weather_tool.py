@@ -1,18 +1,37 @@
-from langchain.tools import BaseTool
+from langchain.tools import BaseTool, StructuredTool
 import os
 import re
 from typing import ClassVar, Optional, List, Any, Dict
 import json
-import requests
+import logging
 from dotenv import load_dotenv
 from langchain.tools.base import ToolException
 from pydantic import BaseModel, Field
 from datetime import datetime
 from uuid import uuid4
-from services.ingest_service import build_vector_db_from_json
+from services.ingest_service import record_to_document
+from services.versioned_store import upsert_records
+from services.weather_service import get_weather_client
+from services.forecast_log import get_forecast_log
+from services.tracing import log_event
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+WEATHER_TOOL_MODES = ("direct", "rag")
+# direct: the compact forecast is the tool's Observation (no embeddings, no
+# index, no retrieval_qa hop). rag: index the forecast in the location's
+# store and return PATH=/QUESTION= for retrieval_qa
+WEATHER_TOOL_MODE = os.getenv("WEATHER_TOOL_MODE", "direct")
+
+
+class WeatherInput(BaseModel):
+    """Arguments of weather_tool for tool-calling agents."""
+    location: Optional[str] = Field(None, description="City or country name, omit if not given")
+    days: Optional[int] = Field(None, ge=1, le=10, description="Number of forecast days, omit if not given")
+    query: str = Field(..., description="The user's weather question, verbatim")
+
 
 class weather_tool(BaseTool):
     """
@@ -29,7 +48,8 @@ class weather_tool(BaseTool):
         query (str): Natural weather question from the user.
 
     Returns:
-        str: A concise weather summary for each forecast day.
+        str: A concise weather summary for each forecast day ("direct"
+        mode), or PATH=/QUESTION= of the location's indexed store ("rag").
     """
 
     name: str = "weather_tool"
@@ -49,18 +69,20 @@ class weather_tool(BaseTool):
         "Make sure that the JSON object is passed as a string (not as a raw JSON object)."
     )
     return_direct: bool = False
+    mode: str = WEATHER_TOOL_MODE
 
     def check_api_key(self):
         if not os.getenv("WEATHER_API"):
             raise ToolException("WEATHER_API_KEY is not set")
 
-    def append_jsonl(self, path: str, obj: Dict[str, Any]) -> None:
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(obj, ensure_ascii=False))
-            f.write("\n")
-
-    def _format_forecast(self, loc_name: str, days: int, data: dict) -> str:
+    def _normalize_forecast(
+        self, loc_name: str, days: int, data: dict
+    ) -> Dict[str, Any]:
+        """
+        Compact, JSON-serializable record of a WeatherAPI response. Its
+        "text" (or "message" when there is no forecast) is the readable
+        summary.
+        """
         loc = data.get("location", {}) or {}
         resolved = (
             f"{loc.get('name', loc_name)}, {loc.get('region', '').strip()}"
@@ -69,21 +91,17 @@ class weather_tool(BaseTool):
         fcast = ((data.get("forecast", {}) or {}).get("forecastday") or [])
         if not fcast:
             msg = f"No forecast data returned for {resolved} (days={days})."
-            self.append_jsonl(
-                "./data/weather/weather_formatted.jsonl",
-                {
-                    "request_id": data.get("request_id") or str(uuid4()),
-                    "timestamp_utc": (
-                        datetime.utcnow().isoformat(timespec="seconds") + "Z"
-                    ),
-                    "resolved_location": resolved,
-                    "days_requested": days,
-                    "current": None,
-                    "forecast": [],
-                    "message": msg,
-                },
-            )
-            return msg
+            return {
+                "request_id": data.get("request_id") or str(uuid4()),
+                "timestamp_utc": (
+                    datetime.utcnow().isoformat(timespec="seconds") + "Z"
+                ),
+                "resolved_location": resolved,
+                "days_requested": days,
+                "current": None,
+                "forecast": [],
+                "message": msg,
+            }
 
         lines: List[str] = []
         header_days = min(days, len(fcast))
@@ -153,8 +171,30 @@ class weather_tool(BaseTool):
             "forecast": compact_days,
             "text": "\n".join(lines),
         }
-        self.append_jsonl("./data/weather/weather_formatted.jsonl", formatted_payload)
+        return formatted_payload
 
+    def _compact_observation(self, payload: Dict[str, Any]) -> str:
+        """One line per forecast day, built from the normalized payload."""
+        forecast = payload.get("forecast") or []
+        if not forecast:
+            return payload.get("message") or payload.get("text") or ""
+        lines = [f"Weather for {payload['resolved_location']} ({len(forecast)} day(s))"]
+        current = payload.get("current") or {}
+        now = [
+            current.get("condition"),
+            f"{current['temp_c']}°C" if current.get("temp_c") is not None else None,
+        ]
+        if any(now):
+            lines.append("Now: " + ", ".join(p for p in now if p))
+        for day in forecast:
+            parts = [
+                day.get("condition"),
+                f"{day['high_c']}/{day['low_c']}°C"
+                if day.get("high_c") is not None and day.get("low_c") is not None else None,
+                f"avg {day['avg_c']}°C" if day.get("avg_c") is not None else None,
+                f"rain {day['rain_chance_pct']}%" if day.get("rain_chance_pct") is not None else None,
+            ]
+            lines.append(f"{day.get('date')}: " + ", ".join(p for p in parts if p))
         return "\n".join(lines)
 
     def _run(
@@ -165,10 +205,8 @@ class weather_tool(BaseTool):
         Accept either a single natural query string (ReAct style) or
         structured args (query, location, days). Returns a short summary.
         """
-        self.check_api_key()
-        print("before strip", tool_input)
+        log_event(logger, "weather_tool_input", tool_input=tool_input)
         tool_input = tool_input.strip("'")
-        print("after strip", tool_input)
 
         data = json.loads(tool_input)
         if data['location'].lower() == "nan":
@@ -176,60 +214,67 @@ class weather_tool(BaseTool):
         if data['days'].lower() == "nan":
             return "Provide number of days"
 
-        print("\n\n\nlocation:", data['location'])
-        print("\n\n\ndays:", data['days'])
-        print("\n\n\nquery:", data['query'])
-
-        location = data['location']
-        num_days = int(data['days'])
-        query = str(data['query'])
-
-        key = os.getenv("WEATHER_API")
-        base_url = "http://api.weatherapi.com/v1/forecast.json"
-        params = {
-            "key": key,
-            "q": location,
-            "days": num_days,
-            "aqi": "no",
-            "alerts": "no",
-        }
+        log_event(
+            logger, "weather_tool_args",
+            location=data['location'], days=data['days'], query=data['query'],
+        )
 
-        try:
-            resp = requests.get(base_url, params=params, timeout=15)
-        except requests.RequestException as e:
-            raise ToolException(f"Network error contacting WeatherAPI: {e}")
-
-        if resp.status_code != 200:
-            # WeatherAPI returns JSON error payloads
-            try:
-                err = resp.json()
-            except Exception:
-                err = {"error": {"message": resp.text[:200]}}
-            msg = ((err.get("error") or {}).get("message") or "Unknown error")
-            status = resp.status_code
-            raise ToolException(
-                f"WeatherAPI error ({status}): {msg}"
-            )
+        return self.forecast(data['location'], int(data['days']), str(data['query']))
 
-        try:
-            data = resp.json()
-        except ValueError:
-            raise ToolException("Invalid response from WeatherAPI (not JSON)")
+    def forecast(
+        self, location: Optional[str] = None, days: Optional[int] = None, query: str = ""
+    ) -> str:
+        """Forecast for location over days, in the tool's mode."""
+        if self.mode not in WEATHER_TOOL_MODES:
+            raise ToolException(f"Unknown weather tool mode: {self.mode}")
+        self.check_api_key()
+        if not location:
+            return "Provide location"
+        if not days:
+            return "Provide number of days"
+        num_days = int(days)
 
-        self._format_forecast(location, num_days, data)
+        # Cached per (resolved location, days); identical concurrent
+        # requests share one upstream call over a pooled session
+        data = get_weather_client().get_forecast(location, num_days)
+
+        payload = self._normalize_forecast(location, num_days, data)
+        # Queued: a background thread writes it to the segmented log
+        get_forecast_log().append(payload)
+
+        if self.mode == "direct":
+            return self._compact_observation(payload)
 
         location_slug = str(location).strip().lower().replace(" ", "_")
         vector_db_path = f"./storage/vectordb/weather/{location_slug}_{num_days}"
 
-        result = build_vector_db_from_json(
-            pdf_paths="data/weather/weather_formatted.jsonl",
-            storage_dir=vector_db_path,
+        # One stable, versioned store per location: the latest forecast
+        # replaces the previous one and superseded versions are GC'd
+        record_key = f"{payload['resolved_location']}|{num_days}"
+        doc = record_to_document(payload, "weatherapi", record_key=record_key)
+        result = upsert_records(
+            vector_db_path,
+            [(record_key, doc)],
             embed_model="text-embedding-3-small",
             chunk_size=1000,
-            chunk_overlap=150
+            chunk_overlap=150,
+            tags=["weather"],
         )
         db_path = result.get("vector_db_path", vector_db_path)
         return (
             f"PATH={db_path}\n"
             f"QUESTION={str(query or f'weather in {location} for next {num_days} days')}"
         )
+
+    def as_structured_tool(self) -> StructuredTool:
+        """Same tool with typed arguments, for tool-calling agents."""
+        return StructuredTool.from_function(
+            func=self.forecast,
+            name=self.name,
+            description=(
+                "Get the weather forecast for a location. Returns the forecast, "
+                "or PATH=/QUESTION= to pass on to retrieval_qa."
+            ),
+            args_schema=WeatherInput,
+            handle_validation_error=True,
+        )
@@ -0,0 +1,157 @@
+import os
+import time
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", "86400"))
+# Stores whose path contains one of these are volatile (e.g. forecasts)
+ANSWER_CACHE_VOLATILE_PATTERNS = [
+    p.strip() for p in os.getenv("ANSWER_CACHE_VOLATILE_PATTERNS", "weather").split(",")
+    if p.strip()
+]
+ANSWER_CACHE_VOLATILE_TTL_S = float(os.getenv("ANSWER_CACHE_VOLATILE_TTL_S", "900"))
+ANSWER_CACHE_MAX_PER_STORE = int(os.getenv("ANSWER_CACHE_MAX_PER_STORE", "256"))
+
+
+class _StoreAnswers:
+    """Answers for one (vector_db_path, mode) at one index version: unit vectors + payloads."""
+
+    def __init__(self, version: str):
+        self.version = version
+        self.vectors: Optional[np.ndarray] = None
+        self.entries: List[Tuple[float, str, str]] = []  # (created, question, answer)
+
+
+class SemanticAnswerCache:
+    """
+    RetrievalQA answers keyed by (vector_db_path, index version, mode) and
+    looked up by cosine similarity of the question embedding. `mode` is
+    whatever else shapes the answer for the same index (the retrieval mode).
+
+    A new index version drops every answer cached for the older one; entries
+    also expire after a TTL, which is short for volatile sources like weather.
+    """
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl_s: float = ANSWER_CACHE_TTL_S,
+        volatile_ttl_s: float = ANSWER_CACHE_VOLATILE_TTL_S,
+        volatile_patterns: Optional[List[str]] = None,
+        max_per_store: int = ANSWER_CACHE_MAX_PER_STORE,
+    ):
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.volatile_ttl_s = volatile_ttl_s
+        self.volatile_patterns = (
+            ANSWER_CACHE_VOLATILE_PATTERNS if volatile_patterns is None else volatile_patterns
+        )
+        self.max_per_store = max_per_store
+        self._stores: Dict[Tuple[str, str], _StoreAnswers] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "bypassed": 0, "expired": 0, "invalidations": 0}
+
+    def ttl_for(self, path: str) -> float:
+        normalized = path.replace("\\", "/").lower()
+        if any(p in normalized for p in self.volatile_patterns):
+            return self.volatile_ttl_s
+        return self.ttl_s
+
+    def lookup(
+        self, path: str, version: str, vector: List[float], mode: str = ""
+    ) -> Optional[Dict[str, Any]]:
+        q = _unit(vector)
+        now = time.time()
+        with self._lock:
+            store = self._current(path, version, mode)
+            self._expire(store, now, self.ttl_for(path))
+            if store.vectors is None or not len(store.entries):
+                self._stats["misses"] += 1
+                return None
+
+            scores = store.vectors @ q
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self._stats["misses"] += 1
+                return None
+
+            self._stats["hits"] += 1
+            _, question, answer = store.entries[best]
+            return {
+                "answer": answer,
+                "matched_question": question,
+                "similarity": float(scores[best]),
+            }
+
+    def put(
+        self,
+        path: str,
+        version: str,
+        question: str,
+        vector: List[float],
+        answer: str,
+        mode: str = "",
+    ) -> None:
+        q = _unit(vector)[None, :]
+        with self._lock:
+            store = self._current(path, version, mode)
+            store.entries.append((time.time(), question, answer))
+            store.vectors = q if store.vectors is None else np.vstack([store.vectors, q])
+            # Oldest first out past the per-store cap
+            overflow = len(store.entries) - self.max_per_store
+            if overflow > 0:
+                store.entries = store.entries[overflow:]
+                store.vectors = store.vectors[overflow:]
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        with self._lock:
+            if path is None:
+                self._stats["invalidations"] += len(self._stores)
+                self._stores.clear()
+            else:
+                # Every mode of that store
+                path = os.path.abspath(path)
+                for key in [k for k in self._stores if k[0] == path]:
+                    del self._stores[key]
+                    self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["stores"] = len(self._stores)
+            stats["entries"] = sum(len(s.entries) for s in self._stores.values())
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] / lookups) if lookups else 0.0
+        return stats
+
+    # ---- internals (caller holds self._lock)
+
+    def _current(self, path: str, version: str, mode: str) -> _StoreAnswers:
+        key = (os.path.abspath(path), mode)
+        store = self._stores.get(key)
+        if store is None or store.version != version:
+            if store is not None:
+                self._stats["invalidations"] += 1
+            store = self._stores[key] = _StoreAnswers(version)
+        return store
+
+    def _expire(self, store: _StoreAnswers, now: float, ttl: float) -> None:
+        keep = [i for i, (created, _, _) in enumerate(store.entries) if now - created <= ttl]
+        if len(keep) == len(store.entries):
+            return
+        self._stats["expired"] += len(store.entries) - len(keep)
+        store.entries = [store.entries[i] for i in keep]
+        store.vectors = store.vectors[keep] if keep else None
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(v))
+    return v / norm if norm else v
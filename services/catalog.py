@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+VECTOR_CATALOG_PATH = os.getenv("VECTOR_CATALOG_PATH", "./storage/catalog/vectordb.sqlite3")
+VECTOR_DB_ROOT = os.getenv("VECTOR_DB_ROOT", "./storage/vectordb")
+# last_access is persisted at most this often per store; queries stay cheap
+CATALOG_TOUCH_INTERVAL_S = float(os.getenv("CATALOG_TOUCH_INTERVAL_S", "60"))
+
+_JSON_FIELDS = ("source", "tags")
+
+
+def store_key(path: str) -> str:
+    return os.path.normpath(os.path.abspath(path))
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def detect_backend(path: str) -> Optional[Tuple[str, bool]]:
+    """(backend, versioned) for a store directory, or None if it is not one."""
+    from services.vectorstores.registry import detect_backend as detect_files
+    from services.versioned_store import current_version, resolve_store_path
+
+    if current_version(path) is not None:
+        return detect_files(resolve_store_path(path)) or "faiss", True
+    backend = detect_files(path)
+    return (backend, False) if backend is not None else None
+
+
+def discover_stores(root: str = VECTOR_DB_ROOT) -> Iterator[Tuple[str, str, bool]]:
+    """Walk `root` and yield (path, backend, versioned) for every store found."""
+    for current, dirs, _ in os.walk(root):
+        found = detect_backend(current)
+        if found is not None:
+            dirs[:] = []  # a store's own subdirectories are not stores
+            yield (current, *found)
+            continue
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+
+
+class Catalog:
+    """
+    Manifest of vector stores on SQLite: one row per store directory with
+    backend, sources, chunk count, embedding model, size, tags and created /
+    last-access times. Safe to share between the API processes and the CLI.
+    """
+
+    def __init__(
+        self,
+        path: str = VECTOR_CATALOG_PATH,
+        touch_interval_s: float = CATALOG_TOUCH_INTERVAL_S,
+    ):
+        self.path = path
+        self.touch_interval_s = touch_interval_s
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS stores ("
+                " path TEXT PRIMARY KEY,"
+                " backend TEXT NOT NULL,"
+                " versioned INTEGER NOT NULL DEFAULT 0,"
+                " origin TEXT NOT NULL,"
+                " source TEXT NOT NULL DEFAULT '[]',"
+                " embed_model TEXT,"
+                " num_chunks INTEGER,"
+                " size_bytes INTEGER NOT NULL DEFAULT 0,"
+                " tags TEXT NOT NULL DEFAULT '[]',"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " last_access REAL)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict[str, Any]:
+        entry = dict(row)
+        for field in _JSON_FIELDS:
+            entry[field] = json.loads(entry[field])
+        entry["versioned"] = bool(entry["versioned"])
+        return entry
+
+    def register(
+        self,
+        path: str,
+        *,
+        backend: str,
+        source: Union[str, List[str], None] = None,
+        embed_model: Optional[str] = None,
+        num_chunks: Optional[int] = None,
+        tags: Optional[List[str]] = None,
+        versioned: bool = False,
+        origin: str = "ingest",
+        created_at: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Insert or refresh the entry for the store at `path`. created_at and
+        last_access survive a refresh; sources and tags are merged.
+        """
+        key = store_key(path)
+        now = time.time()
+        sources = [source] if isinstance(source, str) else list(source or [])
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM stores WHERE path = ?", (key,)).fetchone()
+            if row is not None:
+                old = self._row(row)
+                sources = old["source"] + [s for s in sources if s not in old["source"]]
+                tags = old["tags"] + [t for t in (tags or []) if t not in old["tags"]]
+                embed_model = embed_model or old["embed_model"]
+                num_chunks = old["num_chunks"] if num_chunks is None else num_chunks
+            conn.execute(
+                "INSERT INTO stores (path, backend, versioned, origin, source,"
+                " embed_model, num_chunks, size_bytes, tags, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (path) DO UPDATE SET backend = excluded.backend,"
+                " versioned = excluded.versioned, source = excluded.source,"
+                " embed_model = excluded.embed_model, num_chunks = excluded.num_chunks,"
+                " size_bytes = excluded.size_bytes, tags = excluded.tags,"
+                " updated_at = excluded.updated_at",
+                (
+                    key, backend, int(versioned), origin, json.dumps(sources),
+                    embed_model, num_chunks, dir_size(key), json.dumps(tags or []),
+                    created_at or now, now,
+                ),
+            )
+            row = conn.execute("SELECT * FROM stores WHERE path = ?", (key,)).fetchone()
+            conn.execute("COMMIT")
+        return self._row(row)
+
+    def touch(self, path: str) -> None:
+        """Record a read of the store; writes are rate-limited per path."""
+        key = store_key(path)
+        now = time.time()
+        with self._lock:
+            if now - self._touched.get(key, 0.0) < self.touch_interval_s:
+                return
+            self._touched[key] = now
+        with self._connect() as conn:
+            conn.execute("UPDATE stores SET last_access = ? WHERE path = ?", (now, key))
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM stores WHERE path = ?", (store_key(path),)
+            ).fetchone()
+        return self._row(row) if row is not None else None
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM stores ORDER BY created_at").fetchall()
+        return [self._row(r) for r in rows]
+
+    def remove(self, path: str) -> None:
+        key = store_key(path)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM stores WHERE path = ?", (key,))
+        with self._lock:
+            self._touched.pop(key, None)
+
+
+_catalog: Optional[Catalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> Catalog:
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = Catalog()
+        return _catalog
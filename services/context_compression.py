@@ -0,0 +1,146 @@
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+from services.tokens import count_tokens
+
+# Candidates fetched before filtering; the number kept varies per question
+CONTEXT_FETCH_K = int(os.getenv("CONTEXT_FETCH_K", "8"))
+# Minimum vector relevance (0..1) of a chunk; lexical-only hits carry none
+CONTEXT_SCORE_THRESHOLD = float(os.getenv("CONTEXT_SCORE_THRESHOLD", "0.25"))
+# Upper bound on the tokens of the chunks stuffed into the prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+
+RELEVANCE_KEY = "relevance"
+
+ScoredDocs = List[Tuple[Document, Optional[float]]]
+
+
+def _span(doc: Document) -> Optional[Tuple[Any, Any, int, int]]:
+    """(source, line, start, end) of a chunk in its record, if known."""
+    start = doc.metadata.get("start_index")
+    if start is None or start < 0:
+        return None
+    return doc.metadata.get("source"), doc.metadata.get("line"), start, start + len(doc.page_content)
+
+
+def _merge(a: Document, b: Document) -> Optional[Document]:
+    """
+    One chunk covering both if they are overlapping or adjacent pieces of
+    the same record (the splitter repeats chunk_overlap characters), else None.
+    """
+    sa, sb = _span(a), _span(b)
+    if sa is None or sb is None or sa[:2] != sb[:2]:
+        return None
+    if sb[2] < sa[2]:
+        a, b, sa, sb = b, a, sb, sa
+    if sb[2] > sa[3]:
+        return None
+    offset = sb[2] - sa[2]
+    shared = a.page_content[offset:]
+    if not b.page_content.startswith(shared) and not shared.startswith(b.page_content):
+        return None
+    text = a.page_content + b.page_content[len(shared):]
+    metadata = {**a.metadata, RELEVANCE_KEY: _best(a, b)}
+    return Document(page_content=text, metadata=metadata)
+
+
+def _best(a: Document, b: Document) -> Optional[float]:
+    scores = [s for s in (a.metadata.get(RELEVANCE_KEY), b.metadata.get(RELEVANCE_KEY)) if s is not None]
+    return max(scores) if scores else None
+
+
+def dedupe_chunks(docs: List[Document]) -> List[Document]:
+    """
+    Drop repeated chunk texts and merge overlapping chunks of one record
+    into a single chunk, keeping the rank of the best-ranked piece.
+    """
+    kept: List[Document] = []
+    seen = set()
+    for doc in docs:
+        if doc.page_content in seen:
+            continue
+        seen.add(doc.page_content)
+        position = len(kept)
+        i = 0
+        while i < len(kept):
+            combined = _merge(kept[i], doc)
+            if combined is None:
+                i += 1
+                continue
+            # The combined span may bridge another kept chunk: rescan
+            position = min(position, i)
+            del kept[i]
+            doc = combined
+            i = 0
+        kept.insert(position, doc)
+    return kept
+
+
+def compress_context(
+    scored: ScoredDocs,
+    threshold: float = CONTEXT_SCORE_THRESHOLD,
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+) -> List[Document]:
+    """
+    Chunks to stuff into the prompt, best first: those at or above the
+    relevance threshold, deduplicated, within the token budget. The best
+    chunk is always kept so a question never gets an empty context.
+    """
+    # Copies: stores may hand out their own Document objects
+    scored_docs = [
+        Document(
+            page_content=doc.page_content,
+            metadata={**doc.metadata, RELEVANCE_KEY: None if score is None else float(score)},
+        )
+        for doc, score in scored
+    ]
+    docs = [
+        doc for doc in scored_docs
+        if doc.metadata[RELEVANCE_KEY] is None or doc.metadata[RELEVANCE_KEY] >= threshold
+    ]
+    if not docs:
+        docs = scored_docs[:1]
+
+    kept: List[Document] = []
+    for doc in docs:
+        # Merging into a neighbour costs only the characters it adds
+        candidate = dedupe_chunks(kept + [doc])
+        if kept and sum(count_tokens(d.page_content) for d in candidate) > token_budget:
+            continue
+        kept = candidate
+    return kept
+
+
+def describe_chunks(docs: List[Document]) -> List[Dict[str, Any]]:
+    """Per-chunk summary for responses: where it came from and its cost."""
+    chunks = []
+    for doc in docs:
+        chunk = {
+            "source": doc.metadata.get("source"),
+            "line": doc.metadata.get("line"),
+            "start_index": doc.metadata.get("start_index"),
+            "chars": len(doc.page_content),
+            "tokens": count_tokens(doc.page_content),
+            RELEVANCE_KEY: doc.metadata.get(RELEVANCE_KEY),
+        }
+        if "store" in doc.metadata:  # federated queries
+            chunk["store"] = doc.metadata["store"]
+        chunks.append(chunk)
+    return chunks
+
+
+class CompressedRetriever(BaseRetriever):
+    """Runs a scored search and returns compress_context() of its results."""
+
+    search: Callable[[str], ScoredDocs]
+    threshold: float = CONTEXT_SCORE_THRESHOLD
+    token_budget: int = CONTEXT_TOKEN_BUDGET
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return compress_context(self.search(query), self.threshold, self.token_budget)
@@ -0,0 +1,268 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from services.embedding_scheduler import EmbeddingScheduler
+from services.metrics import StatsCollector
+from services.tracing import timed
+
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH", "./storage/cache/embeddings.sqlite3"
+)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+# A hit refreshes a row's last_access at most this often (LRU resolution)
+EMBEDDING_CACHE_TOUCH_S = float(os.getenv("EMBEDDING_CACHE_TOUCH_S", "300"))
+# Eviction trims to this share of the limits, so it runs once per many puts
+EMBEDDING_CACHE_LOW_WATER = 0.9
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SQLiteEmbeddingStore:
+    """
+    Content-addressed float32 vectors keyed by (model, sha256(text)).
+    Least-recently-used rows are evicted past an entry or byte limit.
+
+    Row and byte totals are counted in memory and only recounted when they
+    cross a limit, so puts do not scan the table. Other processes sharing
+    the file are caught up with at that recount.
+    """
+
+    def __init__(
+        self,
+        path: str = EMBEDDING_CACHE_PATH,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+        max_bytes: int = EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+        touch_interval_s: float = EMBEDDING_CACHE_TOUCH_S,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.touch_interval_s = touch_interval_s
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " PRIMARY KEY (model, hash))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings (last_access)"
+        )
+        self._conn.commit()
+        self._count, self._bytes = self._recount()
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        if not hashes:
+            return found
+        now = time.time()
+        stale: List[str] = []
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(hashes), 500):
+                part = hashes[i:i + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector, last_access FROM embeddings "
+                    f"WHERE model = ? AND hash IN ({marks})",
+                    [model, *part],
+                ).fetchall()
+                for h, blob, last_access in rows:
+                    found[h] = array("f", blob).tolist()
+                    if now - last_access >= self.touch_interval_s:
+                        stale.append(h)
+            # Hits within the touch interval need no write at all
+            if stale:
+                for i in range(0, len(stale), 500):
+                    part = stale[i:i + 500]
+                    marks = ",".join("?" * len(part))
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_access = ? "
+                        f"WHERE model = ? AND hash IN ({marks})",
+                        [now, model, *part],
+                    )
+                self._conn.commit()
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]) -> int:
+        """Insert vectors, then evict LRU rows. Returns the number evicted."""
+        if not items:
+            return 0
+        now = time.time()
+        rows = [
+            (model, h, array("f", vec).tobytes(), now) for h, vec in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            # Replaced rows are counted twice; the recount corrects that
+            self._count += len(rows)
+            self._bytes += sum(len(r[2]) for r in rows)
+            evicted = 0
+            if self._count > self.max_entries or self._bytes > self.max_bytes:
+                evicted = self._evict()
+            self._conn.commit()
+        return evicted
+
+    def size(self) -> Dict[str, int]:
+        """Approximate entry and byte totals (exact after each eviction check)."""
+        with self._lock:
+            return {"entries": self._count, "bytes": self._bytes}
+
+    def _recount(self) -> Tuple[int, int]:
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+        return count, total
+
+    def _evict(self) -> int:
+        self._count, self._bytes = count, total = self._recount()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return 0
+        excess = count - int(self.max_entries * EMBEDDING_CACHE_LOW_WATER)
+        if total > self.max_bytes * EMBEDDING_CACHE_LOW_WATER and count:
+            # Vectors of one model share a size, so bytes ≈ count * avg
+            avg = total / count
+            excess = max(excess, int((total - self.max_bytes * EMBEDDING_CACHE_LOW_WATER) / avg) + 1)
+        excess = min(excess, count)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN ("
+            " SELECT rowid FROM embeddings ORDER BY last_access LIMIT ?)",
+            (excess,),
+        )
+        self._count = count - excess
+        self._bytes = int(total - excess * (total / count))
+        return excess
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from the SQLite store and
+    only sends cache misses (deduplicated) to the underlying model.
+    """
+
+    def __init__(self, underlying: Embeddings, model: str, store: SQLiteEmbeddingStore):
+        self.underlying = underlying
+        self.model = model
+        self.store = store
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "api_calls": 0,
+            "api_calls_saved": 0,
+            "evictions": 0,
+        }
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [text_hash(t) for t in texts]
+        found = self.store.get_many(self.model, list(dict.fromkeys(hashes)))
+
+        missing: Dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in found:
+                missing.setdefault(h, t)
+
+        computed: Dict[str, List[float]] = {}
+        evicted = 0
+        if missing:
+            with timed("embedding"):
+                vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            evicted = self.store.put_many(self.model, computed)
+
+        with self._lock:
+            self._stats["hits"] += sum(1 for h in hashes if h in found)
+            self._stats["misses"] += len(missing)
+            self._stats["evictions"] += evicted
+            if missing:
+                self._stats["api_calls"] += 1
+            elif texts:
+                self._stats["api_calls_saved"] += 1
+
+        return [found[h] if h in found else computed[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        h = text_hash(text)
+        found = self.store.get_many(self.model, [h])
+        if h in found:
+            with self._lock:
+                self._stats["hits"] += 1
+                self._stats["api_calls_saved"] += 1
+            return found[h]
+
+        with timed("embedding"):
+            vector = self.underlying.embed_query(text)
+        evicted = self.store.put_many(self.model, {h: vector})
+        with self._lock:
+            self._stats["misses"] += 1
+            self._stats["api_calls"] += 1
+            self._stats["evictions"] += evicted
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] / lookups) if lookups else 0.0
+        stats["model"] = self.model
+        stats.update(self.store.size())
+        if hasattr(self.underlying, "stats"):
+            stats["scheduler"] = self.underlying.stats()
+        return stats
+
+
+_store: Optional[SQLiteEmbeddingStore] = None
+_embeddings: Dict[str, CachedEmbeddings] = {}
+_init_lock = threading.Lock()
+
+
+def get_embeddings(model: str = "text-embedding-3-small") -> CachedEmbeddings:
+    """Process-wide cached embeddings client for `model`, shared by ingest and query."""
+    global _store
+    with _init_lock:
+        if _store is None:
+            _store = SQLiteEmbeddingStore()
+        if model not in _embeddings:
+            # Cache misses go through the batching / rate-limit scheduler,
+            # which owns retries, so the client itself does not retry.
+            scheduler = EmbeddingScheduler(
+                OpenAIEmbeddings(model=model, max_retries=0)
+            )
+            _embeddings[model] = CachedEmbeddings(scheduler, model, _store)
+        return _embeddings[model]
+
+
+def embedding_cache_stats() -> Dict[str, Any]:
+    with _init_lock:
+        clients = list(_embeddings.values())
+    return {c.model: c.stats() for c in clients}
+
+
+StatsCollector(
+    "rag_embedding_cache",
+    "Embedding cache (services.embedding_cache); entries and bytes are store-wide.",
+    embedding_cache_stats,
+    counters=("hits", "misses", "api_calls", "api_calls_saved", "evictions"),
+    label="model",
+)
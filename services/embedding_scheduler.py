@@ -0,0 +1,193 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from services.tokens import count_tokens
+
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "128"))
+EMBED_MAX_BATCH_TOKENS = int(os.getenv("EMBED_MAX_BATCH_TOKENS", "50000"))
+EMBED_MAX_WORKERS = int(os.getenv("EMBED_MAX_WORKERS", "4"))
+EMBED_RPM = int(os.getenv("EMBED_RPM", "3000"))
+EMBED_TPM = int(os.getenv("EMBED_TPM", "1000000"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_RETRYABLE_ERRORS = {
+    "RateLimitError",
+    "APITimeoutError",
+    "APIConnectionError",
+    "InternalServerError",
+}
+
+
+class RateLimiter:
+    """
+    Two token buckets (requests/min and tokens/min) refilled continuously.
+    acquire() blocks until a request of `tokens` fits in both.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> float:
+        """Reserve capacity; returns seconds spent waiting."""
+        # A single request larger than the whole minute budget still goes through
+        tokens = min(tokens, self.tpm)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return waited
+                delay = max(
+                    (1 - self._requests) * 60.0 / self.rpm,
+                    (tokens - self._tokens) * 60.0 / self.tpm,
+                    0.01,
+                )
+            time.sleep(delay)
+            waited += delay
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+
+def _is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    return status in _RETRYABLE_STATUS or type(error).__name__ in _RETRYABLE_ERRORS
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class EmbeddingScheduler(Embeddings):
+    """
+    Splits embed_documents calls into batches capped by count and tokens and
+    runs them on a bounded worker pool under requests/tokens-per-minute
+    limits, retrying rate-limit and transient errors with jittered
+    exponential backoff. Output order always matches input order.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        max_batch_size: int = EMBED_MAX_BATCH_SIZE,
+        max_batch_tokens: int = EMBED_MAX_BATCH_TOKENS,
+        max_workers: int = EMBED_MAX_WORKERS,
+        rpm: int = EMBED_RPM,
+        tpm: int = EMBED_TPM,
+        max_retries: int = EMBED_MAX_RETRIES,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        self.underlying = underlying
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiter = RateLimiter(rpm, tpm)
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="embed"
+        )
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "texts": 0,
+            "tokens": 0,
+            "retries": 0,
+            "throttled_s": 0.0,
+        }
+
+    def make_batches(self, texts: List[str]) -> List[List[int]]:
+        """Index batches of consecutive texts within the size/token caps."""
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = count_tokens(text)
+            if current and (
+                len(current) >= self.max_batch_size
+                or current_tokens + tokens > self.max_batch_tokens
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        batches = self.make_batches(texts)
+        if len(batches) == 1:
+            return self._embed_batch([texts[i] for i in batches[0]])
+
+        # map() yields results in submission order, so chunk order is kept
+        results = self._pool.map(
+            lambda idx: self._embed_batch([texts[i] for i in idx]), batches
+        )
+        vectors: List[List[float]] = []
+        for batch_vectors in results:
+            vectors.extend(batch_vectors)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._call(lambda: self.underlying.embed_query(text), [text])
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        return self._call(lambda: self.underlying.embed_documents(batch), batch)
+
+    def _call(self, fn, batch: List[str]) -> Any:
+        tokens = sum(count_tokens(t) for t in batch)
+        attempt = 0
+        while True:
+            waited = self.limiter.acquire(tokens)
+            with self._lock:
+                self._stats["throttled_s"] += waited
+            try:
+                result = fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                    delay *= 0.5 + random.random() / 2
+                attempt += 1
+                with self._lock:
+                    self._stats["retries"] += 1
+                time.sleep(delay)
+                continue
+            with self._lock:
+                self._stats["requests"] += 1
+                self._stats["texts"] += len(batch)
+                self._stats["tokens"] += tokens
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats)
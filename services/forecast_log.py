@@ -0,0 +1,384 @@
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from services.tracing import timed
+
+logger = logging.getLogger(__name__)
+
+FORECAST_LOG_DIR = os.getenv("FORECAST_LOG_DIR", "./data/weather/forecast_log")
+# A segment is closed once it would exceed this size or is older than this
+FORECAST_LOG_SEGMENT_MB = float(os.getenv("FORECAST_LOG_SEGMENT_MB", "16"))
+FORECAST_LOG_SEGMENT_S = float(os.getenv("FORECAST_LOG_SEGMENT_S", "86400"))
+# Oldest segments beyond this many are deleted (0 keeps them all)
+FORECAST_LOG_MAX_SEGMENTS = int(os.getenv("FORECAST_LOG_MAX_SEGMENTS", "0"))
+# Records written per transaction; under load the writer drains the queue in batches
+FORECAST_LOG_BATCH = int(os.getenv("FORECAST_LOG_BATCH", "256"))
+# Appends block (back-pressure) rather than grow memory past this
+FORECAST_LOG_QUEUE = int(os.getenv("FORECAST_LOG_QUEUE", "10000"))
+# Most records one page() returns
+FORECAST_LOG_PAGE_MAX = int(os.getenv("FORECAST_LOG_PAGE_MAX", "1000"))
+
+INDEX_FILE = "index.sqlite3"
+
+# (segment, byte offset) of a record: read_since() resumes after it
+Cursor = Tuple[int, int]
+
+_STOP = object()
+
+
+def _segment_name(seq: int) -> str:
+    return f"segment-{seq:06d}.jsonl"
+
+
+def format_cursor(cursor: Cursor) -> str:
+    return f"{cursor[0]}:{cursor[1]}"
+
+
+def parse_cursor(text: str) -> Cursor:
+    """Cursor from its "<segment>:<offset>" form; ValueError if malformed."""
+    seq, sep, offset = text.partition(":")
+    if not sep or not seq.isdigit() or not offset.isdigit():
+        raise ValueError(f"Malformed cursor: {text!r} (expected <segment>:<offset>)")
+    return int(seq), int(offset)
+
+
+class ForecastLog:
+    """
+    Append-only JSONL log of normalized forecasts, split into size- and
+    time-bounded segment files.
+
+    append() only enqueues; a background thread writes queued records in
+    batches. Each batch is one SQLite transaction that also indexes every
+    record id → (segment, offset, length), so get() seeks straight to a
+    record and read_since() to the records after a cursor. Lines written
+    without a committed index row (a crash mid-batch) are never returned.
+    The write transaction also serializes writers across processes.
+    """
+
+    def __init__(
+        self,
+        directory: str = FORECAST_LOG_DIR,
+        segment_bytes: int = int(FORECAST_LOG_SEGMENT_MB * 1024 * 1024),
+        segment_s: float = FORECAST_LOG_SEGMENT_S,
+        max_segments: int = FORECAST_LOG_MAX_SEGMENTS,
+        batch_size: int = FORECAST_LOG_BATCH,
+        queue_size: int = FORECAST_LOG_QUEUE,
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_s = segment_s
+        self.max_segments = max_segments
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._cond = threading.Condition()
+        self._enqueued = 0
+        self._processed = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            "appended": 0,
+            "written": 0,
+            "batches": 0,
+            "write_errors": 0,
+            "segments_rolled": 0,
+            "segments_deleted": 0,
+        }
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                " seq INTEGER PRIMARY KEY,"
+                " created_at REAL NOT NULL,"
+                " bytes INTEGER NOT NULL DEFAULT 0,"
+                " records INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                " id TEXT PRIMARY KEY,"
+                " segment INTEGER NOT NULL,"
+                " offset INTEGER NOT NULL,"
+                " length INTEGER NOT NULL,"
+                " written_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS records_position ON records (segment, offset)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(
+            os.path.join(self.directory, INDEX_FILE), timeout=30, isolation_level=None
+        )
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, _segment_name(seq))
+
+    # ---- writing
+
+    def append(self, record: Dict[str, Any]) -> str:
+        """
+        Queue `record` for writing; returns its id (its request_id if it has
+        one). It is serialized by the writer, so do not mutate it afterwards.
+        """
+        record_id = str(record.get("request_id") or uuid4())
+        self._ensure_writer()
+        with self._cond:
+            self._enqueued += 1
+            self._stats["appended"] += 1
+        self._queue.put((record_id, record))
+        return record_id
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything appended so far is written. False on timeout."""
+        with self._cond:
+            target = self._enqueued
+            return self._cond.wait_for(lambda: self._processed >= target, timeout)
+
+    def close(self) -> None:
+        """Write what is queued and stop the writer thread."""
+        with self._cond:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _ensure_writer(self) -> None:
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._writer_loop, name="forecast-log-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _writer_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            stop = item is _STOP
+            batch = [] if stop else [item]
+            # Group commit: whatever queued up meanwhile goes in the same batch
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    lines = [
+                        (record_id, json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+                        for record_id, record in batch
+                    ]
+                    with timed("forecast_log_write"):
+                        self._write(lines)
+                    written, errors = len(batch), 0
+                except Exception:
+                    logger.exception("forecast_log_write_failed", extra={"fields": {"records": len(batch)}})
+                    written, errors = 0, len(batch)
+                with self._cond:
+                    self._processed += len(batch)
+                    self._stats["written"] += written
+                    self._stats["write_errors"] += errors
+                    self._stats["batches"] += 1
+                    self._cond.notify_all()
+            if stop:
+                return
+
+    def _write(self, batch: List[Tuple[str, bytes]]) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                current = conn.execute(
+                    "SELECT seq, created_at FROM segments ORDER BY seq DESC LIMIT 1"
+                ).fetchone()
+                if current is None:
+                    current = self._new_segment(conn, 1, now)
+                seq, created_at = current
+                f = open(self._path(seq), "ab")
+                rows = []
+                sizes: Dict[int, Tuple[int, int]] = {}
+                try:
+                    # The file's end, not the index: a crashed batch may have left bytes
+                    size = f.seek(0, os.SEEK_END)
+                    if size and not self._ends_with_newline(seq):
+                        # ...possibly half a line: keep the file line-oriented
+                        f.write(b"\n")
+                        size += 1
+                    for record_id, line in batch:
+                        if size and (
+                            size + len(line) > self.segment_bytes or now - created_at > self.segment_s
+                        ):
+                            f.close()
+                            seq, created_at = self._new_segment(conn, seq + 1, now)
+                            f = open(self._path(seq), "ab")
+                            size = 0
+                        f.write(line)
+                        rows.append((record_id, seq, size, len(line), now))
+                        size += len(line)
+                        sizes[seq] = (size, sizes.get(seq, (0, 0))[1] + 1)
+                    f.flush()
+                finally:
+                    f.close()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO records (id, segment, offset, length, written_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                for s, (nbytes, nrecords) in sizes.items():
+                    conn.execute(
+                        "UPDATE segments SET bytes = ?, records = records + ? WHERE seq = ?",
+                        (nbytes, nrecords, s),
+                    )
+                deleted = self._apply_retention(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        for path in deleted:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _ends_with_newline(self, seq: int) -> bool:
+        with open(self._path(seq), "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _new_segment(self, conn: sqlite3.Connection, seq: int, now: float) -> Tuple[int, float]:
+        conn.execute("INSERT INTO segments (seq, created_at) VALUES (?, ?)", (seq, now))
+        if seq > 1:
+            with self._cond:
+                self._stats["segments_rolled"] += 1
+        return seq, now
+
+    def _apply_retention(self, conn: sqlite3.Connection) -> List[str]:
+        """Drop the oldest segments beyond max_segments; returns their files to delete."""
+        if self.max_segments <= 0:
+            return []
+        old = [
+            seq for (seq,) in conn.execute(
+                "SELECT seq FROM segments ORDER BY seq DESC LIMIT -1 OFFSET ?",
+                (self.max_segments,),
+            )
+        ]
+        for seq in old:
+            conn.execute("DELETE FROM records WHERE segment = ?", (seq,))
+            conn.execute("DELETE FROM segments WHERE seq = ?", (seq,))
+        with self._cond:
+            self._stats["segments_deleted"] += len(old)
+        return [self._path(seq) for seq in old]
+
+    # ---- reading
+
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """The record with this id, read with one seek; None if unknown or expired."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT segment, offset, length FROM records WHERE id = ?", (record_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        seq, offset, length = row
+        try:
+            with open(self._path(seq), "rb") as f:
+                f.seek(offset)
+                return json.loads(f.read(length))
+        except FileNotFoundError:
+            return None
+
+    def read_since(
+        self, cursor: Optional[Cursor] = None, limit: Optional[int] = None
+    ) -> Iterator[Tuple[str, Cursor, Dict[str, Any]]]:
+        """
+        (record id, cursor, record) for records written after `cursor`,
+        oldest first. Pass the last cursor seen to resume from there.
+        """
+        seq, offset = cursor if cursor is not None else (0, -1)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, segment, offset, length FROM records"
+                " WHERE segment > ? OR (segment = ? AND offset > ?)"
+                " ORDER BY segment, offset LIMIT ?",
+                (seq, seq, offset, -1 if limit is None else limit),
+            ).fetchall()
+        f = None
+        open_seq = None
+        try:
+            for record_id, seq, offset, length in rows:
+                if seq != open_seq:
+                    if f is not None:
+                        f.close()
+                    open_seq = seq
+                    try:
+                        f = open(self._path(seq), "rb")
+                    except FileNotFoundError:  # deleted by retention meanwhile
+                        f = None
+                if f is None:
+                    continue
+                f.seek(offset)
+                yield record_id, (seq, offset), json.loads(f.read(length))
+        finally:
+            if f is not None:
+                f.close()
+
+    def page(self, after: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """
+        Up to `limit` records written after the cursor string `after` (from
+        the start if None), for HTTP consumers tailing the log. "next" is the
+        cursor to pass back; it stays `after` when nothing new was written.
+        """
+        if not 1 <= limit <= FORECAST_LOG_PAGE_MAX:
+            raise ValueError(f"limit must be between 1 and {FORECAST_LOG_PAGE_MAX}")
+        cursor = parse_cursor(after) if after else None
+        records = [
+            {"id": record_id, "cursor": format_cursor(position), "record": record}
+            for record_id, position, record in self.read_since(cursor, limit)
+        ]
+        return {"records": records, "next": records[-1]["cursor"] if records else after}
+
+    def segments(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, created_at, bytes, records FROM segments ORDER BY seq"
+            ).fetchall()
+        return [
+            {"segment": _segment_name(seq), "created_at": created_at, "bytes": nbytes, "records": nrecords}
+            for seq, created_at, nbytes, nrecords in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+
+_log: Optional[ForecastLog] = None
+_log_lock = threading.Lock()
+
+
+def get_forecast_log() -> ForecastLog:
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = ForecastLog()
+            # Queued forecasts are written before the interpreter exits
+            atexit.register(_log.close)
+        return _log
@@ -1,9 +1,18 @@
 import os, json, uuid
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
+
+from services.catalog import get_catalog
+from services.embedding_cache import get_embeddings
+from services.forecast_log import ForecastLog, get_forecast_log
+from services.vectorstores.base import VectorIndex
+from services.vectorstores.registry import VECTOR_BACKEND, create_index
+
+# Chunks handed to the embeddings client at a time while streaming an
+# ingest; the scheduler fans each group out into concurrent API batches
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "1024"))
 
 
 def _collect_strings(obj: Any, out: List[str]) -> None:
@@ -17,43 +26,243 @@ def _collect_strings(obj: Any, out: List[str]) -> None:
     # other types are ignored
 
 
+def iter_jsonl_records(path: str) -> Iterator[Tuple[int, str]]:
+    """
+    Stream (line_no, line) for each non-empty line of a JSONL file.
+    Never holds more than one line.
+    """
+    with open(path, "rb") as f:
+        for line_no, raw in enumerate(f, start=1):
+            line = raw.decode("utf-8").strip()
+            if line:
+                yield line_no, line
+
+
+def record_to_document(
+    record: Any, source: str, line_no: Optional[int] = None, **metadata: Any
+) -> Optional[Document]:
+    """One JSON record → one Document, so retrieval can cite the record."""
+    texts: List[str] = []
+    _collect_strings(record, texts)
+    if not texts:
+        return None
+    meta = {"source": source, **metadata}
+    if line_no is not None:
+        meta["line"] = line_no
+    if isinstance(record, dict) and record.get("request_id"):
+        meta["request_id"] = record["request_id"]
+    return Document(page_content="\n".join(texts), metadata=meta)
+
+
+def iter_record_documents(paths: Iterable[str]) -> Iterator[Document]:
+    for path in paths:
+        for line_no, line in iter_jsonl_records(path):
+            doc = record_to_document(json.loads(line), path, line_no)
+            if doc is not None:
+                yield doc
+
+
+def iter_chunks(
+    docs: Iterable[Document], splitter: RecursiveCharacterTextSplitter
+) -> Iterator[Document]:
+    # Split record by record; chunks never span two records
+    for doc in docs:
+        yield from splitter.split_documents([doc])
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch: List[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def index_chunks(
+    chunks: Iterable[Document],
+    embeddings: Embeddings,
+    vs: Optional[VectorIndex] = None,
+    batch_size: int = EMBED_BATCH_SIZE,
+    progress: Optional[Callable[[int], None]] = None,
+    backend: Optional[str] = None,
+    index_type: Optional[str] = None,
+) -> Tuple[Optional[VectorIndex], int]:
+    """
+    Embed chunks batch by batch and add them to `vs` (a new `backend` index,
+    with `index_type` for FAISS, created on the first batch if None). Only
+    one batch of texts is held in memory at a time. Chunks that carry a
+    Document.id keep it as their id.
+    `progress` is called with the running chunk count after each batch.
+    """
+    count = 0
+    for batch in batched(chunks, batch_size):
+        texts = [c.page_content for c in batch]
+        metadatas = [c.metadata for c in batch]
+        ids = [c.id for c in batch]
+        ids = ids if all(ids) else None
+        vectors = embeddings.embed_documents(texts)
+        if vs is None:
+            vs = create_index(embeddings, backend, index_type=index_type)
+        vs.add(texts, vectors, metadatas, ids)
+        count += len(batch)
+        if progress is not None:
+            progress(count)
+    return vs, count
+
+
 def build_vector_db_from_json(
-    pdf_paths: str,
+    pdf_paths: Union[str, List[str]],
     storage_dir: str,
     embed_model: str = "text-embedding-3-small",
     chunk_size: int = 1000,
     chunk_overlap: int = 150,
+    progress: Optional[Callable[[int], None]] = None,
+    backend: Optional[str] = None,
+    index_type: Optional[str] = None,
 ) -> Dict[str, Any]:
-    with open(pdf_paths, "r", encoding="utf-8") as f:
-        for line in f:
-            data = json.loads(line)
+    """
+    Full ingest of JSONL files into a new store at
+    <storage_dir>/<backend>/<run id>. For FAISS, `index_type` (flat, ivf,
+    hnsw, ivfpq, auto) picks the index built when the store is saved.
+    """
+    backend = backend or VECTOR_BACKEND
+    paths = [pdf_paths] if isinstance(pdf_paths, str) else list(pdf_paths)
+    for path in paths:
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"File not found: {path}")
 
-    # 1) Pull ALL text from the JSON (recursively)
-    texts: List[str] = []
-    _collect_strings(data, texts)
+    # 1) Stream records → one Document per JSONL line
+    counts = {"docs": 0}
 
-    # 2) Make a single Document (or split per item if you prefer)
-    doc = Document(page_content="\n".join(texts), metadata={"source": pdf_paths})
+    def _counted(docs: Iterable[Document]) -> Iterator[Document]:
+        for doc in docs:
+            counts["docs"] += 1
+            yield doc
 
-    # 3) Chunk → embed → save FAISS
+    # 2) Chunk → embed in batches → vector index
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
     )
-    chunks = splitter.split_documents([doc])
-
-    embeddings = OpenAIEmbeddings(model=embed_model)
+    embeddings = get_embeddings(embed_model)
+    chunks = iter_chunks(_counted(iter_record_documents(paths)), splitter)
+    vs, num_chunks = index_chunks(
+        chunks, embeddings, progress=progress, backend=backend, index_type=index_type
+    )
+    if vs is None:
+        raise ValueError("No text records found in the input")
 
+    # 3) Save
     run_id = uuid.uuid4().hex
-    base_dir = os.path.join(storage_dir, "faiss", run_id)
+    base_dir = os.path.join(storage_dir, backend, run_id)
     os.makedirs(base_dir, exist_ok=True)
-
-    vs = FAISS.from_documents(chunks, embeddings)
-    vs.save_local(base_dir)
+    vs.save(base_dir)
+    get_catalog().register(
+        base_dir,
+        backend=backend,
+        source=paths,
+        embed_model=embed_model,
+        num_chunks=num_chunks,
+    )
 
     return {
-        "backend": "faiss",
+        "backend": backend,
         "vector_db_path": base_dir,
-        "num_chunks": len(chunks),
-        "num_docs": 1,
+        "num_chunks": num_chunks,
+        "num_docs": counts["docs"],
         "run_id": run_id,
+        "index": vs.describe(),
+    }
+
+
+def update_vector_db_from_log(
+    vector_db_path: str,
+    log: Optional[ForecastLog] = None,
+    embed_model: str = "text-embedding-3-small",
+    chunk_size: int = 1000,
+    chunk_overlap: int = 150,
+    backend: Optional[str] = None,
+    index_type: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Incremental, append-only ingest of the forecast log (`log`, default
+    the process-wide one) into the versioned store at vector_db_path.
+
+    Opens the current version, embeds only the records written after the
+    log cursor saved with it, adds them and publishes the result with the
+    new cursor as the next version: readers switch over atomically through
+    CURRENT. Nothing is written when the log has no new records.
+    """
+    # versioned_store builds on this module
+    from services.versioned_store import (
+        VERSIONS_DIR,
+        _open_current,
+        _new_version_id,
+        _store_lock,
+        _write_version,
+        current_version,
+        gc_versions,
+        ingest_state,
+    )
+
+    log = log or get_forecast_log()
+    embeddings = get_embeddings(embed_model)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+    )
+
+    with _store_lock(vector_db_path):
+        state = ingest_state(vector_db_path)
+        cursor = tuple(state["cursor"]) if state.get("cursor") else None
+        if next(log.read_since(cursor, limit=1), None) is None:
+            return {
+                "vector_db_path": vector_db_path,
+                "version": current_version(vector_db_path),
+                "num_chunks": 0,
+                "num_docs": 0,
+            }
+
+        os.makedirs(os.path.join(vector_db_path, VERSIONS_DIR), exist_ok=True)
+        version = _new_version_id()
+        vs, record_ids = _open_current(vector_db_path, embeddings, version)
+        progress: Dict[str, Any] = {"cursor": cursor, "docs": 0}
+
+        def _new_documents() -> Iterator[Document]:
+            for _, position, record in log.read_since(cursor):
+                progress["cursor"] = position
+                doc = record_to_document(record, "forecast_log")
+                if doc is not None:
+                    progress["docs"] += 1
+                    yield doc
+
+        vs, num_chunks = index_chunks(
+            iter_chunks(_new_documents(), splitter),
+            embeddings,
+            vs=vs,
+            backend=backend or VECTOR_BACKEND,
+            index_type=index_type,
+        )
+        if vs is None:
+            raise ValueError("No text records in the forecast log")
+        _write_version(
+            vector_db_path, vs, record_ids, version, state={"cursor": list(progress["cursor"])}
+        )
+        gc_versions(vector_db_path)
+        get_catalog().register(
+            vector_db_path,
+            backend=vs.backend,
+            versioned=True,
+            source="forecast_log",
+            embed_model=embed_model,
+            num_chunks=len(vs),
+        )
+
+    return {
+        "vector_db_path": vector_db_path,
+        "version": version,
+        "num_chunks": num_chunks,
+        "num_docs": progress["docs"],
+        "total_vectors": len(vs),
     }
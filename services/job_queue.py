@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "./storage/jobs/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# A running job whose heartbeat is older than this is assumed orphaned
+JOB_STALE_AFTER_S = float(os.getenv("JOB_STALE_AFTER_S", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+Handler = Callable[[Dict[str, Any], Callable[[int], None]], Dict[str, Any]]
+
+
+class JobQueue:
+    """
+    Persistent job queue on SQLite with a pool of worker threads.
+
+    Jobs move queued → running → done|failed. Running jobs heartbeat; when a
+    worker or the whole process dies, stale running jobs are put back in the
+    queue (up to JOB_MAX_ATTEMPTS) by the next sweep or restart.
+    """
+
+    def __init__(
+        self,
+        path: str = JOB_QUEUE_PATH,
+        workers: int = JOB_WORKERS,
+        stale_after_s: float = JOB_STALE_AFTER_S,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ):
+        self.path = path
+        self.workers = workers
+        self.stale_after_s = stale_after_s
+        self.max_attempts = max_attempts
+        self._handlers: Dict[str, Handler] = {}
+        self._wakeup = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " worker TEXT,"
+                " created_at REAL NOT NULL,"
+                " started_at REAL,"
+                " finished_at REAL,"
+                " heartbeat_at REAL,"
+                " chunks_processed INTEGER NOT NULL DEFAULT 0,"
+                " result TEXT,"
+                " error TEXT)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per operation keeps threads independent
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.requeue_stale()
+        for i in range(self.workers):
+            threading.Thread(
+                target=self._worker_loop, name=f"job-worker-{i}", daemon=True
+            ).start()
+
+    def enqueue(self, kind: str, payload: Dict[str, Any]) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at) "
+                "VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, kind, json.dumps(payload), time.time()),
+            )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        result = json.loads(row["result"]) if row["result"] else None
+        elapsed = None
+        if row["started_at"]:
+            elapsed = (row["finished_at"] or time.time()) - row["started_at"]
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "chunks_processed": row["chunks_processed"],
+            "elapsed_s": round(elapsed, 3) if elapsed is not None else None,
+            "chunks_per_s": (
+                round(row["chunks_processed"] / elapsed, 2) if elapsed else None
+            ),
+            "vector_db_path": (result or {}).get("vector_db_path"),
+            "result": result,
+            "error": row["error"],
+        }
+
+    def requeue_stale(self) -> int:
+        """Put orphaned running jobs back in the queue, or fail them when out of attempts."""
+        cutoff = time.time() - self.stale_after_s
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, "
+                " error = 'worker lost; max attempts reached' "
+                "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                (time.time(), cutoff, self.max_attempts),
+            )
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL "
+                "WHERE status = 'running' AND heartbeat_at < ?",
+                (cutoff,),
+            )
+            conn.execute("COMMIT")
+        if cur.rowcount:
+            self._wakeup.set()
+        return cur.rowcount
+
+    # ---- worker side
+
+    def _claim(self, worker: str) -> Optional[sqlite3.Row]:
+        now = time.time()
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' "
+                "ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1,"
+                    " started_at = ?, heartbeat_at = ?, chunks_processed = 0 "
+                    "WHERE id = ?",
+                    (worker, now, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        return row
+
+    def _heartbeat(self, job_id: str, chunks: Optional[int] = None) -> None:
+        with self._connect() as conn:
+            if chunks is None:
+                conn.execute(
+                    "UPDATE jobs SET heartbeat_at = ? WHERE id = ?",
+                    (time.time(), job_id),
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET heartbeat_at = ?, chunks_processed = ? WHERE id = ?",
+                    (time.time(), chunks, job_id),
+                )
+
+    def _finish(self, job_id: str, result: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? "
+                "WHERE id = ?",
+                (
+                    "failed" if error else "done",
+                    time.time(),
+                    json.dumps(result) if result is not None else None,
+                    error,
+                    job_id,
+                ),
+            )
+
+    def _worker_loop(self) -> None:
+        worker = f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+        while True:
+            row = self._claim(worker)
+            if row is None:
+                self._wakeup.wait(timeout=self.stale_after_s / 2)
+                self._wakeup.clear()
+                self.requeue_stale()
+                continue
+            self._run(row)
+
+    def _run(self, row: sqlite3.Row) -> None:
+        job_id = row["id"]
+        done = threading.Event()
+
+        # Heartbeat even while a single batch takes long
+        def _beat() -> None:
+            while not done.wait(self.stale_after_s / 3):
+                self._heartbeat(job_id)
+
+        threading.Thread(target=_beat, daemon=True).start()
+        try:
+            handler = self._handlers[row["kind"]]
+            result = handler(
+                json.loads(row["payload"]),
+                lambda chunks: self._heartbeat(job_id, chunks),
+            )
+            self._finish(job_id, result, None)
+        except Exception as e:
+            self._finish(job_id, None, f"{type(e).__name__}: {e}")
+        finally:
+            done.set()
+
+
+def _ingest_job(payload: Dict[str, Any], progress: Callable[[int], None]) -> Dict[str, Any]:
+    from services.catalog import get_catalog
+    from services.ingest_service import build_vector_db_from_json
+    from services.vectordb_admin import VECTOR_DB_MAX_MB, enforce_budget
+
+    result = build_vector_db_from_json(progress=progress, **payload)
+    if VECTOR_DB_MAX_MB > 0:
+        result["stores_evicted"] = enforce_budget(
+            get_catalog(), VECTOR_DB_MAX_MB * 1024 * 1024, keep=[result["vector_db_path"]]
+        )
+    return result
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide queue with the ingest handler registered and workers running."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+            _queue.register("ingest", _ingest_job)
+            _queue.start()
+        return _queue
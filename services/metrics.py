@@ -0,0 +1,192 @@
+"""
+In-process Prometheus metrics, rendered in the text exposition format
+(0.0.4) by /metrics. Values are per process: with several workers each
+one exposes its own, and Prometheus aggregates across targets.
+"""
+import math
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Seconds: sub-ms cached lookups up to multi-second LLM calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+_registry: List[Any] = []  # _Metric or StatsCollector
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {sorted(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return super().render() + [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in values
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> (per-bucket counts, sum)
+        self._values: Dict[LabelValues, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+        lines = super().render()
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _labels(self.labelnames, key, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class StatsCollector:
+    """
+    Exposes the numeric entries of an existing stats() dict at scrape time
+    (e.g. a cache's hits and misses): keys in `counters` as counters, the
+    rest as gauges. With `label`, stats() returns {label value: stats}.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        documentation: str,
+        stats: Callable[[], Dict[str, Any]],
+        counters: Sequence[str] = (),
+        label: Optional[str] = None,
+    ):
+        self.prefix = prefix
+        self.documentation = documentation
+        self.stats = stats
+        self.counters = set(counters)
+        self.label = label
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        stats = self.stats()
+        groups = stats if self.label else {None: stats}
+        samples: Dict[str, List[str]] = {}
+        for label_value, values in groups.items():
+            labels = _labels((self.label,), (label_value,)) if self.label else ""
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue  # nested stats, names
+                name = f"{self.prefix}_{key}" + ("_total" if key in self.counters else "")
+                samples.setdefault(name, []).append(f"{name}{labels} {_number(value)}")
+        lines: List[str] = []
+        for name, values in samples.items():
+            kind = "counter" if name.endswith("_total") else "gauge"
+            lines += [f"# HELP {name} {self.documentation}", f"# TYPE {name} {kind}", *values]
+        return lines
+
+
+def render_metrics() -> str:
+    """Every registered metric in the Prometheus text format."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# stage: index_load, index_save, embedding, retrieval, llm, weather_api
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds", "Latency of one pipeline stage.", ("stage",)
+)
+TOOL_SECONDS = Histogram(
+    "rag_tool_duration_seconds", "Latency of one agent tool call.", ("tool", "status")
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "rag_http_request_duration_seconds",
+    "Latency of one HTTP request (to the first byte for streamed responses).",
+    ("route", "method", "status"),
+)
+LLM_TOKENS = Counter(
+    "rag_llm_tokens_total", "LLM tokens reported by the API.", ("model", "kind")
+)
+LLM_CALLS = Counter("rag_llm_calls_total", "LLM API calls.", ("model", "status"))
+REQUEST_TOKENS = Histogram(
+    "rag_request_llm_tokens",
+    "LLM tokens (prompt + completion) spent by one HTTP request.",
+    ("route",),
+    buckets=TOKEN_BUCKETS,
+)
+ROUTER_DECISIONS = Counter(
+    "rag_agent_router_decisions_total", "Intent router decisions.", ("decision", "intent")
+)
+ROUTER_LLM_CALLS_AVOIDED = Counter(
+    "rag_agent_router_llm_calls_avoided_total", "Agent LLM calls the intent router avoided."
+)
@@ -1,10 +1,146 @@
 import os
-from typing import Dict
+import time
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import FAISS
+from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.chains import RetrievalQA
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.schema import Document
+
+from services.answer_cache import SemanticAnswerCache
+from services.catalog import get_catalog
+from services.context_compression import (
+    CONTEXT_FETCH_K,
+    CompressedRetriever,
+    ScoredDocs,
+    compress_context,
+    describe_chunks,
+)
+from services.embedding_cache import CachedEmbeddings, get_embeddings
+from services.metrics import StatsCollector
+from services.tokens import count_tokens
+from services.tracing import timed, tracing_handler
+from services.vectorstore_cache import VectorStoreCache, store_version
+from services.vectorstores.base import VectorIndex
+from services.vectorstores.hybrid import HYBRID_RRF_K, HybridRetriever
+from services.vectorstores.registry import load_index, store_backend
+from services.versioned_store import resolve_store_path
+
+# Shared across /query requests and retrieval_qa tool calls
+_vector_store_cache = VectorStoreCache(
+    max_entries=int(os.getenv("VECTOR_STORE_CACHE_ENTRIES", "16")),
+    max_bytes=int(os.getenv("VECTOR_STORE_CACHE_MB", "512")) * 1024 * 1024,
+)
+
+# Near-duplicate questions against an unchanged index skip the LLM
+_answer_cache = SemanticAnswerCache()
+
+RETRIEVAL_MODES = ("vector", "hybrid")
+# hybrid fuses vector and BM25 rankings; stores without a lexical index
+# (saved before it existed) fall back to vector
+QUERY_RETRIEVAL = os.getenv("QUERY_RETRIEVAL", "hybrid")
+# Filter, deduplicate and token-budget retrieved chunks (context_compression);
+# off: a fixed k=4 chunks as retrieved
+CONTEXT_COMPRESSION = os.getenv("CONTEXT_COMPRESSION", "1").lower() in ("1", "true", "yes")
+
+# Stores searched concurrently by a federated query
+FEDERATED_QUERY_WORKERS = int(os.getenv("FEDERATED_QUERY_WORKERS", "8"))
+_search_pool = ThreadPoolExecutor(
+    max_workers=FEDERATED_QUERY_WORKERS, thread_name_prefix="federated-search"
+)
+
+
+def _get_embeddings() -> CachedEmbeddings:
+    # Embeddings (must match ingest model); repeated questions hit the cache
+    return get_embeddings("text-embedding-3-small")
+
+
+@lru_cache(maxsize=None)
+def _get_llm(streaming: bool = False) -> ChatOpenAI:
+    # streaming=True makes invoke() emit on_llm_new_token to callbacks
+    return ChatOpenAI(
+        model="gpt-4o-mini",
+        temperature=0.1,
+        streaming=streaming,
+        # Token usage on streamed responses too (request token metrics)
+        stream_usage=streaming,
+        callbacks=[tracing_handler],
+    )
+
+
+def load_vector_store(vector_db_path: str) -> VectorIndex:
+    """
+    Return the store at vector_db_path, loading it from disk only on a
+    cache miss or when its files changed since the cached load. A versioned
+    store resolves to its current version; the backend is the one the
+    catalog records for the store.
+    """
+    backend = store_backend(vector_db_path)
+    vs = _vector_store_cache.get(
+        resolve_store_path(vector_db_path),
+        lambda path: load_index(path, _get_embeddings(), backend),
+    )
+    get_catalog().touch(vector_db_path)
+    return vs
+
+
+def invalidate_vector_store(vector_db_path: str) -> None:
+    """Drop a store's loaded index and cached answers, e.g. before deleting it."""
+    _vector_store_cache.invalidate(resolve_store_path(vector_db_path))
+    _answer_cache.invalidate(vector_db_path)
+
+
+def vector_store_cache_stats() -> Dict[str, Any]:
+    return _vector_store_cache.stats()
+
+
+def answer_cache_stats() -> Dict[str, Any]:
+    return _answer_cache.stats()
+
+
+StatsCollector(
+    "rag_vector_store_cache",
+    "Loaded vector store cache (services.vectorstore_cache).",
+    vector_store_cache_stats,
+    counters=("hits", "misses", "evictions", "invalidations"),
+)
+StatsCollector(
+    "rag_answer_cache",
+    "Semantic answer cache (services.answer_cache).",
+    answer_cache_stats,
+    counters=("hits", "misses", "bypassed", "expired", "invalidations"),
+)
+
+
+def _lookup_answer(
+    vector_db_path: str, question: str, use_cache: bool, retrieval: Optional[str] = None
+) -> Tuple[str, Optional[List[float]], Optional[Dict[str, Any]]]:
+    """(index version, question embedding, cached answer or None)."""
+    version = store_version(resolve_store_path(vector_db_path))
+    if not use_cache:
+        _answer_cache.record_bypass()
+        return version, None, None
+    vector = _get_embeddings().embed_query(question)
+    mode = retrieval or QUERY_RETRIEVAL
+    return version, vector, _answer_cache.lookup(vector_db_path, version, vector, mode)
+
+
+def _remember_answer(
+    vector_db_path: str,
+    version: str,
+    question: str,
+    vector: Optional[List[float]],
+    answer: str,
+    retrieval: Optional[str] = None,
+) -> None:
+    if vector is not None and answer:
+        mode = retrieval or QUERY_RETRIEVAL
+        _answer_cache.put(vector_db_path, version, question, vector, answer, mode)
 
 
 def _build_prompt() -> PromptTemplate:
@@ -30,59 +166,278 @@ def _build_prompt() -> PromptTemplate:
     )
 
 
-def answer_question(
-    *,
-    vector_db_path: str,
-    question: str,
-) -> Dict:
-    """
-    Load the FAISS vector DB at vector_db_path and answer the question using 
-    RetrievalQA. Returns {answer}.
-    """
+def _validate(vector_db_path: str, question: str, retrieval: Optional[str] = None) -> None:
     if not vector_db_path or not os.path.isdir(vector_db_path):
         raise ValueError("vector_db_path must be an existing directory")
+    _validate_question(question, retrieval)
+
+
+def _validate_question(question: str, retrieval: Optional[str] = None) -> None:
     if not question or not question.strip():
         raise ValueError("question must be a non-empty string")
+    if retrieval is not None and retrieval not in RETRIEVAL_MODES:
+        raise ValueError(f"retrieval must be one of {RETRIEVAL_MODES}")
 
-    # Embeddings (must match ingest model)
-    embeddings = OpenAIEmbeddings(
-        model="text-embedding-3-small"
-    )
 
-    # Load FAISS vector store
-    vectordb = FAISS.load_local(
-        vector_db_path,
-        embeddings,
-        allow_dangerous_deserialization=True  # required in recent LangChain
-    )
+def _use_hybrid(vectordb: VectorIndex, retrieval: Optional[str]) -> bool:
+    return (retrieval or QUERY_RETRIEVAL) == "hybrid" and vectordb.lexical is not None
+
+
+def _scored_search(
+    vectordb: VectorIndex, retrieval: Optional[str], k: int
+) -> Callable[[str], ScoredDocs]:
+    """Top-k (document, vector relevance) search for the retrieval mode."""
+    if _use_hybrid(vectordb, retrieval):
+        hybrid = HybridRetriever(
+            vectorstore=vectordb.as_vectorstore(), lexical=vectordb.lexical, k=k
+        )
+        return hybrid.scored
+    store = vectordb.as_vectorstore()
+    return lambda query: store.similarity_search_with_relevance_scores(query, k=k)
+
+
+def _build_retriever(vectordb: VectorIndex, retrieval: Optional[str], k: int = 4):
+    if CONTEXT_COMPRESSION:
+        return CompressedRetriever(search=_scored_search(vectordb, retrieval, CONTEXT_FETCH_K))
+    if _use_hybrid(vectordb, retrieval):
+        return HybridRetriever(
+            vectorstore=vectordb.as_vectorstore(), lexical=vectordb.lexical, k=k
+        )
+    return vectordb.as_retriever(search_type="similarity", search_kwargs={"k": k})
+
+
+def _build_chain(
+    vector_db_path: str, streaming: bool = False, retrieval: Optional[str] = None
+) -> RetrievalQA:
+    # Load vector store (cached per process)
+    vectordb = load_vector_store(vector_db_path)
 
     # Retriever
-    retriever = vectordb.as_retriever(
-        search_type="similarity",
-        search_kwargs={"k": 4}
-    )
+    retriever = _build_retriever(vectordb, retrieval)
 
     # LLM
-    llm = ChatOpenAI(
-        model="gpt-4o-mini",
-        temperature=0.1
-    )
+    llm = _get_llm(streaming)
 
     # Prompt
     prompt = _build_prompt()
 
     # Chain
-    qa = RetrievalQA.from_chain_type(
+    return RetrievalQA.from_chain_type(
         llm=llm,
         retriever=retriever,
         chain_type="stuff",
-        return_source_documents=False,
+        return_source_documents=True,
         chain_type_kwargs={"prompt": prompt},
     )
 
-    result = qa.invoke({"query": question})
-    answer: str = result.get("result", "")
 
+def _answer_result(question: str, answer: str, docs: List[Document]) -> Dict[str, Any]:
+    """Response body for an LLM answer: the answer and what the prompt cost."""
     return {
         "answer": answer,
-    }
\ No newline at end of file
+        "cached": False,
+        "prompt_tokens": count_tokens(_format_prompt(question, docs)),
+        "chunks": describe_chunks(docs),
+    }
+
+
+def _format_prompt(question: str, docs: List[Document]) -> str:
+    # Same text the "stuff" chain sends: page contents joined by blank lines
+    context = "\n\n".join(doc.page_content for doc in docs)
+    return _build_prompt().format(context=context, question=question)
+
+
+def answer_question(
+    *,
+    vector_db_path: str,
+    question: str,
+    callbacks: Optional[List[BaseCallbackHandler]] = None,
+    use_cache: bool = True,
+    retrieval: Optional[str] = None,
+) -> Dict:
+    """
+    Load the vector DB at vector_db_path and answer the question using 
+    RetrievalQA. Returns {answer, cached, prompt_tokens, chunks}: the
+    prompt's token count and the retrieved chunks stuffed into it.
+    With callbacks, the LLM streams and tokens reach them as they arrive.
+    A semantically matching answer for the same index version and retrieval
+    mode is returned without calling the LLM unless use_cache is False.
+    retrieval is "vector" or "hybrid" (default: QUERY_RETRIEVAL).
+    """
+    _validate(vector_db_path, question, retrieval)
+
+    version, vector, hit = _lookup_answer(vector_db_path, question, use_cache, retrieval)
+    if hit is not None:
+        return {"answer": hit["answer"], "cached": True, "prompt_tokens": 0, "chunks": []}
+
+    qa = _build_chain(vector_db_path, streaming=bool(callbacks), retrieval=retrieval)
+    result = qa.invoke(
+        {"query": question}, config={"callbacks": [*(callbacks or []), tracing_handler]}
+    )
+    response = _answer_result(
+        question, result.get("result", ""), result.get("source_documents") or []
+    )
+    _remember_answer(
+        vector_db_path, version, question, vector, response["answer"], retrieval
+    )
+    return response
+
+
+async def aanswer_question(
+    *,
+    vector_db_path: str,
+    question: str,
+    use_cache: bool = True,
+    retrieval: Optional[str] = None,
+) -> Dict:
+    """
+    Async variant of answer_question for the ASGI app. The (possibly cold)
+    index load runs in a worker thread; retrieval and the LLM call are awaited.
+    """
+    _validate(vector_db_path, question, retrieval)
+
+    version, vector, hit = await asyncio.to_thread(
+        _lookup_answer, vector_db_path, question, use_cache, retrieval
+    )
+    if hit is not None:
+        return {"answer": hit["answer"], "cached": True, "prompt_tokens": 0, "chunks": []}
+
+    qa = await asyncio.to_thread(_build_chain, vector_db_path, False, retrieval)
+    result = await qa.ainvoke({"query": question}, config={"callbacks": [tracing_handler]})
+    response = _answer_result(
+        question, result.get("result", ""), result.get("source_documents") or []
+    )
+    _remember_answer(
+        vector_db_path, version, question, vector, response["answer"], retrieval
+    )
+    return response
+
+
+def federated_targets(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    answer_question_federated arguments from a /query body, or None when it
+    names a single store (no vector_db_paths or tag).
+    """
+    paths = data.get("vector_db_paths") or []
+    if isinstance(paths, str):
+        paths = [paths]
+    tag = data.get("tag")
+    if not paths and not tag:
+        return None
+    if data.get("vector_db_path"):
+        paths = [data["vector_db_path"], *paths]
+    return {"vector_db_paths": list(paths), "tag": tag}
+
+
+def resolve_store_paths(
+    vector_db_paths: Optional[List[str]] = None, tag: Optional[str] = None
+) -> List[str]:
+    """
+    Stores for a federated query: the given paths plus every catalogued
+    store tagged `tag`. They must share one embedding model.
+    """
+    catalog = get_catalog()
+    paths = list(vector_db_paths or [])
+    if tag:
+        paths += [e["path"] for e in catalog.entries() if tag in e["tags"]]
+    paths = list(dict.fromkeys(os.path.normpath(p) for p in paths))
+    if not paths:
+        raise ValueError(f"No vector stores tagged {tag!r}" if tag else "No vector stores given")
+    for path in paths:
+        if not os.path.isdir(path):
+            raise ValueError(f"vector_db_path must be an existing directory: {path}")
+    models = {e["embed_model"] for e in map(catalog.get, paths) if e is not None} - {None}
+    if len(models) > 1:
+        raise ValueError(f"Stores use different embedding models: {sorted(models)}")
+    return paths
+
+
+def _search_store(
+    path: str, question: str, retrieval: Optional[str]
+) -> Tuple[ScoredDocs, Dict[str, Any]]:
+    """Scored top-k of one store, tagged with the store, plus its timings."""
+    start = time.perf_counter()
+    vectordb = load_vector_store(path)
+    loaded = time.perf_counter()
+    with timed("retrieval"):
+        hits = _scored_search(vectordb, retrieval, CONTEXT_FETCH_K)(question)
+    done = time.perf_counter()
+    hits = [
+        (Document(page_content=doc.page_content, metadata={**doc.metadata, "store": path}), score)
+        for doc, score in hits
+    ]
+    return hits, {
+        "path": path,
+        "hits": len(hits),
+        "load_ms": round((loaded - start) * 1000, 2),
+        "search_ms": round((done - loaded) * 1000, 2),
+    }
+
+
+def _merge_hits(per_store: List[ScoredDocs]) -> ScoredDocs:
+    """
+    All stores' hits fused by reciprocal rank, as hybrid retrieval fuses its
+    rankings: raw relevance is not calibrated across backends (or across
+    hybrid and vector-only stores), but each store's own order is. Hits
+    keep their store's relevance for compress_context's threshold.
+    """
+    keyed = [
+        (1.0 / (HYBRID_RRF_K + rank), doc, score)
+        for hits in per_store
+        for rank, (doc, score) in enumerate(hits, start=1)
+    ]
+    keyed.sort(key=lambda item: item[0], reverse=True)
+    return [(doc, score) for _, doc, score in keyed]
+
+
+def _federated_search(
+    paths: List[str], question: str, retrieval: Optional[str]
+) -> Tuple[List[Document], List[Dict[str, Any]]]:
+    # One embedding call up front; the per-store searches then hit the cache
+    _get_embeddings().embed_query(question)
+    # Each search runs in the request's context so its stages join its trace
+    results = list(_search_pool.map(
+        lambda p, ctx: ctx.run(_search_store, p, question, retrieval),
+        paths,
+        [contextvars.copy_context() for _ in paths],
+    ))
+    docs = compress_context(_merge_hits([hits for hits, _ in results]))
+    return docs, [timing for _, timing in results]
+
+
+def answer_question_federated(
+    *,
+    question: str,
+    vector_db_paths: Optional[List[str]] = None,
+    tag: Optional[str] = None,
+    callbacks: Optional[List[BaseCallbackHandler]] = None,
+    retrieval: Optional[str] = None,
+) -> Dict:
+    """
+    Answer from several stores at once: the given paths and/or every store
+    with catalog tag `tag`, searched concurrently (cached indexes), merged
+    by per-store rank, compressed and answered with a single LLM call. Returns
+    the answer_question body plus per-store timings under "stores".
+    """
+    _validate_question(question, retrieval)
+    paths = resolve_store_paths(vector_db_paths, tag)
+    docs, stores = _federated_search(paths, question, retrieval)
+    message = _get_llm(bool(callbacks)).invoke(
+        _format_prompt(question, docs), config={"callbacks": callbacks}
+    )
+    return {**_answer_result(question, message.content, docs), "stores": stores}
+
+
+async def aanswer_question_federated(
+    *,
+    question: str,
+    vector_db_paths: Optional[List[str]] = None,
+    tag: Optional[str] = None,
+    retrieval: Optional[str] = None,
+) -> Dict:
+    """Async variant of answer_question_federated for the ASGI app."""
+    _validate_question(question, retrieval)
+    paths = await asyncio.to_thread(resolve_store_paths, vector_db_paths, tag)
+    docs, stores = await asyncio.to_thread(_federated_search, paths, question, retrieval)
+    message = await _get_llm().ainvoke(_format_prompt(question, docs))
+    return {**_answer_result(question, message.content, docs), "stores": stores}
@@ -0,0 +1,97 @@
+import json
+import queue
+import contextvars
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List
+from uuid import UUID
+
+from langchain.callbacks.base import BaseCallbackHandler
+
+_DONE = object()
+
+
+def sse(event: str, data: Any) -> str:
+    """One server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class QueueCallbackHandler(BaseCallbackHandler):
+    """
+    Pushes LLM tokens and agent tool events onto a queue as they happen so
+    an HTTP response can forward them while the chain is still running.
+    """
+
+    def __init__(self):
+        self.queue: "queue.Queue[Any]" = queue.Queue()
+        self._tool_started: Dict[UUID, float] = {}
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            self.queue.put(("token", {"token": token}))
+
+    def on_tool_start(
+        self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._tool_started[run_id] = time.perf_counter()
+        self.queue.put(("tool_start", {
+            "tool": (serialized or {}).get("name"),
+            "input": input_str,
+        }))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._tool_started.pop(run_id, None)
+        self.queue.put(("tool_end", {
+            "tool": kwargs.get("name"),
+            "duration_ms": (
+                round((time.perf_counter() - started) * 1000, 1)
+                if started is not None else None
+            ),
+        }))
+        self.queue.put(("observation", {"observation": str(output)}))
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._tool_started.pop(run_id, None)
+        self.queue.put(("tool_error", {"error": str(error)}))
+
+
+def stream_events(
+    run: Callable[[List[BaseCallbackHandler]], Dict[str, Any]],
+    heartbeat_s: float = 15.0,
+) -> Iterator[str]:
+    """
+    Run `run(callbacks)` in a worker thread and yield SSE frames for every
+    callback event, then a final `done` event carrying its return value
+    (or an `error` event). Comment frames keep idle proxies from timing out.
+    """
+    handler = QueueCallbackHandler()
+
+    def _worker() -> None:
+        try:
+            handler.queue.put(("done", run([handler])))
+        except Exception as e:
+            handler.queue.put(("error", {"error": str(e)}))
+        finally:
+            handler.queue.put(_DONE)
+
+    # The request's context (its trace) carries over into the worker
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(_worker,), daemon=True).start()
+
+    while True:
+        try:
+            item = handler.queue.get(timeout=heartbeat_s)
+        except queue.Empty:
+            yield ": keep-alive\n\n"
+            continue
+        if item is _DONE:
+            return
+        event, data = item
+        yield sse(event, data)
+
+
+SSE_HEADERS: Dict[str, str] = {
+    "Cache-Control": "no-cache",
+    # Stop nginx-style proxies from buffering the stream
+    "X-Accel-Buffering": "no",
+}
@@ -0,0 +1,17 @@
+from typing import Any
+
+_encoding: Any = None
+
+
+def count_tokens(text: str) -> int:
+    """OpenAI token count of text, or a chars/4 estimate without tiktoken."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:  # tiktoken missing or its BPE file can't be fetched
+            _encoding = False
+    if _encoding is False:
+        return max(1, len(text) // 4) if text else 0
+    return len(_encoding.encode(text))
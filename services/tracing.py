@@ -0,0 +1,267 @@
+"""
+Per-request tracing: stage timers and a LangChain callback handler feed
+the histograms in services.metrics and the current request's trace, which
+is logged as one structured (JSON) line for a sample of requests.
+"""
+import os
+import json
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID, uuid4
+
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from services.metrics import (
+    HTTP_REQUEST_SECONDS,
+    LLM_CALLS,
+    LLM_TOKENS,
+    REQUEST_TOKENS,
+    STAGE_SECONDS,
+    TOOL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Share of requests whose trace and debug events are logged
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+# Slower requests (and failed ones) are always logged
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "5000"))
+
+
+class RequestTrace:
+    """Stage timings and LLM token counts of one HTTP request."""
+
+    def __init__(self, route: str, method: str = ""):
+        self.trace_id = uuid4().hex[:16]
+        self.route = route
+        self.method = method
+        self.sampled = random.random() < TRACE_SAMPLE_RATE
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.llm_calls = 0
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"count": 0, "ms": 0.0})
+            entry["count"] += 1
+            entry["ms"] = round(entry["ms"] + seconds * 1000, 2)
+
+    def add_tokens(self, prompt: int, completion: int) -> None:
+        with self._lock:
+            self.llm_calls += 1
+            self.tokens["prompt"] += prompt
+            self.tokens["completion"] += completion
+
+    def summary(self, status: int) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "route": self.route,
+                "method": self.method,
+                "status": status,
+                "duration_ms": round((time.perf_counter() - self.started) * 1000, 1),
+                "stages": {k: dict(v) for k, v in self.stages.items()},
+                "llm_calls": self.llm_calls,
+                "tokens": dict(self.tokens),
+            }
+
+
+_current: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current.get()
+
+
+def start_trace(route: str, method: str = "") -> RequestTrace:
+    """Make a new trace current for this request's context."""
+    trace = RequestTrace(route, method)
+    _current.set(trace)
+    return trace
+
+
+def finish_trace(trace: RequestTrace, status: int, route: Optional[str] = None) -> None:
+    """Record the request's latency and tokens; log its trace if sampled, slow or failed."""
+    if route:
+        trace.route = route
+    summary = trace.summary(status)
+    HTTP_REQUEST_SECONDS.observe(
+        summary["duration_ms"] / 1000, route=trace.route, method=trace.method, status=str(status)
+    )
+    REQUEST_TOKENS.observe(sum(trace.tokens.values()), route=trace.route)
+    if trace.sampled or status >= 500 or summary["duration_ms"] >= TRACE_SLOW_MS:
+        logger.info("request_trace", extra={"fields": summary})
+    _current.set(None)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Record an already measured stage duration."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = _current.get()
+    if trace is not None:
+        trace.add_stage(stage, seconds)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time the block as one `stage` (also when it raises)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def log_event(log: logging.Logger, event: str, level: int = logging.DEBUG, **fields: Any) -> None:
+    """
+    Structured log line for `event`. Below WARNING only for sampled
+    requests (the whole request or nothing), so debug detail stays cheap.
+    """
+    if not log.isEnabledFor(level):
+        return
+    if level < logging.WARNING:
+        trace = _current.get()
+        sampled = trace.sampled if trace is not None else random.random() < TRACE_SAMPLE_RATE
+        if not sampled:
+            return
+    log.log(level, event, extra={"fields": fields})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, event, trace_id, fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line: Dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        trace = _current.get()
+        if trace is not None:
+            line["trace_id"] = trace.trace_id
+        line.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            line["exc"] = self.formatException(record.exc_info)
+        return json.dumps(line, ensure_ascii=False, default=str)
+
+
+_logging_configured = False
+
+
+def configure_logging() -> None:
+    """JSON log lines on stderr at LOG_LEVEL (once per process)."""
+    global _logging_configured
+    if _logging_configured:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+    _logging_configured = True
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Times LLM calls, retrievals and tool calls of any chain or agent it is
+    attached to, and counts the tokens the API reports. One instance is
+    shared; runs are keyed by run_id, so concurrent requests do not mix.
+    """
+
+    def __init__(self):
+        self._started: Dict[UUID, float] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID) -> None:
+        with self._lock:
+            self._started.setdefault(run_id, time.perf_counter())
+
+    def _stop(self, run_id: UUID) -> Optional[float]:
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        return None if started is None else time.perf_counter() - started
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        seconds = self._stop(run_id)
+        if seconds is None:
+            return
+        observe_stage("llm", seconds)
+        model, prompt, completion = _usage(response)
+        LLM_CALLS.inc(model=model, status="ok")
+        LLM_TOKENS.inc(prompt, model=model, kind="prompt")
+        LLM_TOKENS.inc(completion, model=model, kind="completion")
+        trace = _current.get()
+        if trace is not None:
+            trace.add_tokens(prompt, completion)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        seconds = self._stop(run_id)
+        if seconds is not None:
+            observe_stage("llm", seconds)
+            LLM_CALLS.inc(model="unknown", status="error")
+
+    def on_retriever_start(self, serialized: Dict[str, Any], query: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_retriever_end(self, documents: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        seconds = self._stop(run_id)
+        if seconds is not None:
+            observe_stage("retrieval", seconds)
+
+    def on_retriever_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        seconds = self._stop(run_id)
+        if seconds is not None:
+            observe_stage("retrieval", seconds)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_tool(run_id, kwargs.get("name"), "ok")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_tool(run_id, kwargs.get("name"), "error")
+
+    def _end_tool(self, run_id: UUID, name: Optional[str], status: str) -> None:
+        seconds = self._stop(run_id)
+        if seconds is not None:
+            TOOL_SECONDS.observe(seconds, tool=name or "unknown", status=status)
+
+
+def _usage(response: LLMResult) -> Any:
+    """(model, prompt tokens, completion tokens) of an LLM response."""
+    output = response.llm_output or {}
+    model = output.get("model_name") or "unknown"
+    usage = output.get("token_usage") or {}
+    if usage:
+        return model, int(usage.get("prompt_tokens") or 0), int(usage.get("completion_tokens") or 0)
+    # Streamed chat responses carry usage on the message instead
+    prompt = completion = 0
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            meta = getattr(message, "usage_metadata", None) or {}
+            prompt += int(meta.get("input_tokens") or 0)
+            completion += int(meta.get("output_tokens") or 0)
+            model = (getattr(message, "response_metadata", None) or {}).get("model_name") or model
+    return model, prompt, completion
+
+
+# Shared by every LLM client and agent/chain invocation
+tracing_handler = TracingCallbackHandler()
@@ -0,0 +1,457 @@
+"""
+Housekeeping for storage/vectordb, driven by the store catalog.
+
+    python -m services.vectordb_admin sync
+    python -m services.vectordb_admin list
+    python -m services.vectordb_admin delete --idle-for 7 --origin discovered --dry-run
+    python -m services.vectordb_admin prune --max-total-mb 2048
+    python -m services.vectordb_admin compact storage/vectordb/weather/karachi_3
+    python -m services.vectordb_admin merge storage/vectordb/weather/faiss/* --compact --delete-sources
+    python -m services.vectordb_admin upgrade
+    python -m services.vectordb_admin index-forecasts
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import argparse
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_community.vectorstores import FAISS
+
+from services.catalog import VECTOR_DB_ROOT, Catalog, detect_backend, dir_size, discover_stores, get_catalog
+from services.embedding_cache import get_embeddings
+from services.ingest_service import update_vector_db_from_log
+from services.vectorstores.base import VectorIndex
+from services.vectorstores.docstore import DOCS_FILE, OFFSETS_FILE
+from services.vectorstores.faiss_index import INDEX_FILE, LEGACY_DOCSTORE_FILE, FaissIndex, is_legacy_store
+from services.vectorstores.lexical import LEXICAL_DIR, LEXICAL_INDEX, load_lexical_index, write_lexical_index
+from services.vectorstores.registry import BACKENDS, create_index, get_backend, load_index
+from services.versioned_store import gc_versions, replace_index, resolve_store_path
+
+# Total on-disk budget for stores; least recently used ones are deleted
+# after each ingest job once it is exceeded (0 = unbounded)
+VECTOR_DB_MAX_MB = int(os.getenv("VECTOR_DB_MAX_MB", "0"))
+DEFAULT_EMBED_MODEL = "text-embedding-3-small"
+# Store the forecast log is incrementally indexed into (index-forecasts)
+FORECAST_INDEX_PATH = os.getenv("FORECAST_INDEX_PATH", "./storage/vectordb/weather/forecast_log")
+
+
+def sync_catalog(catalog: Catalog, root: str = VECTOR_DB_ROOT) -> Dict[str, List[str]]:
+    """
+    Register stores found under `root` that no ingest recorded (origin
+    "discovered") and forget entries whose directory no longer exists.
+    """
+    known = {e["path"]: e for e in catalog.entries()}
+    discovered = []
+    for path, backend, versioned in discover_stores(root):
+        entry = known.get(os.path.normpath(os.path.abspath(path)))
+        if entry is None:
+            catalog.register(
+                path,
+                backend=backend,
+                versioned=versioned,
+                origin="discovered",
+                created_at=os.path.getmtime(path),
+            )
+            discovered.append(path)
+        elif entry["size_bytes"] != dir_size(entry["path"]):
+            catalog.register(path, backend=backend, versioned=versioned)
+
+    missing = [p for p in known if not os.path.isdir(p)]
+    for path in missing:
+        catalog.remove(path)
+    return {"discovered": discovered, "missing": missing}
+
+
+def last_used(entry: Dict[str, Any]) -> float:
+    return entry["last_access"] or entry["created_at"]
+
+
+def select_stores(
+    entries: List[Dict[str, Any]],
+    older_than_s: Optional[float] = None,
+    idle_for_s: Optional[float] = None,
+    larger_than_bytes: Optional[int] = None,
+    origin: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Entries matching every given criterion."""
+    now = time.time()
+    selected = []
+    for e in entries:
+        if older_than_s is not None and now - e["created_at"] < older_than_s:
+            continue
+        if idle_for_s is not None and now - last_used(e) < idle_for_s:
+            continue
+        if larger_than_bytes is not None and e["size_bytes"] <= larger_than_bytes:
+            continue
+        if origin is not None and e["origin"] != origin:
+            continue
+        selected.append(e)
+    return selected
+
+
+def delete_stores(
+    catalog: Catalog, entries: List[Dict[str, Any]], dry_run: bool = False
+) -> List[str]:
+    from services.query_service import invalidate_vector_store
+
+    deleted = []
+    for e in entries:
+        if not dry_run:
+            if os.path.isdir(e["path"]):
+                invalidate_vector_store(e["path"])
+                shutil.rmtree(e["path"], ignore_errors=True)
+            catalog.remove(e["path"])
+        deleted.append(e["path"])
+    return deleted
+
+
+def enforce_budget(
+    catalog: Catalog,
+    max_total_bytes: int,
+    keep: Optional[List[str]] = None,
+    dry_run: bool = False,
+) -> List[str]:
+    """
+    Delete least recently used stores until the catalogued total fits in
+    `max_total_bytes`. Paths in `keep` are never deleted.
+    """
+    keep_keys = {os.path.normpath(os.path.abspath(p)) for p in keep or []}
+    entries = sorted(catalog.entries(), key=last_used)
+    total = sum(e["size_bytes"] for e in entries)
+    victims = []
+    for e in entries:
+        if total <= max_total_bytes:
+            break
+        if e["path"] in keep_keys:
+            continue
+        victims.append(e)
+        total -= e["size_bytes"]
+    return delete_stores(catalog, victims, dry_run)
+
+
+def _load(entry: Dict[str, Any]) -> VectorIndex:
+    return load_index(
+        entry["path"],
+        get_embeddings(entry["embed_model"] or DEFAULT_EMBED_MODEL),
+        entry["backend"],
+    )
+
+
+def _require_store(catalog: Catalog, path: str) -> Dict[str, Any]:
+    entry = catalog.get(path)
+    if entry is None:
+        found = detect_backend(path)
+        if found is None:
+            raise ValueError(f"Not a vector store: {path}")
+        entry = catalog.register(path, backend=found[0], versioned=found[1], origin="discovered")
+    return entry
+
+
+def _exact_items(vs: VectorIndex) -> Iterator[Tuple[str, Document, List[float]]]:
+    """
+    vs.items() for rebuilding from. IVF-PQ stores only hold lossy codes, and
+    a rebuild from their reconstructed vectors loses recall, so they are refused.
+    """
+    if vs.backend == "faiss" and vs.describe().get("type") == "ivfpq":
+        raise ValueError(
+            "IVF-PQ stores cannot be compacted or merged; rebuild the store "
+            "from its sources instead"
+        )
+    return vs.items()
+
+
+def _rebuild(
+    rows: List[Tuple[str, Document, List[float]]],
+    embeddings: Embeddings,
+    backend: str,
+    keep_ids: bool = True,
+    index_type: Optional[str] = None,
+) -> VectorIndex:
+    """
+    New index holding `rows` (FAISS: of `index_type`); vectors are reused,
+    nothing is re-embedded.
+    """
+    vs = create_index(embeddings, backend, index_type=index_type if backend == "faiss" else None)
+    for start in range(0, len(rows), 1000):
+        batch = rows[start:start + 1000]
+        vs.add(
+            [d.page_content for _, d, _ in batch],
+            [v for _, _, v in batch],
+            [d.metadata for _, d, _ in batch],
+            [i for i, _, _ in batch] if keep_ids else None,
+        )
+    return vs
+
+
+def _dedupe(vs: VectorIndex) -> VectorIndex:
+    """Copy of `vs` without repeated chunk texts; the most recently added copy wins."""
+    latest: Dict[str, Tuple[str, Document, List[float]]] = {}
+    for row in _exact_items(vs):
+        latest.pop(row[1].page_content, None)
+        latest[row[1].page_content] = row
+    # Keeps the index type the store was built with
+    return _rebuild(
+        list(latest.values()), vs.embeddings, vs.backend, index_type=getattr(vs, "index_type", None)
+    )
+
+
+def compact_store(catalog: Catalog, path: str) -> Dict[str, Any]:
+    """
+    Versioned stores: remove every superseded version. Plain stores: rewrite
+    the index without duplicate chunks, swapped in as a new version.
+    """
+    entry = _require_store(catalog, path)
+    before_bytes = entry["size_bytes"]
+    if entry["versioned"]:
+        removed = gc_versions(path, keep_versions=0, max_version_age_s=0)
+        entry = catalog.register(path, backend=entry["backend"], versioned=True)
+        return {
+            "path": path,
+            "versions_removed": len(removed),
+            "bytes_before": before_bytes,
+            "bytes_after": entry["size_bytes"],
+        }
+
+    vs = _load(entry)
+    before = len(vs)
+    compacted = _dedupe(vs)
+    if len(compacted) < before:
+        replace_index(path, compacted)
+    entry = catalog.register(
+        path,
+        backend=entry["backend"],
+        versioned=len(compacted) < before,
+        num_chunks=len(compacted),
+    )
+    return {
+        "path": path,
+        "chunks_before": before,
+        "chunks_after": len(compacted),
+        "bytes_before": before_bytes,
+        "bytes_after": entry["size_bytes"],
+    }
+
+
+def merge_stores(
+    catalog: Catalog,
+    paths: List[str],
+    into: Optional[str] = None,
+    compact: bool = False,
+    delete_sources: bool = False,
+    backend: Optional[str] = None,
+    root: str = VECTOR_DB_ROOT,
+) -> Dict[str, Any]:
+    """
+    Merge stores built with the same embedding model into one new store
+    (default backend: the first store's; default path: <root>/<backend>/<uuid>)
+    and catalog it with the union of their sources and tags.
+    """
+    paths = list(dict.fromkeys(os.path.normpath(p) for p in paths))
+    if len(paths) < 2:
+        raise ValueError("merge needs at least two stores")
+    entries = [_require_store(catalog, p) for p in paths]
+    models = {e["embed_model"] for e in entries} - {None}
+    if len(models) > 1:
+        raise ValueError(f"Stores use different embedding models: {sorted(models)}")
+    backend = get_backend(backend or entries[0]["backend"]).backend
+
+    rows: List[Tuple[str, Document, List[float]]] = []
+    seen_ids = set()
+    dim = None
+    for e in entries:
+        vs = _load(e)
+        if dim is not None and vs.dim != dim:
+            raise ValueError(f"Embedding dimension mismatch: {e['path']}")
+        dim = vs.dim
+        for doc_id, doc, vector in _exact_items(vs):
+            # Chunk ids must stay unique across the merged store
+            if doc_id in seen_ids:
+                doc_id = uuid.uuid4().hex
+            seen_ids.add(doc_id)
+            rows.append((doc_id, doc, vector))
+    merged = _rebuild(rows, vs.embeddings, backend)
+    if compact:
+        merged = _dedupe(merged)
+
+    target = into or os.path.join(root, backend, uuid.uuid4().hex)
+    if os.path.exists(target):
+        raise ValueError(f"Target already exists: {target}")
+    replace_index(target, merged)
+    entry = catalog.register(
+        target,
+        backend=backend,
+        versioned=True,
+        origin="merge",
+        source=[s for e in entries for s in e["source"]],
+        embed_model=next(iter(models), None),
+        num_chunks=len(merged),
+        tags=[t for e in entries for t in e["tags"]],
+    )
+    if delete_sources:
+        delete_stores(catalog, entries)
+    return {"path": target, "num_chunks": len(merged), "size_bytes": entry["size_bytes"]}
+
+
+def upgrade_store(catalog: Catalog, path: str) -> bool:
+    """
+    Bring a store up to the current on-disk format, in place:
+
+    - a FAISS store saved with a pickled docstore (index.pkl) is rewritten
+      with the JSONL docstore. The new files are renamed in with docs.jsonl
+      last, so readers switch formats atomically;
+    - a store saved before lexical indexes existed gets one.
+
+    Returns whether the store needed it.
+    """
+    entry = _require_store(catalog, path)
+    target = resolve_store_path(entry["path"])
+    if entry["backend"] != "faiss" or not is_legacy_store(target):
+        return _add_lexical_index(entry, target)
+
+    # The one place pickled docstores are still read: an explicit operator action
+    store = FAISS.load_local(
+        target,
+        get_embeddings(entry["embed_model"] or DEFAULT_EMBED_MODEL),
+        allow_dangerous_deserialization=True,
+    )
+    tmp_dir = os.path.join(target, f".upgrade-{uuid.uuid4().hex}")
+    FaissIndex(store.embedding_function, store).save(tmp_dir)
+    if os.path.isdir(os.path.join(tmp_dir, LEXICAL_DIR)):
+        shutil.rmtree(os.path.join(target, LEXICAL_DIR), ignore_errors=True)
+        os.rename(os.path.join(tmp_dir, LEXICAL_DIR), os.path.join(target, LEXICAL_DIR))
+    for name in (INDEX_FILE, OFFSETS_FILE, DOCS_FILE):
+        os.replace(os.path.join(tmp_dir, name), os.path.join(target, name))
+    os.remove(os.path.join(target, LEGACY_DOCSTORE_FILE))
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    catalog.register(entry["path"], backend="faiss", versioned=entry["versioned"])
+    return True
+
+
+def _add_lexical_index(entry: Dict[str, Any], target: str) -> bool:
+    if not LEXICAL_INDEX or load_lexical_index(target) is not None:
+        return False
+    tmp_dir = os.path.join(target, f".upgrade-{uuid.uuid4().hex}")
+    write_lexical_index(tmp_dir, _load(entry).documents())
+    os.rename(os.path.join(tmp_dir, LEXICAL_DIR), os.path.join(target, LEXICAL_DIR))
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return True
+
+
+def _days(value: Optional[float]) -> Optional[float]:
+    return value * 86400 if value is not None else None
+
+
+def _print_entries(entries: List[Dict[str, Any]]) -> None:
+    now = time.time()
+    total = 0
+    for e in entries:
+        total += e["size_bytes"]
+        idle = "never" if not e["last_access"] else f"{(now - e['last_access']) / 86400:.1f}d"
+        print(
+            f"{e['size_bytes'] / 1024 / 1024:9.2f} MB  {e['backend']:6}  "
+            f"{e['num_chunks'] if e['num_chunks'] is not None else '-':>7}  "
+            f"age {(now - e['created_at']) / 86400:6.1f}d  idle {idle:>7}  "
+            f"{e['origin']:10}  {os.path.relpath(e['path'])}"
+        )
+    print(f"{len(entries)} stores, {total / 1024 / 1024:.2f} MB")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m services.vectordb_admin")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("sync", help="catalog untracked stores, forget deleted ones")
+
+    p_list = sub.add_parser("list", help="show catalogued stores")
+    p_list.add_argument("--json", action="store_true")
+
+    p_delete = sub.add_parser("delete", help="delete stores matching all criteria")
+    p_delete.add_argument("--older-than", type=float, metavar="DAYS")
+    p_delete.add_argument("--idle-for", type=float, metavar="DAYS")
+    p_delete.add_argument("--larger-than", type=float, metavar="MB")
+    p_delete.add_argument("--origin", choices=["ingest", "discovered", "merge"])
+    p_delete.add_argument("--dry-run", action="store_true")
+
+    p_prune = sub.add_parser("prune", help="delete least recently used stores over a budget")
+    p_prune.add_argument("--max-total-mb", type=float, required=True)
+    p_prune.add_argument("--dry-run", action="store_true")
+
+    p_compact = sub.add_parser("compact", help="drop superseded versions / duplicate chunks")
+    p_compact.add_argument("paths", nargs="+")
+
+    p_upgrade = sub.add_parser(
+        "upgrade", help="rewrite pickled FAISS stores without pickle, add missing lexical indexes"
+    )
+    p_upgrade.add_argument("paths", nargs="*", help="default: every catalogued store")
+
+    p_merge = sub.add_parser("merge", help="merge stores into a new one")
+    p_merge.add_argument("paths", nargs="+")
+    p_merge.add_argument("--into")
+    p_merge.add_argument("--backend", choices=sorted(BACKENDS))
+    p_merge.add_argument("--compact", action="store_true")
+    p_merge.add_argument("--delete-sources", action="store_true")
+
+    p_forecasts = sub.add_parser(
+        "index-forecasts", help="embed forecast log records added since the last run"
+    )
+    p_forecasts.add_argument("path", nargs="?", default=FORECAST_INDEX_PATH)
+
+    args = parser.parse_args(argv)
+    load_dotenv()
+    catalog = get_catalog()
+    # Stores written before the catalog existed are picked up on every run
+    synced = sync_catalog(catalog)
+
+    if args.command == "sync":
+        print(json.dumps(synced, indent=2))
+    elif args.command == "list":
+        entries = catalog.entries()
+        if args.json:
+            print(json.dumps(entries, indent=2))
+        else:
+            _print_entries(entries)
+    elif args.command == "delete":
+        criteria = dict(
+            older_than_s=_days(args.older_than),
+            idle_for_s=_days(args.idle_for),
+            larger_than_bytes=int(args.larger_than * 1024 * 1024) if args.larger_than is not None else None,
+            origin=args.origin,
+        )
+        if all(v is None for v in criteria.values()):
+            parser.error("delete needs at least one of --older-than/--idle-for/--larger-than/--origin")
+        deleted = delete_stores(catalog, select_stores(catalog.entries(), **criteria), args.dry_run)
+        print(json.dumps({"dry_run": args.dry_run, "deleted": deleted}, indent=2))
+    elif args.command == "prune":
+        deleted = enforce_budget(
+            catalog, int(args.max_total_mb * 1024 * 1024), dry_run=args.dry_run
+        )
+        print(json.dumps({"dry_run": args.dry_run, "deleted": deleted}, indent=2))
+    elif args.command == "compact":
+        print(json.dumps([compact_store(catalog, p) for p in args.paths], indent=2))
+    elif args.command == "upgrade":
+        paths = args.paths or [e["path"] for e in catalog.entries()]
+        print(json.dumps({"upgraded": [p for p in paths if upgrade_store(catalog, p)]}, indent=2))
+    elif args.command == "merge":
+        print(json.dumps(
+            merge_stores(
+                catalog, args.paths, args.into, args.compact, args.delete_sources, args.backend
+            ),
+            indent=2,
+        ))
+    elif args.command == "index-forecasts":
+        print(json.dumps(update_vector_db_from_log(args.path), indent=2))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except (ValueError, FileNotFoundError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,126 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+Signature = Tuple[Tuple[str, int, int], ...]
+
+
+def _dir_signature(path: str) -> Signature:
+    """
+    Cheap fingerprint of a store directory: (name, size, mtime_ns) of every
+    file directly inside it. Any rewrite of index.faiss / index.pkl changes it.
+    """
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_file():
+                st = entry.stat()
+                entries.append((entry.name, st.st_size, st.st_mtime_ns))
+    return tuple(sorted(entries))
+
+
+def store_version(path: str) -> str:
+    """Version id of a store directory; changes whenever its files change."""
+    return hashlib.sha1(repr(_dir_signature(path)).encode("utf-8")).hexdigest()[:16]
+
+
+class VectorStoreCache:
+    """
+    Process-wide cache of loaded vector stores keyed by directory path.
+
+    - LRU eviction bounded by entry count and by an approximate byte budget
+      (the on-disk size of the store's files).
+    - An entry is reloaded when the directory's files change on disk.
+    - hit/miss/eviction/invalidation counters are kept for sizing.
+    """
+
+    def __init__(self, max_entries: int = 16, max_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Signature, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, path: str, loader: Callable[[str], Any]) -> Any:
+        key = os.path.abspath(path)
+        signature = _dir_signature(key)
+
+        with self._lock:
+            cached = self._lookup(key, signature)
+            if cached is not None:
+                return cached
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given path; the others wait and then hit.
+        with load_lock:
+            with self._lock:
+                cached = self._lookup(key, signature)
+                if cached is not None:
+                    return cached
+                self._stats["misses"] += 1
+
+            value = loader(key)
+            size = sum(s for _, s, _ in signature)
+
+            with self._lock:
+                self._insert(key, signature, size, value)
+            return value
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        with self._lock:
+            if path is None:
+                self._stats["invalidations"] += len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+                return
+            key = os.path.abspath(path)
+            if key in self._entries:
+                self._drop(key)
+                self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hit_rate": (self._stats["hits"] / lookups) if lookups else 0.0,
+            }
+
+    # ---- internals (caller holds self._lock)
+
+    def _lookup(self, key: str, signature: Signature) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] != signature:
+            self._drop(key)
+            self._stats["invalidations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return entry[2]
+
+    def _insert(self, key: str, signature: Signature, size: int, value: Any) -> None:
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (signature, size, value)
+        self._bytes += size
+        # Always keep the entry just loaded, even if it alone exceeds the budget
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._stats["evictions"] += 1
+
+    def _drop(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,98 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from services.tracing import timed
+from services.vectorstores.lexical import LEXICAL_INDEX, LexicalIndex, write_lexical_index
+
+
+class VectorIndex(ABC):
+    """
+    What ingest_service, query_service and the admin CLI need from a vector
+    backend. Vectors are always computed by the caller (cached, scheduled
+    embeddings), never by the backend itself.
+
+    `marker` is a file every saved store of the backend contains; it is how
+    stores without a catalog entry are recognised. `options` are the extra
+    keyword arguments the backend accepts when a new index is created.
+
+    Saving also writes a BM25 index of the chunks (see lexical.py); a store
+    opened through registry.load_index carries it as `lexical`.
+    """
+
+    backend: str = ""
+    marker: str = ""
+    options: Tuple[str, ...] = ()
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self.lexical: Optional[LexicalIndex] = None
+
+    @classmethod
+    def validate_options(cls, **options: Any) -> None:
+        given = {k for k, v in options.items() if v is not None}
+        unknown = sorted(given - set(cls.options))
+        if unknown:
+            raise ValueError(f"The {cls.backend} backend does not accept: {', '.join(unknown)}")
+
+    @classmethod
+    @abstractmethod
+    def load(cls, path: str, embeddings: Embeddings) -> "VectorIndex":
+        ...
+
+    @abstractmethod
+    def add(
+        self,
+        texts: List[str],
+        vectors: List[List[float]],
+        metadatas: List[dict],
+        ids: Optional[List[str]] = None,
+    ) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, ids: List[str]) -> None:
+        ...
+
+    def save(self, path: str) -> None:
+        """Write the whole store into the (new or empty) directory `path`."""
+        with timed("index_save"):
+            self._save(path)
+            if LEXICAL_INDEX:
+                write_lexical_index(path, self.documents())
+
+    @abstractmethod
+    def _save(self, path: str) -> None:
+        """Backend part of save(): vectors and documents."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @property
+    @abstractmethod
+    def dim(self) -> int:
+        ...
+
+    @abstractmethod
+    def items(self) -> Iterator[Tuple[str, Document, List[float]]]:
+        """(id, document, vector) for every chunk, in insertion order."""
+
+    def documents(self) -> Iterator[Tuple[str, Document]]:
+        """(id, document) for every chunk, in insertion order."""
+        for doc_id, doc, _ in self.items():
+            yield doc_id, doc
+
+    @abstractmethod
+    def as_vectorstore(self) -> VectorStore:
+        """LangChain view of the store, for retrievers."""
+
+    def describe(self) -> Dict[str, Any]:
+        """Backend-specific index details for ingest results."""
+        return {}
+
+    def as_retriever(self, **kwargs: Any):
+        return self.as_vectorstore().as_retriever(**kwargs)
@@ -0,0 +1,108 @@
+import os
+import uuid
+from typing import Any, Iterator, List, Optional, Tuple
+
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+
+from services.vectorstores.base import VectorIndex
+
+# Collection LangChain's Chroma wrapper writes by default
+COLLECTION_NAME = "langchain"
+
+
+def _chromadb():
+    try:
+        import chromadb
+    except ImportError as e:
+        raise ImportError("The chroma backend needs `pip install chromadb`") from e
+    return chromadb
+
+
+class ChromaIndex(VectorIndex):
+    """
+    Chroma collection. New stores are built in an in-memory client and
+    copied into a persistent one on save; loaded stores write through.
+    """
+
+    backend = "chroma"
+    marker = "chroma.sqlite3"
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        client: Any = None,
+        collection: Any = None,
+        path: Optional[str] = None,
+    ):
+        super().__init__(embeddings)
+        if client is None:
+            client = _chromadb().EphemeralClient()
+            # Ephemeral clients share one in-process system; keep names unique
+            collection = client.create_collection(f"build-{uuid.uuid4().hex}")
+        self.client = client
+        self.collection = collection
+        self.path = os.path.abspath(path) if path else None
+
+    @classmethod
+    def load(cls, path: str, embeddings: Embeddings) -> "ChromaIndex":
+        client = _chromadb().PersistentClient(path=path)
+        collection = client.get_or_create_collection(COLLECTION_NAME)
+        return cls(embeddings, client, collection, path)
+
+    def add(
+        self,
+        texts: List[str],
+        vectors: List[List[float]],
+        metadatas: List[dict],
+        ids: Optional[List[str]] = None,
+    ) -> None:
+        self.collection.upsert(
+            ids=ids or [uuid.uuid4().hex for _ in texts],
+            embeddings=vectors,
+            metadatas=[m or None for m in metadatas],
+            documents=texts,
+        )
+
+    def delete(self, ids: List[str]) -> None:
+        if ids:
+            self.collection.delete(ids=ids)
+
+    def _save(self, path: str) -> None:
+        if self.path == os.path.abspath(path):
+            return  # persistent collections are already on disk
+        target = _chromadb().PersistentClient(path=path)
+        collection = target.get_or_create_collection(COLLECTION_NAME)
+        rows = list(self.items())
+        for start in range(0, len(rows), 1000):
+            batch = rows[start:start + 1000]
+            collection.upsert(
+                ids=[i for i, _, _ in batch],
+                embeddings=[v for _, _, v in batch],
+                metadatas=[d.metadata or None for _, d, _ in batch],
+                documents=[d.page_content for _, d, _ in batch],
+            )
+
+    def __len__(self) -> int:
+        return self.collection.count()
+
+    @property
+    def dim(self) -> int:
+        got = self.collection.peek(1)
+        return len(got["embeddings"][0])
+
+    def items(self) -> Iterator[Tuple[str, Document, List[float]]]:
+        got = self.collection.get(include=["embeddings", "documents", "metadatas"])
+        for i, text, meta, vec in zip(
+            got["ids"], got["documents"], got["metadatas"], got["embeddings"]
+        ):
+            yield i, Document(id=i, page_content=text, metadata=meta or {}), list(vec)
+
+    def as_vectorstore(self):
+        from langchain_community.vectorstores import Chroma
+
+        return Chroma(
+            client=self.client,
+            collection_name=self.collection.name,
+            embedding_function=self.embeddings,
+        )
@@ -0,0 +1,55 @@
+import os
+import json
+import mmap
+from typing import Iterable, Iterator, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+DOCS_FILE = "docs.jsonl"
+OFFSETS_FILE = "docs.offsets.npy"
+
+
+def write_docstore(path: str, rows: Iterable[Tuple[str, Document]]) -> int:
+    """
+    Write documents as one JSON object per line plus an int64 array of
+    line start offsets (n + 1 entries). Returns the number of documents.
+    """
+    offsets = [0]
+    with open(os.path.join(path, DOCS_FILE), "wb") as f:
+        for doc_id, doc in rows:
+            line = json.dumps(
+                {"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata},
+                ensure_ascii=False,
+            ).encode("utf-8") + b"\n"
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    np.save(os.path.join(path, OFFSETS_FILE), np.asarray(offsets, dtype=np.int64))
+    return len(offsets) - 1
+
+
+class JsonlDocstore:
+    """
+    Read-only view over a written docstore. Both files are memory-mapped;
+    a document is decoded only when its row is requested.
+    """
+
+    def __init__(self, path: str):
+        self._offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        with open(os.path.join(path, DOCS_FILE), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            # mmap refuses empty files
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def row(self, i: int) -> Tuple[str, Document]:
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        obj = json.loads(self._data[start:end])
+        doc = Document(id=obj["id"], page_content=obj["page_content"], metadata=obj["metadata"])
+        return obj["id"], doc
+
+    def rows(self) -> Iterator[Tuple[str, Document]]:
+        for i in range(len(self)):
+            yield self.row(i)
@@ -0,0 +1,141 @@
+import os
+import math
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("auto", "flat", "ivf", "hnsw", "ivfpq")
+
+# Index built when a FAISS store is saved; "auto" picks by corpus size
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "auto")
+# Exact search below this many chunks, HNSW below the next bound, IVF-PQ above
+FAISS_AUTO_FLAT_MAX = int(os.getenv("FAISS_AUTO_FLAT_MAX", "20000"))
+FAISS_AUTO_HNSW_MAX = int(os.getenv("FAISS_AUTO_HNSW_MAX", "1000000"))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "80"))
+# Build-time search defaults; both are stored in the index file
+FAISS_DEFAULT_NPROBE = int(os.getenv("FAISS_DEFAULT_NPROBE", "16"))
+FAISS_DEFAULT_EF_SEARCH = int(os.getenv("FAISS_DEFAULT_EF_SEARCH", "64"))
+# Query-time overrides applied when a store is loaded (unset = as stored)
+FAISS_NPROBE = os.getenv("FAISS_NPROBE")
+FAISS_EF_SEARCH = os.getenv("FAISS_EF_SEARCH")
+
+# Training points per IVF list; FAISS warns below ~39
+_TRAIN_PER_LIST = 64
+
+
+def choose_index_type(n: int) -> str:
+    if n <= FAISS_AUTO_FLAT_MAX:
+        return "flat"
+    if n <= FAISS_AUTO_HNSW_MAX:
+        return "hnsw"
+    return "ivfpq"
+
+
+def default_nlist(n: int) -> int:
+    # FAISS guideline: 4·sqrt(n) to 16·sqrt(n) lists
+    return max(1, min(int(4 * math.sqrt(n)), n // _TRAIN_PER_LIST or 1))
+
+
+def default_pq_m(dim: int) -> int:
+    """Sub-quantizers for IVF-PQ: ~16 dims each, and a divisor of dim."""
+    target = max(1, dim // 16)
+    for m in range(target, 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def build_index(
+    vectors: np.ndarray,
+    index_type: str,
+    nlist: Optional[int] = None,
+    nprobe: int = FAISS_DEFAULT_NPROBE,
+    hnsw_m: int = FAISS_HNSW_M,
+    ef_search: int = FAISS_DEFAULT_EF_SEARCH,
+    pq_m: Optional[int] = None,
+) -> faiss.Index:
+    """
+    L2 index of `index_type` over `vectors` (row i keeps id i). IVF
+    variants are trained on a random sample of the vectors.
+    """
+    n, dim = vectors.shape
+    if index_type == "auto":
+        index_type = choose_index_type(n)
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type: {index_type} (expected one of {INDEX_TYPES})")
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = FAISS_HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = ef_search
+    else:
+        nlist = nlist or default_nlist(n)
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivf":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        else:
+            # 8-bit codes need 256 centroids × 39 points to train; shrink for small corpora
+            nbits = 8 if n >= 256 * 39 else max(1, int(math.log2(max(n // 39, 2))))
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m or default_pq_m(dim), nbits)
+        sample = vectors
+        if n > nlist * 256:
+            rows = np.random.default_rng(0).choice(n, nlist * 256, replace=False)
+            sample = vectors[np.sort(rows)]
+        index.train(np.ascontiguousarray(sample, dtype=np.float32))
+        index.nprobe = min(nprobe, nlist)
+        # Keeps reconstruct() available for compaction and merges
+        index.make_direct_map()
+
+    index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+    return index
+
+
+def apply_search_params(
+    index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None
+) -> None:
+    ivf = _ivf(index)
+    if ivf is not None and nprobe:
+        ivf.nprobe = int(nprobe)
+    if isinstance(index, faiss.IndexHNSW) and ef_search:
+        index.hnsw.efSearch = int(ef_search)
+
+
+def apply_env_search_params(index: faiss.Index) -> None:
+    apply_search_params(index, FAISS_NPROBE, FAISS_EF_SEARCH)
+
+
+def is_flat(index: faiss.Index) -> bool:
+    return isinstance(index, faiss.IndexFlat)
+
+
+def all_vectors(index: faiss.Index) -> np.ndarray:
+    """Every stored vector, by id (approximate for PQ-compressed indexes)."""
+    ivf = _ivf(index)
+    if ivf is not None and ivf.direct_map.no():
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def describe(index: faiss.Index) -> Dict[str, Any]:
+    info: Dict[str, Any] = {"type": "flat", "ntotal": index.ntotal}
+    ivf = _ivf(index)
+    if isinstance(index, faiss.IndexHNSW):
+        info.update(type="hnsw", M=index.hnsw.nb_neighbors(1), efSearch=index.hnsw.efSearch)
+    elif ivf is not None:
+        info.update(
+            type="ivfpq" if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else "ivf",
+            nlist=ivf.nlist,
+            nprobe=ivf.nprobe,
+        )
+    return info
+
+
+def _ivf(index: faiss.Index) -> Optional[faiss.IndexIVF]:
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
@@ -0,0 +1,248 @@
+import os
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import faiss
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from services.vectorstores.base import VectorIndex
+from services.vectorstores.docstore import DOCS_FILE, JsonlDocstore, write_docstore
+from services.vectorstores.faiss_ann import (
+    FAISS_INDEX_TYPE,
+    INDEX_TYPES,
+    all_vectors,
+    apply_env_search_params,
+    build_index,
+    choose_index_type,
+    describe,
+    is_flat,
+)
+
+INDEX_FILE = "index.faiss"
+LEGACY_DOCSTORE_FILE = "index.pkl"
+# Stores saved before the JSONL docstore existed carry a pickled docstore.
+# Unpickling runs arbitrary code from the file, so they are refused unless
+# this is set; rewrite them instead (python -m services.vectordb_admin upgrade).
+FAISS_ALLOW_PICKLE = os.getenv("FAISS_ALLOW_PICKLE", "0").lower() in ("1", "true", "yes")
+
+# Map the index file instead of reading it into memory where FAISS can
+_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def _relevance(distance: float) -> float:
+    # FAISS reports squared L2; between unit vectors (OpenAI embeddings are
+    # normalised) 1 - d/2 is their cosine similarity
+    return 1.0 - distance / 2.0
+
+
+class _RowDocstore(Docstore):
+    """LangChain docstore over a JsonlDocstore; ids are row numbers."""
+
+    def __init__(self, docs: JsonlDocstore):
+        self.docs = docs
+
+    def search(self, search: str) -> Document:
+        return self.docs.row(int(search))[1]
+
+
+class _RowIds(Mapping):
+    """index_to_docstore_id for a lazily loaded store: position → row."""
+
+    def __init__(self, n: int):
+        self.n = n
+
+    def __getitem__(self, pos: int) -> int:
+        if not 0 <= pos < self.n:
+            raise KeyError(pos)
+        return int(pos)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self.n))
+
+    def __len__(self) -> int:
+        return self.n
+
+
+def is_legacy_store(path: str) -> bool:
+    return (
+        os.path.isfile(os.path.join(path, LEGACY_DOCSTORE_FILE))
+        and not os.path.isfile(os.path.join(path, DOCS_FILE))
+    )
+
+
+class FaissIndex(VectorIndex):
+    """
+    FAISS index with a JSONL docstore: index.faiss holds the raw index
+    (memory-mapped on load), docs.jsonl + docs.offsets.npy the documents,
+    decoded only for search hits. Nothing is unpickled. Loaded stores are
+    read-only until the first write, which pulls them into memory.
+
+    Vectors are collected in an exact flat index; `index_type` (flat, ivf,
+    hnsw, ivfpq or auto) is built from it when the store is saved.
+    """
+
+    backend = "faiss"
+    marker = INDEX_FILE
+    options = ("index_type",)
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        store: Optional[FAISS] = None,
+        docs: Optional[JsonlDocstore] = None,
+        index_type: Optional[str] = None,
+    ):
+        super().__init__(embeddings)
+        self.validate_options(index_type=index_type)
+        self.index_type = index_type or FAISS_INDEX_TYPE
+        # Created from the first batch: FAISS needs the dimension up front
+        self.store = store
+        self._docs = docs
+        self._saved: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def validate_options(cls, **options: Any) -> None:
+        super().validate_options(**options)
+        index_type = options.get("index_type")
+        if index_type is not None and index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type: {index_type} (expected one of {INDEX_TYPES})")
+
+    @classmethod
+    def load(cls, path: str, embeddings: Embeddings) -> "FaissIndex":
+        if is_legacy_store(path):
+            if not FAISS_ALLOW_PICKLE:
+                raise ValueError(
+                    f"{path} uses the pickled docstore format; "
+                    "rewrite it with `python -m services.vectordb_admin upgrade`"
+                )
+            store = FAISS.load_local(
+                path,
+                embeddings,
+                allow_dangerous_deserialization=True,
+                relevance_score_fn=_relevance,
+            )
+            return cls(embeddings, store)
+
+        index = faiss.read_index(os.path.join(path, INDEX_FILE), _MMAP_FLAGS)
+        apply_env_search_params(index)
+        docs = JsonlDocstore(path)
+        store = FAISS(
+            embeddings, index, _RowDocstore(docs), _RowIds(len(docs)),
+            relevance_score_fn=_relevance,
+        )
+        # Rewrites keep the index type the store was built with
+        index_type = None if is_flat(index) else describe(index)["type"]
+        return cls(embeddings, store, docs, index_type)
+
+    def add(
+        self,
+        texts: List[str],
+        vectors: List[List[float]],
+        metadatas: List[dict],
+        ids: Optional[List[str]] = None,
+    ) -> None:
+        pairs = list(zip(texts, vectors))
+        if self.store is None:
+            self.store = FAISS.from_embeddings(
+                pairs, self.embeddings, metadatas=metadatas, ids=ids,
+                relevance_score_fn=_relevance,
+            )
+        else:
+            self._materialize()
+            self.store.add_embeddings(pairs, metadatas=metadatas, ids=ids)
+
+    def delete(self, ids: List[str]) -> None:
+        if self.store is not None and ids:
+            self._materialize()
+            self.store.delete(ids)
+
+    def _save(self, path: str) -> None:
+        store = self.as_vectorstore()
+        os.makedirs(path, exist_ok=True)
+        write_docstore(path, self.documents())
+        index = self._index_to_save(store.index)
+        faiss.write_index(index, os.path.join(path, INDEX_FILE))
+        self._saved = describe(index)
+
+    def __len__(self) -> int:
+        return self.store.index.ntotal if self.store is not None else 0
+
+    @property
+    def dim(self) -> int:
+        return self.as_vectorstore().index.d
+
+    def items(self) -> Iterator[Tuple[str, Document, List[float]]]:
+        return self._rows(vectors=True)
+
+    def documents(self) -> Iterator[Tuple[str, Document]]:
+        for doc_id, doc, _ in self._rows(vectors=False):
+            yield doc_id, doc
+
+    def describe(self) -> Dict[str, Any]:
+        # The index last written, which may differ from the flat one in memory
+        return self._saved or describe(self.as_vectorstore().index)
+
+    def as_vectorstore(self) -> FAISS:
+        if self.store is None:
+            raise ValueError("Empty FAISS index")
+        return self.store
+
+    # ---- internals
+
+    def _rows(self, vectors: bool) -> Iterator[Tuple[str, Document, Optional[List[float]]]]:
+        if self.store is None:
+            return
+        index = self.store.index
+        if self._docs is not None:
+            for pos, (doc_id, doc) in enumerate(self._docs.rows()):
+                yield doc_id, doc, index.reconstruct(pos).tolist() if vectors else None
+            return
+        for pos, doc_id in sorted(self.store.index_to_docstore_id.items()):
+            doc = self.store.docstore.search(doc_id)
+            yield doc_id, doc, index.reconstruct(pos).tolist() if vectors else None
+
+    def _index_to_save(self, index: faiss.Index) -> faiss.Index:
+        if not is_flat(index):
+            return index
+        index_type = self.index_type
+        if index_type == "auto":
+            index_type = choose_index_type(index.ntotal)
+        if index_type == "flat":
+            return index
+        return build_index(all_vectors(index), index_type)
+
+    def _materialize(self) -> None:
+        """
+        Swap the read-only lazy state for an in-memory flat index and
+        docstore; ANN indexes are rebuilt from it on save. IVF-PQ stores
+        only hold lossy codes, and rebuilding from those would degrade
+        recall with every change, so they are not mutated in place.
+        """
+        if self._docs is None and is_flat(self.store.index):
+            return
+        if describe(self.store.index)["type"] == "ivfpq":
+            raise ValueError(
+                "IVF-PQ stores cannot be changed in place; rebuild the store "
+                "from its sources instead"
+            )
+        if self._docs is not None:
+            rows = list(self._docs.rows())
+        else:
+            rows = [
+                (i, self.store.docstore.search(i))
+                for _, i in sorted(self.store.index_to_docstore_id.items())
+            ]
+        index = faiss.IndexFlatL2(self.store.index.d)
+        index.add(all_vectors(self.store.index))
+        self.store = FAISS(
+            self.embeddings,
+            index,
+            InMemoryDocstore({doc_id: doc for doc_id, doc in rows}),
+            {pos: doc_id for pos, (doc_id, _) in enumerate(rows)},
+            relevance_score_fn=_relevance,
+        )
+        self._docs = None
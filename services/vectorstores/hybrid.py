@@ -0,0 +1,73 @@
+import os
+import json
+from typing import Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+
+from services.vectorstores.lexical import LexicalIndex
+
+# Candidates taken from each ranking before fusion
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "20"))
+# Reciprocal rank fusion constant; larger flattens the rank weighting
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+# Relative weight of the BM25 ranking (the vector ranking has weight 1)
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+
+
+def _doc_key(doc: Document) -> Tuple[str, str]:
+    # Both indexes hold copies of the same chunks, not shared objects
+    return doc.page_content, json.dumps(doc.metadata, sort_keys=True, default=str)
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Document]], weights: List[float], rrf_k: int = HYBRID_RRF_K
+) -> List[Tuple[Document, float]]:
+    """Merge ranked lists: score(d) = sum of weight / (rrf_k + rank), best first."""
+    scores: Dict[Tuple[str, str], float] = {}
+    docs: Dict[Tuple[str, str], Document] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc in enumerate(ranking, start=1):
+            key = _doc_key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + weight / (rrf_k + rank)
+    order = sorted(scores, key=scores.__getitem__, reverse=True)
+    return [(docs[key], scores[key]) for key in order]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Vector similarity and BM25 rankings of the same store, fused with
+    reciprocal rank fusion. Exact terms (dates, city names) the embedding
+    misses still reach the top k through the lexical ranking.
+    """
+
+    vectorstore: VectorStore
+    lexical: LexicalIndex
+    k: int = 4
+    fetch_k: int = HYBRID_FETCH_K
+    rrf_k: int = HYBRID_RRF_K
+    lexical_weight: float = HYBRID_LEXICAL_WEIGHT
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def scored(self, query: str) -> List[Tuple[Document, Optional[float]]]:
+        """
+        Fused top k with each document's vector relevance (0..1), None for
+        documents only the BM25 ranking found.
+        """
+        fetch_k = max(self.k, self.fetch_k)
+        semantic = self.vectorstore.similarity_search_with_relevance_scores(query, k=fetch_k)
+        relevance = {_doc_key(doc): score for doc, score in semantic}
+        lexical = [doc for doc, _ in self.lexical.search(query, k=fetch_k)]
+        fused = reciprocal_rank_fusion(
+            [[doc for doc, _ in semantic], lexical], [1.0, self.lexical_weight], self.rrf_k
+        )
+        return [(doc, relevance.get(_doc_key(doc))) for doc, _ in fused[: self.k]]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return [doc for doc, _ in self.scored(query)]
@@ -0,0 +1,140 @@
+import os
+import re
+import json
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+from services.vectorstores.docstore import JsonlDocstore, write_docstore
+
+# Written into every saved store unless disabled
+LEXICAL_INDEX = os.getenv("LEXICAL_INDEX", "1").lower() in ("1", "true", "yes")
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Subdirectory of the store; it has its own docstore so any backend works
+LEXICAL_DIR = "lexical"
+META_FILE = "bm25.json"
+TERMS_FILE = "bm25.terms.json"
+# CSR postings: term t owns rows indptr[t]:indptr[t + 1] of docs/tfs
+INDPTR_FILE = "bm25.indptr.npy"
+POSTING_DOCS_FILE = "bm25.docs.npy"
+POSTING_TFS_FILE = "bm25.tfs.npy"
+DOC_LENGTHS_FILE = "bm25.doclen.npy"
+IDF_FILE = "bm25.idf.npy"
+
+# Dates, times and hyphenated names stay whole and are also split
+_TOKEN_RE = re.compile(r"\w+(?:[-:./]\w+)*")
+_SPLIT_RE = re.compile(r"[-:./]")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were what when where which who will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens: List[str] = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        tokens.append(token)
+        if _SPLIT_RE.search(token):
+            tokens.extend(p for p in _SPLIT_RE.split(token) if p and p not in _STOPWORDS)
+    return tokens
+
+
+def write_lexical_index(path: str, rows: Iterable[Tuple[str, Document]]) -> int:
+    """
+    Build a BM25 inverted index over the documents of the store saved at
+    `path` and write it into `path`/lexical. Returns the number of documents.
+    """
+    lex_dir = os.path.join(path, LEXICAL_DIR)
+    os.makedirs(lex_dir, exist_ok=True)
+    vocab: Dict[str, int] = {}
+    term_ids: List[int] = []
+    doc_rows: List[int] = []
+    tfs: List[int] = []
+    lengths: List[int] = []
+
+    def counted() -> Iterable[Tuple[str, Document]]:
+        for n, (doc_id, doc) in enumerate(rows):
+            tokens = tokenize(doc.page_content)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_rows.append(n)
+                tfs.append(tf)
+            yield doc_id, doc
+
+    n = write_docstore(lex_dir, counted())
+
+    term_arr = np.asarray(term_ids, dtype=np.int64)
+    order = np.argsort(term_arr, kind="stable")
+    df = np.bincount(term_arr, minlength=len(vocab))
+    indptr = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+    idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+    np.save(os.path.join(lex_dir, INDPTR_FILE), indptr)
+    np.save(os.path.join(lex_dir, POSTING_DOCS_FILE), np.asarray(doc_rows, dtype=np.int32)[order])
+    np.save(os.path.join(lex_dir, POSTING_TFS_FILE), np.asarray(tfs, dtype=np.float32)[order])
+    np.save(os.path.join(lex_dir, DOC_LENGTHS_FILE), np.asarray(lengths, dtype=np.float32))
+    np.save(os.path.join(lex_dir, IDF_FILE), idf)
+    with open(os.path.join(lex_dir, TERMS_FILE), "w", encoding="utf-8") as f:
+        json.dump(sorted(vocab, key=vocab.__getitem__), f, ensure_ascii=False)
+    with open(os.path.join(lex_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"num_docs": n, "avgdl": float(np.mean(lengths)) if n else 0.0}, f)
+    return n
+
+
+class LexicalIndex:
+    """
+    BM25 over a store's chunks. Postings, lengths and documents are
+    memory-mapped; only the vocabulary is read into memory.
+    """
+
+    def __init__(self, path: str):
+        lex_dir = os.path.join(path, LEXICAL_DIR)
+        with open(os.path.join(lex_dir, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(lex_dir, TERMS_FILE), "r", encoding="utf-8") as f:
+            self.terms = {term: i for i, term in enumerate(json.load(f))}
+        self.avgdl = meta["avgdl"] or 1.0
+        self.docs = JsonlDocstore(lex_dir)
+        self._indptr = np.load(os.path.join(lex_dir, INDPTR_FILE), mmap_mode="r")
+        self._posting_docs = np.load(os.path.join(lex_dir, POSTING_DOCS_FILE), mmap_mode="r")
+        self._posting_tfs = np.load(os.path.join(lex_dir, POSTING_TFS_FILE), mmap_mode="r")
+        self._lengths = np.load(os.path.join(lex_dir, DOC_LENGTHS_FILE), mmap_mode="r")
+        self._idf = np.load(os.path.join(lex_dir, IDF_FILE), mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def search(
+        self, query: str, k: int = 4, k1: float = BM25_K1, b: float = BM25_B
+    ) -> List[Tuple[Document, float]]:
+        """Top-k (document, BM25 score) pairs, best first; only docs sharing a term."""
+        scores = np.zeros(len(self.docs), dtype=np.float32)
+        for term in set(tokenize(query)):
+            t = self.terms.get(term)
+            if t is None:
+                continue
+            start, end = int(self._indptr[t]), int(self._indptr[t + 1])
+            rows = self._posting_docs[start:end]
+            tf = self._posting_tfs[start:end]
+            norm = k1 * (1.0 - b + b * self._lengths[rows] / self.avgdl)
+            scores[rows] += self._idf[t] * tf * (k1 + 1.0) / (tf + norm)
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k)[:k]]
+        hits = hits[np.argsort(-scores[hits])]
+        return [(self.docs.row(int(n))[1], float(scores[n])) for n in hits]
+
+
+def load_lexical_index(path: str) -> Optional[LexicalIndex]:
+    """The lexical index saved with the store at `path`, if it has one."""
+    if not os.path.isfile(os.path.join(path, LEXICAL_DIR, META_FILE)):
+        return None
+    return LexicalIndex(path)
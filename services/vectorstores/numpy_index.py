@@ -0,0 +1,221 @@
+import os
+import uuid
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from services.vectorstores.base import VectorIndex
+from services.vectorstores.docstore import JsonlDocstore, write_docstore
+
+VECTORS_FILE = "vectors.npy"
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class NumpyIndex(VectorIndex):
+    """
+    Exact cosine search over an (n, dim) float32 matrix of unit vectors.
+
+    On disk: vectors.npy plus a JSONL docstore with row offsets. Loading
+    memory-maps both files, so opening is O(1), processes share the page
+    cache, and only the top-k documents of a search are ever decoded.
+    Writes are buffered in memory and consolidated on the next read.
+    """
+
+    backend = "numpy"
+    marker = VECTORS_FILE
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        vectors: Optional[np.ndarray] = None,
+        docs: Optional[JsonlDocstore] = None,
+    ):
+        super().__init__(embeddings)
+        self._vectors = vectors
+        self._docs: Any = docs if docs is not None else []
+        self._pending_vectors: List[np.ndarray] = []
+        self._pending_docs: List[Tuple[str, Document]] = []
+
+    @classmethod
+    def load(cls, path: str, embeddings: Embeddings) -> "NumpyIndex":
+        vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        return cls(embeddings, vectors, JsonlDocstore(path))
+
+    # ---- writes
+
+    def add(
+        self,
+        texts: List[str],
+        vectors: List[List[float]],
+        metadatas: List[dict],
+        ids: Optional[List[str]] = None,
+    ) -> None:
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        self._pending_vectors.append(_normalize(np.asarray(vectors, dtype=np.float32)))
+        self._pending_docs.extend(
+            (i, Document(id=i, page_content=t, metadata=m or {}))
+            for i, t, m in zip(ids, texts, metadatas)
+        )
+
+    def delete(self, ids: List[str]) -> None:
+        drop = set(ids)
+        if not drop:
+            return
+        vectors, docs = self._materialize()
+        keep = [n for n, (i, _) in enumerate(docs) if i not in drop]
+        self._vectors = vectors[keep]
+        self._docs = [docs[n] for n in keep]
+
+    def _save(self, path: str) -> None:
+        vectors, docs = self._consolidate()
+        os.makedirs(path, exist_ok=True)
+        write_docstore(path, self._doc_rows(docs))
+        np.save(os.path.join(path, VECTORS_FILE), np.ascontiguousarray(vectors))
+
+    # ---- reads
+
+    def __len__(self) -> int:
+        base = len(self._vectors) if self._vectors is not None else 0
+        return base + len(self._pending_docs)
+
+    @property
+    def dim(self) -> int:
+        vectors, _ = self._consolidate()
+        return vectors.shape[1]
+
+    def items(self) -> Iterator[Tuple[str, Document, List[float]]]:
+        vectors, docs = self._consolidate()
+        for n, (doc_id, doc) in enumerate(self._doc_rows(docs)):
+            yield doc_id, doc, vectors[n].tolist()
+
+    def search(
+        self, query: Sequence[float], k: int = 4, filter: Optional[dict] = None
+    ) -> List[Tuple[Document, float]]:
+        """Top-k (document, cosine distance) pairs; lower distance is closer."""
+        vectors, docs = self._consolidate()
+        if len(vectors) == 0:
+            return []
+        q = _normalize(np.asarray([query], dtype=np.float32))[0]
+        scores = vectors @ q
+        if filter is None and k < len(scores):
+            top = np.argpartition(-scores, k)[:k]
+            order = top[np.argsort(-scores[top])]
+        else:
+            order = np.argsort(-scores)
+
+        results: List[Tuple[Document, float]] = []
+        for n in order:
+            _, doc = self._doc_at(docs, int(n))
+            if filter and any(doc.metadata.get(key) != value for key, value in filter.items()):
+                continue
+            results.append((doc, float(1.0 - scores[n])))
+            if len(results) >= k:
+                break
+        return results
+
+    def as_vectorstore(self) -> "NumpyFlatStore":
+        return NumpyFlatStore(self)
+
+    # ---- internals
+
+    @staticmethod
+    def _doc_at(docs: Any, n: int) -> Tuple[str, Document]:
+        return docs.row(n) if isinstance(docs, JsonlDocstore) else docs[n]
+
+    @staticmethod
+    def _doc_rows(docs: Any) -> Iterable[Tuple[str, Document]]:
+        return docs.rows() if isinstance(docs, JsonlDocstore) else docs
+
+    def _consolidate(self) -> Tuple[np.ndarray, Any]:
+        if self._pending_vectors:
+            return self._materialize()
+        if self._vectors is None:
+            raise ValueError("Empty NumPy index")
+        return self._vectors, self._docs
+
+    def _materialize(self) -> Tuple[np.ndarray, List[Tuple[str, Document]]]:
+        """Pull everything into RAM (copying the mmap) before a mutation."""
+        parts = [] if self._vectors is None else [self._vectors]
+        parts += self._pending_vectors
+        if not parts:
+            raise ValueError("Empty NumPy index")
+        self._vectors = np.concatenate(parts)
+        self._docs = list(self._doc_rows(self._docs)) + self._pending_docs
+        self._pending_vectors, self._pending_docs = [], []
+        return self._vectors, self._docs
+
+
+class NumpyFlatStore(VectorStore):
+    """LangChain VectorStore view over a NumpyIndex."""
+
+    def __init__(self, index: NumpyIndex):
+        self.index = index
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.index.embeddings
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        self.index.add(
+            texts,
+            self.embeddings.embed_documents(texts),
+            metadatas or [{} for _ in texts],
+            ids,
+        )
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        self.index.delete(ids or [])
+        return True
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.index.search(embedding, k, filter)
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.index.search(self.embeddings.embed_query(query), k, filter)
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return [d for d, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [d for d, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are cosine distances; float32 rounding can land just past
+        # [0, 1], which LangChain warns about
+        return lambda distance: min(1.0, max(0.0, 1.0 - distance))
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> "NumpyFlatStore":
+        store = cls(NumpyIndex(embedding))
+        store.add_texts(texts, metadatas, ids)
+        return store
@@ -0,0 +1,77 @@
+import os
+from typing import Any, Dict, Optional, Type
+
+from langchain_core.embeddings import Embeddings
+
+from services.vectorstores.base import VectorIndex
+from services.vectorstores.chroma_index import ChromaIndex
+from services.vectorstores.faiss_index import FaissIndex
+from services.vectorstores.lexical import load_lexical_index
+from services.vectorstores.numpy_index import NumpyIndex
+from services.tracing import timed
+
+# Backend for new stores unless a caller asks for another one
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "faiss")
+
+BACKENDS: Dict[str, Type[VectorIndex]] = {
+    FaissIndex.backend: FaissIndex,
+    ChromaIndex.backend: ChromaIndex,
+    NumpyIndex.backend: NumpyIndex,
+}
+
+
+def get_backend(name: Optional[str] = None) -> Type[VectorIndex]:
+    name = name or VECTOR_BACKEND
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown vector backend: {name} (expected one of {sorted(BACKENDS)})")
+
+
+def detect_backend(path: str) -> Optional[str]:
+    """Backend of the store saved in directory `path`, from its marker file."""
+    for name, cls in BACKENDS.items():
+        if os.path.isfile(os.path.join(path, cls.marker)):
+            return name
+    return None
+
+
+def store_backend(path: str) -> str:
+    """
+    Backend of the store at `path` (a store directory or a versioned
+    store): its catalog entry when there is one, else its files.
+    """
+    from services.catalog import get_catalog
+    from services.versioned_store import resolve_store_path
+
+    entry = get_catalog().get(path)
+    if entry is not None:
+        return entry["backend"]
+    name = detect_backend(resolve_store_path(path))
+    if name is None:
+        raise ValueError(f"No vector store found at {path}")
+    return name
+
+
+def create_index(
+    embeddings: Embeddings, backend: Optional[str] = None, **options: Any
+) -> VectorIndex:
+    cls = get_backend(backend)
+    cls.validate_options(**options)
+    return cls(embeddings, **{k: v for k, v in options.items() if v is not None})
+
+
+def load_index(path: str, embeddings: Embeddings, backend: Optional[str] = None) -> VectorIndex:
+    """
+    Open the store at `path`, resolving a versioned store to its current
+    version, with its lexical index when it was saved with one. `backend`
+    defaults to the one recorded for the store.
+    """
+    from services.versioned_store import resolve_store_path
+
+    name = backend or store_backend(path)
+    resolved = resolve_store_path(path)
+    with timed("index_load"):
+        index = get_backend(name).load(resolved, embeddings)
+        index.lexical = load_lexical_index(resolved)
+    return index
@@ -0,0 +1,288 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are serialized within one process only
+    fcntl = None
+
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from services.catalog import get_catalog
+from services.embedding_cache import get_embeddings
+from services.ingest_service import index_chunks, iter_chunks
+from services.vectorstores.base import VectorIndex
+from services.vectorstores.registry import VECTOR_BACKEND, detect_backend, load_index
+
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+RECORDS_FILE = "records.json"
+# Held (flock) by the process writing a new version of the store
+LOCK_FILE = ".lock"
+# Incremental ingests: where the source was read up to for this version
+STATE_FILE = "ingest_state.json"
+
+# Superseded versions kept besides the current one, so readers that
+# resolved an older version just before a swap can still load it
+STORE_KEEP_VERSIONS = int(os.getenv("STORE_KEEP_VERSIONS", "1"))
+# Superseded versions older than this are removed regardless (0 = no limit)
+STORE_MAX_VERSION_AGE_S = float(os.getenv("STORE_MAX_VERSION_AGE_S", "0"))
+
+_store_locks: Dict[str, threading.Lock] = {}
+_store_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _store_lock(store_dir: str) -> Iterator[None]:
+    """
+    Serialize writers of one store: a thread lock within the process and
+    an exclusive flock on <store_dir>/.lock across processes (workers), so
+    no two read-modify-write cycles of records.json and CURRENT interleave.
+    """
+    with _store_locks_guard:
+        lock = _store_locks.setdefault(os.path.abspath(store_dir), threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(store_dir, exist_ok=True)
+        with open(os.path.join(store_dir, LOCK_FILE), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def current_version(store_dir: str) -> Optional[str]:
+    try:
+        with open(os.path.join(store_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_store_path(path: str) -> str:
+    """
+    Concrete index directory for `path`: the current version of a versioned
+    store, or `path` itself for a plain store directory.
+    """
+    version = current_version(path)
+    if version is None:
+        return path
+    return os.path.join(path, VERSIONS_DIR, version)
+
+
+def _new_version_id() -> str:
+    # Sortable by creation time
+    return f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+
+
+def _set_current(store_dir: str, version: str) -> None:
+    tmp = os.path.join(store_dir, f".{CURRENT_FILE}.{uuid.uuid4().hex}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    # Atomic on POSIX and Windows: readers see the old or the new pointer
+    os.replace(tmp, os.path.join(store_dir, CURRENT_FILE))
+
+
+def _tmp_dir(store_dir: str, version: str) -> str:
+    return os.path.join(store_dir, VERSIONS_DIR, f".tmp-{version}")
+
+
+def _read_json(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def ingest_state(store_dir: str) -> Dict[str, Any]:
+    """State saved with the current version by an incremental ingest ({} if none)."""
+    version = current_version(store_dir)
+    if version is None:
+        return {}
+    return _read_json(os.path.join(store_dir, VERSIONS_DIR, version, STATE_FILE))
+
+
+def _open_current(
+    store_dir: str, embeddings: Embeddings, version: str
+) -> Tuple[Optional[VectorIndex], Dict[str, List[str]]]:
+    """
+    The current version, loaded to be changed into `version`, and its
+    record ids; (None, {}) for a new store. Caller holds the store lock.
+    """
+    previous = current_version(store_dir)
+    if previous is None:
+        return None, {}
+    previous_dir = os.path.join(store_dir, VERSIONS_DIR, previous)
+    record_ids = _read_json(os.path.join(previous_dir, RECORDS_FILE))
+    backend = detect_backend(previous_dir)
+    if backend == "chroma":
+        # A loaded Chroma store writes through to its directory:
+        # mutate a copy that becomes the new version, never the live one
+        shutil.copytree(previous_dir, _tmp_dir(store_dir, version))
+        previous_dir = _tmp_dir(store_dir, version)
+    return load_index(previous_dir, embeddings, backend), record_ids
+
+
+def _write_version(
+    store_dir: str,
+    vs: VectorIndex,
+    record_ids: Dict[str, List[str]],
+    version: Optional[str] = None,
+    state: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Save `vs` as a new version (`version` or a new id) and make it current; returns its id."""
+    version = version or _new_version_id()
+    version_dir = os.path.join(store_dir, VERSIONS_DIR, version)
+    tmp_dir = _tmp_dir(store_dir, version)
+    vs.save(tmp_dir)
+    with open(os.path.join(tmp_dir, RECORDS_FILE), "w", encoding="utf-8") as f:
+        json.dump(record_ids, f)
+    if state is not None:
+        with open(os.path.join(tmp_dir, STATE_FILE), "w", encoding="utf-8") as f:
+            json.dump(state, f)
+    os.rename(tmp_dir, version_dir)
+    _set_current(store_dir, version)
+    return version
+
+
+def replace_index(store_dir: str, vs: VectorIndex) -> str:
+    """
+    Swap `vs` in as the whole index of `store_dir` through the CURRENT
+    pointer, so readers load either the old or the new index. A plain store
+    directory becomes a versioned store; its old files are removed after
+    the swap. Returns the new version id.
+    """
+    with _store_lock(store_dir):
+        os.makedirs(os.path.join(store_dir, VERSIONS_DIR), exist_ok=True)
+        plain = current_version(store_dir) is None
+        version = _write_version(store_dir, vs, {})
+        if plain:
+            for name in os.listdir(store_dir):
+                if name in (VERSIONS_DIR, CURRENT_FILE) or name.startswith("."):
+                    continue
+                old = os.path.join(store_dir, name)
+                if os.path.isdir(old):
+                    shutil.rmtree(old, ignore_errors=True)
+                else:
+                    os.remove(old)
+        return version
+
+
+def upsert_records(
+    store_dir: str,
+    records: List[Tuple[str, Document]],
+    embed_model: str = "text-embedding-3-small",
+    chunk_size: int = 1000,
+    chunk_overlap: int = 150,
+    keep_versions: int = STORE_KEEP_VERSIONS,
+    max_version_age_s: float = STORE_MAX_VERSION_AGE_S,
+    tags: Optional[List[str]] = None,
+    backend: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Write a new version of the store at `store_dir` in which every record
+    key in `records` maps to the given Document (replacing its previous
+    chunks), then flip the CURRENT pointer and garbage-collect superseded
+    versions. Returns the stable store path and the new version.
+    A new store uses `backend`; an existing one keeps its own.
+    """
+    embeddings = get_embeddings(embed_model)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+    )
+
+    with _store_lock(store_dir):
+        os.makedirs(os.path.join(store_dir, VERSIONS_DIR), exist_ok=True)
+
+        version = _new_version_id()
+        vs, record_ids = _open_current(store_dir, embeddings, version)
+
+        # Drop the chunks of records being replaced
+        stale = [i for key, _ in records for i in record_ids.pop(key, [])]
+        if vs is not None and stale:
+            vs.delete(stale)
+
+        def _keyed_chunks():
+            for key, doc in records:
+                ids = record_ids.setdefault(key, [])
+                for n, chunk in enumerate(iter_chunks([doc], splitter)):
+                    chunk.id = f"{key}#{n}"
+                    chunk.metadata["record_key"] = key
+                    ids.append(chunk.id)
+                    yield chunk
+
+        vs, num_chunks = index_chunks(
+            _keyed_chunks(), embeddings, vs=vs, backend=backend or VECTOR_BACKEND
+        )
+        if vs is None:
+            raise ValueError("No text records to upsert")
+
+        _write_version(store_dir, vs, record_ids, version)
+        version_dir = os.path.join(store_dir, VERSIONS_DIR, version)
+
+        removed = gc_versions(store_dir, keep_versions, max_version_age_s)
+        get_catalog().register(
+            store_dir,
+            backend=vs.backend,
+            versioned=True,
+            source=sorted({doc.metadata.get("source", "") for _, doc in records} - {""}),
+            embed_model=embed_model,
+            num_chunks=len(vs),
+            tags=tags,
+        )
+
+    return {
+        "backend": vs.backend,
+        "vector_db_path": store_dir,
+        "version": version,
+        "version_path": version_dir,
+        "num_chunks": num_chunks,
+        "num_records": len(record_ids),
+        "total_vectors": len(vs),
+        "versions_removed": len(removed),
+    }
+
+
+def gc_versions(
+    store_dir: str,
+    keep_versions: int = STORE_KEEP_VERSIONS,
+    max_version_age_s: float = STORE_MAX_VERSION_AGE_S,
+) -> List[str]:
+    """
+    Delete superseded versions beyond the newest `keep_versions`, and any
+    superseded version older than `max_version_age_s` (when > 0). The
+    current version is never removed. Returns the removed version ids.
+    """
+    versions_dir = os.path.join(store_dir, VERSIONS_DIR)
+    if not os.path.isdir(versions_dir):
+        return []
+    current = current_version(store_dir)
+    superseded = sorted(
+        (v for v in os.listdir(versions_dir) if not v.startswith(".") and v != current),
+        reverse=True,
+    )
+
+    now_ms = time.time() * 1000
+    removed = []
+    for n, version in enumerate(superseded):
+        too_many = n >= keep_versions
+        created_ms = int(version.split("-", 1)[0]) if version[:13].isdigit() else 0
+        too_old = max_version_age_s > 0 and (now_ms - created_ms) / 1000 > max_version_age_s
+        if too_many or too_old:
+            shutil.rmtree(os.path.join(versions_dir, version), ignore_errors=True)
+            removed.append(version)
+    return removed
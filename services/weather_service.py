@@ -0,0 +1,227 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from langchain.tools.base import ToolException
+
+from services.metrics import StatsCollector
+from services.tracing import observe_stage
+
+WEATHER_API_BASE_URL = os.getenv("WEATHER_API_BASE_URL", "http://api.weatherapi.com/v1")
+WEATHER_CACHE_TTL_S = float(os.getenv("WEATHER_CACHE_TTL_S", "600"))
+# Least recently used forecasts (and location aliases) beyond this are dropped
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "1024"))
+WEATHER_HTTP_POOL_SIZE = int(os.getenv("WEATHER_HTTP_POOL_SIZE", "16"))
+
+CacheKey = Tuple[str, int]
+
+
+def normalize_location(location: str) -> str:
+    return " ".join(str(location).strip().lower().split())
+
+
+def _resolved_name(data: Dict[str, Any], fallback: str) -> str:
+    loc = data.get("location") or {}
+    parts = [loc.get("name"), loc.get("region"), loc.get("country")]
+    resolved = ", ".join(p.strip() for p in parts if p and p.strip())
+    return normalize_location(resolved or fallback)
+
+
+class WeatherClient:
+    """
+    WeatherAPI forecast client with:
+      - a pooled keep-alive HTTP session,
+      - a TTL + LRU cache keyed by (resolved location, days); the raw user
+        input is kept as an alias so "Karachi" and "karachi " share one
+        entry. Expired entries and their aliases are pruned on every put,
+      - single-flight: concurrent identical requests share one upstream call.
+    """
+
+    def __init__(
+        self,
+        base_url: str = WEATHER_API_BASE_URL,
+        ttl_s: float = WEATHER_CACHE_TTL_S,
+        max_entries: int = WEATHER_CACHE_MAX_ENTRIES,
+        pool_size: int = WEATHER_HTTP_POOL_SIZE,
+        timeout: float = 15,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Both in least recently used first order
+        self._cache: "OrderedDict[CacheKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._aliases: "OrderedDict[CacheKey, CacheKey]" = OrderedDict()
+        self._inflight: Dict[CacheKey, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "upstream_calls": 0,
+            "upstream_errors": 0,
+            "upstream_latency_total_s": 0.0,
+            "upstream_latency_max_s": 0.0,
+        }
+
+    def get_forecast(self, location: str, days: int) -> Dict[str, Any]:
+        key = (normalize_location(location), int(days))
+
+        with self._lock:
+            cached = self._cached(key)
+            if cached is not None:
+                self._stats["hits"] += 1
+                return cached
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            data = self._fetch(location, int(days))
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        resolved_key = (_resolved_name(data, key[0]), key[1])
+        with self._lock:
+            self._put(key, resolved_key, data)
+            self._inflight.pop(key, None)
+        future.set_result(data)
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._cache)
+            stats["aliases"] = len(self._aliases)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = ((stats["hits"] + stats["coalesced"]) / lookups) if lookups else 0.0
+        calls = stats["upstream_calls"]
+        stats["upstream_latency_avg_s"] = (
+            stats["upstream_latency_total_s"] / calls if calls else 0.0
+        )
+        return stats
+
+    # ---- internals
+
+    def _cached(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        # caller holds self._lock
+        resolved_key = self._aliases.get(key, key)
+        entry = self._cache.get(resolved_key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl_s:
+            del self._cache[resolved_key]
+            return None
+        self._cache.move_to_end(resolved_key)
+        if key in self._aliases:
+            self._aliases.move_to_end(key)
+        return entry[1]
+
+    def _put(self, key: CacheKey, resolved_key: CacheKey, data: Dict[str, Any]) -> None:
+        # caller holds self._lock; keys come from user input, so both maps stay bounded
+        now = time.monotonic()
+        self._cache[resolved_key] = (now, data)
+        self._cache.move_to_end(resolved_key)
+        self._aliases[key] = resolved_key
+        self._aliases.move_to_end(key)
+        dropped = [k for k, (stored, _) in self._cache.items() if now - stored > self.ttl_s]
+        for k in dropped:
+            del self._cache[k]
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+            self._stats["evictions"] += 1
+        for alias in [a for a, target in self._aliases.items() if target not in self._cache]:
+            del self._aliases[alias]
+        while len(self._aliases) > self.max_entries:
+            self._aliases.popitem(last=False)
+
+    def _fetch(self, location: str, days: int) -> Dict[str, Any]:
+        params = {
+            "key": os.getenv("WEATHER_API"),
+            "q": location,
+            "days": days,
+            "aqi": "no",
+            "alerts": "no",
+        }
+
+        start = time.perf_counter()
+        try:
+            resp = self.session.get(
+                f"{self.base_url}/forecast.json", params=params, timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            self._record_upstream(time.perf_counter() - start, error=True)
+            raise ToolException(f"Network error contacting WeatherAPI: {e}")
+        self._record_upstream(
+            time.perf_counter() - start, error=resp.status_code != 200
+        )
+
+        if resp.status_code != 200:
+            # WeatherAPI returns JSON error payloads
+            try:
+                err = resp.json()
+            except Exception:
+                err = {"error": {"message": resp.text[:200]}}
+            msg = ((err.get("error") or {}).get("message") or "Unknown error")
+            raise ToolException(f"WeatherAPI error ({resp.status_code}): {msg}")
+
+        try:
+            return resp.json()
+        except ValueError:
+            raise ToolException("Invalid response from WeatherAPI (not JSON)")
+
+    def _record_upstream(self, seconds: float, error: bool) -> None:
+        observe_stage("weather_api", seconds)
+        with self._lock:
+            self._stats["upstream_calls"] += 1
+            self._stats["upstream_latency_total_s"] += seconds
+            self._stats["upstream_latency_max_s"] = max(
+                self._stats["upstream_latency_max_s"], seconds
+            )
+            if error:
+                self._stats["upstream_errors"] += 1
+
+
+_client: Optional[WeatherClient] = None
+_client_lock = threading.Lock()
+
+
+def get_weather_client() -> WeatherClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = WeatherClient()
+        return _client
+
+
+def weather_cache_stats() -> Dict[str, Any]:
+    return get_weather_client().stats()
+
+
+StatsCollector(
+    "rag_weather_cache",
+    "Forecast cache and upstream calls (services.weather_service).",
+    weather_cache_stats,
+    counters=("hits", "misses", "coalesced", "evictions", "upstream_calls", "upstream_errors"),
+)